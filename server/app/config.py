@@ -10,15 +10,131 @@ class Config:
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-jwt-secret")
     CORS_ALLOW_ORIGINS = os.getenv("CORS_ALLOW_ORIGINS", "*")
 
+    # POST /api/admin/setup (default admin and test users); off unless explicitly enabled
+    ADMIN_SETUP_ENABLED = os.getenv("ADMIN_SETUP_ENABLED", "false").lower() == "true"
+    ADMIN_SETUP_PASSWORD = os.getenv("ADMIN_SETUP_PASSWORD", "")
+
+    # Password hashing (PASSWORD_HASH_WORKERS=-1 uses one process per CPU, 0 hashes inline)
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "-1"))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "0"))
+    # Longest a request waits for its hash before answering 503 (a full queue answers 503 at once)
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "5"))
+
+    # Per-process cache of users looked up by jwt_required
+    USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+    # Access tokens are short-lived; clients rotate them with single-use refresh tokens
+    ACCESS_TOKEN_MINUTES = int(os.getenv("ACCESS_TOKEN_MINUTES", "15"))
+    REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "30"))
+
+    # Integer ids handed out per process from the Mongo counters collection
+    ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "20"))
+
+    # Google sign-in: ID tokens are verified locally against this key set (file:// works for tests)
+    GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
+    GOOGLE_JWKS_URL = os.getenv("GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+    GOOGLE_JWKS_DEFAULT_MAX_AGE = int(os.getenv("GOOGLE_JWKS_DEFAULT_MAX_AGE", "3600"))
+
+    # Cursor-paginated listings cache optional totals for this long
+    PAGINATION_TOTAL_CACHE_SECONDS = int(os.getenv("PAGINATION_TOTAL_CACHE_SECONDS", "30"))
+    PAGINATION_TOTAL_CACHE_SIZE = int(os.getenv("PAGINATION_TOTAL_CACHE_SIZE", "1024"))
+
+    # Admin dashboard stats: "aggregate" runs one pass per collection, "counters" reads
+    # counts maintained on user writes (POST /api/admin/stats/counters/rebuild to reset)
+    ADMIN_STATS_MODE = os.getenv("ADMIN_STATS_MODE", "aggregate")
+    ADMIN_STATS_TTL_SECONDS = int(os.getenv("ADMIN_STATS_TTL_SECONDS", "15"))
+    ADMIN_STATS_STALE_SECONDS = int(os.getenv("ADMIN_STATS_STALE_SECONDS", "300"))
+
+    # Upper bound on users touched by one POST /api/admin/users/bulk
+    ADMIN_BULK_MAX_USERS = int(os.getenv("ADMIN_BULK_MAX_USERS", "50000"))
+
+    # Upper bound on rows in one POST /api/admin/influencers/bulk
+    INFLUENCER_BULK_MAX_ROWS = int(os.getenv("INFLUENCER_BULK_MAX_ROWS", "5000"))
+
+    # Admin audit log: entries are buffered per worker and written in batches
+    AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "2"))
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", "20000"))
+
+    # Public influencer catalogue snapshots (ETag/304); writes bump a shared version
+    CATALOG_VERSION_CHECK_SECONDS = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", "2"))
+    CATALOG_MAX_AGE_SECONDS = int(os.getenv("CATALOG_MAX_AGE_SECONDS", "60"))
+    CATALOG_SNAPSHOTS = int(os.getenv("CATALOG_SNAPSHOTS", "256"))
+
+    # USSD shortcodes handed out by the allocator (explicitly requested codes may lie outside)
+    SHORTCODE_MIN = int(os.getenv("SHORTCODE_MIN", "100"))
+    SHORTCODE_MAX = int(os.getenv("SHORTCODE_MAX", "9999"))
+    SHORTCODE_BITMAP_RELOAD_SECONDS = int(os.getenv("SHORTCODE_BITMAP_RELOAD_SECONDS", "300"))
+
+    # Rate limiting ("auto" shares limits through Mongo when it is available)
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "auto")
+    # Trusted reverse proxies in front of the app; 0 uses the socket address, since
+    # X-Forwarded-For is client-controlled unless a proxy we trust appended to it
+    RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "0"))
+    RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+    # Token revocation: each worker syncs a Bloom filter of revoked jtis from Mongo
+    REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+    REVOCATION_REBUILD_SECONDS = float(os.getenv("REVOCATION_REBUILD_SECONDS", "600"))
+    REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+    REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.01"))
+
     # Africa's Talking
     AT_USERNAME = os.getenv("AT_USERNAME", "")
     AT_API_KEY = os.getenv("AT_API_KEY", "")
+    AT_SENDER_ID = os.getenv("AT_SENDER_ID", "")
+    SMS_QUEUE_SIZE = int(os.getenv("SMS_QUEUE_SIZE", "1000"))
+    SMS_MAX_RETRIES = int(os.getenv("SMS_MAX_RETRIES", "3"))
+    SMS_REQUEST_TIMEOUT = int(os.getenv("SMS_REQUEST_TIMEOUT", "10"))
+
+    # Phone verification codes
+    OTP_DIGITS = int(os.getenv("OTP_DIGITS", "6"))
+    OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "300"))
+    OTP_RESEND_SECONDS = int(os.getenv("OTP_RESEND_SECONDS", "60"))
+    OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
 
     # M-Pesa Daraja
     DARAJA_CONSUMER_KEY = os.getenv("DARAJA_CONSUMER_KEY", "")
     DARAJA_CONSUMER_SECRET = os.getenv("DARAJA_CONSUMER_SECRET", "")
     DARAJA_PASSKEY = os.getenv("DARAJA_PASSKEY", "")
     DARAJA_SHORTCODE = os.getenv("DARAJA_SHORTCODE", "")
+    DARAJA_BASE_URL = os.getenv("DARAJA_BASE_URL", "https://sandbox.safaricom.co.ke")
+    DARAJA_B2C_SHORTCODE = os.getenv("DARAJA_B2C_SHORTCODE", "")
+    DARAJA_B2C_INITIATOR_NAME = os.getenv("DARAJA_B2C_INITIATOR_NAME", "")
+    DARAJA_B2C_SECURITY_CREDENTIAL = os.getenv("DARAJA_B2C_SECURITY_CREDENTIAL", "")
+    DARAJA_B2C_RESULT_URL = os.getenv("DARAJA_B2C_RESULT_URL", "")
+    DARAJA_B2C_TIMEOUT_URL = os.getenv("DARAJA_B2C_TIMEOUT_URL", "")
+    # TransactionStatus results for stuck payouts (the /webhooks/b2c/status endpoint)
+    DARAJA_B2C_STATUS_RESULT_URL = os.getenv("DARAJA_B2C_STATUS_RESULT_URL", "")
+    # B2C callbacks are accepted only with this secret (appended to the callback URLs as ?token=)
+    # or from an address in the comma-separated allowlist; with neither set they are refused
+    DARAJA_CALLBACK_SECRET = os.getenv("DARAJA_CALLBACK_SECRET", "")
+    DARAJA_CALLBACK_IPS = os.getenv("DARAJA_CALLBACK_IPS", "")
+
+    # Withdrawal payouts
+    PAYOUT_BATCH_SIZE = int(os.getenv("PAYOUT_BATCH_SIZE", "50"))
+    PAYOUT_CONCURRENCY = int(os.getenv("PAYOUT_CONCURRENCY", "4"))
+    PAYOUT_REQUEST_TIMEOUT = int(os.getenv("PAYOUT_REQUEST_TIMEOUT", "10"))
+    # Withdrawals `submitted` this long without a callback get a TransactionStatus query (repeated at this interval)
+    PAYOUT_STATUS_QUERY_AFTER_SECONDS = int(os.getenv("PAYOUT_STATUS_QUERY_AFTER_SECONDS", "900"))
+    # Callbacks that still match no submitted withdrawal after this long are dead-lettered
+    PAYOUT_RESULT_MAX_AGE_SECONDS = int(os.getenv("PAYOUT_RESULT_MAX_AGE_SECONDS", "86400"))
+
+    # Earnings counters
+    EARNINGS_SHARDS = int(os.getenv("EARNINGS_SHARDS", "8"))
+    EARNINGS_HOT_WRITES_PER_MINUTE = int(os.getenv("EARNINGS_HOT_WRITES_PER_MINUTE", "600"))
+    EARNINGS_CACHE_SECONDS = int(os.getenv("EARNINGS_CACHE_SECONDS", "5"))
+
+    # Leaderboard
+    LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "100"))
+    LEADERBOARD_REFRESH_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_SECONDS", "60"))
+
+    # Ledger
+    LEDGER_SNAPSHOT_EVERY = int(os.getenv("LEDGER_SNAPSHOT_EVERY", "1000"))
+    LEDGER_SNAPSHOT_SETTLE_SECONDS = int(os.getenv("LEDGER_SNAPSHOT_SETTLE_SECONDS", "5"))
 
 
 def get_config():
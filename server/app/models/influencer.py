@@ -19,7 +19,7 @@ class Influencer(db.Model):
     name = db.Column(db.String(255), nullable=False)
     image_url = db.Column(db.String(512), nullable=True)
     ussd_shortcode = db.Column(db.String(32), nullable=True, unique=True, index=True)
-    received = db.Column(db.Integer, nullable=False, default=0)
+    received = db.Column(db.Integer, nullable=False, default=0, index=True)
     status = db.Column(db.String(20), nullable=False, default=InfluencerStatus.ACTIVE.value)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
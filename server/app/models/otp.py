@@ -5,11 +5,14 @@ from ..extensions import db
 
 class OtpCode(db.Model):
     __tablename__ = "otp_codes"
+    __table_args__ = (
+        db.Index("ix_otp_codes_phone_expires_at", "phone", "expires_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     phone = db.Column(db.String(20), nullable=False, index=True)
-    code = db.Column(db.String(10), nullable=False)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    # HMAC-SHA256 of the code, never the code itself
+    code = db.Column(db.String(64), nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-
-
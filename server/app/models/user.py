@@ -1,10 +1,12 @@
 from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
+import uuid
 from flask import current_app
 from enum import Enum
 
+from ..services import passwords
+
 db = SQLAlchemy()
 
 class UserType(Enum):
@@ -53,18 +55,17 @@ class User(db.Model):
             self.user_type = UserType.GUEST
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
     
     def check_password(self, password):
-        if not self.password_hash:
-            return False
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
     
     def generate_jwt_token(self, expires_in=3600):
         """Generate JWT token for user authentication"""
         payload = {
             'user_id': self.id,
             'user_type': self.user_type.value,
+            'jti': uuid.uuid4().hex,
             'exp': datetime.utcnow() + timedelta(seconds=expires_in)
         }
         return jwt.encode(payload, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
@@ -63,6 +63,34 @@ try:
 except Exception as e:
     print(f"DEBUG: Failed to import auth_simple: {e}")
 
+try:
+    print("DEBUG: Importing earnings module...")
+    from . import earnings  # noqa: F401
+    print("DEBUG: Successfully imported earnings")
+except Exception as e:
+    print(f"DEBUG: Failed to import earnings: {e}")
+
+try:
+    print("DEBUG: Importing payouts module...")
+    from . import payouts  # noqa: F401
+    print("DEBUG: Successfully imported payouts")
+except Exception as e:
+    print(f"DEBUG: Failed to import payouts: {e}")
+
+try:
+    print("DEBUG: Importing otp module...")
+    from . import otp  # noqa: F401
+    print("DEBUG: Successfully imported otp")
+except Exception as e:
+    print(f"DEBUG: Failed to import otp: {e}")
+
+try:
+    print("DEBUG: Importing exports module...")
+    from . import exports  # noqa: F401
+    print("DEBUG: Successfully imported exports")
+except Exception as e:
+    print(f"DEBUG: Failed to import exports: {e}")
+
 print("DEBUG: Finished importing route modules")
 
 
@@ -1,4 +1,4 @@
-from flask import jsonify, request
+from flask import current_app, jsonify, request
 from flask_cors import cross_origin
 from datetime import datetime
 # Try to import mongo_db, but don't fail if it's not available
@@ -6,6 +6,8 @@ try:
     from ..extensions import mongo_db
 except ImportError:
     mongo_db = None
+from ..services import admin_stats, audit, passwords, refresh_tokens, subscription_events, user_cache, user_search
+from ..utils.pagination import PaginationError, ensure_sort_index, find_page, page_params
 from .auth import admin_required
 from . import api_bp
 
@@ -14,10 +16,12 @@ from . import api_bp
 @cross_origin()
 def list_users(current_user):
     """List all users (admin only)"""
-    if mongo_db:
+    if mongo_db is not None:
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
+        try:
+            params = page_params()
+        except PaginationError as e:
+            return jsonify({'message': str(e)}), 400
         user_type = request.args.get('user_type')
         search = request.args.get('search', '').strip()
         
@@ -26,22 +30,19 @@ def list_users(current_user):
         if user_type:
             filter_query['user_type'] = user_type
         if search:
-            filter_query['$or'] = [
-                {'email': {'$regex': search, '$options': 'i'}},
-                {'first_name': {'$regex': search, '$options': 'i'}},
-                {'last_name': {'$regex': search, '$options': 'i'}},
-                {'username': {'$regex': search, '$options': 'i'}}
-            ]
-        
-        # Get total count
-        total = mongo_db.get_collection("users").count_documents(filter_query)
+            # Word-prefix match on the indexed search_prefixes field
+            filter_query.update(user_search.search_filter(search))
         
-        # Get paginated results
-        skip = (page - 1) * per_page
-        users = list(mongo_db.get_collection("users").find(
+        # Keyset pagination on (created_at, id); totals only when asked for
+        users_collection = mongo_db.get_collection("users")
+        ensure_sort_index(users_collection, 'user_type')
+        ensure_sort_index(users_collection)
+        users, pagination = find_page(
+            users_collection,
             filter_query,
-            {'password_hash': 0}  # Exclude password hash
-        ).skip(skip).limit(per_page).sort('created_at', -1))
+            {'password_hash': 0, 'search_prefixes': 0},  # Exclude password hash and search tokens
+            **params
+        )
         
         # Convert ObjectId to string for JSON serialization
         for user in users:
@@ -57,12 +58,7 @@ def list_users(current_user):
         return jsonify({
             'message': 'Users retrieved successfully',
             'users': users,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'pages': (total + per_page - 1) // per_page
-            }
+            'pagination': pagination
         }), 200
     
     return jsonify({'message': 'User management not available'}), 500
@@ -72,10 +68,10 @@ def list_users(current_user):
 @cross_origin()
 def get_user(current_user, user_id):
     """Get specific user details (admin only)"""
-    if mongo_db:
+    if mongo_db is not None:
         user = mongo_db.get_collection("users").find_one(
             {"id": user_id},
-            {'password_hash': 0}  # Exclude password hash
+            {'password_hash': 0, 'search_prefixes': 0}  # Exclude password hash and search tokens
         )
         
         if not user:
@@ -105,7 +101,7 @@ def update_user(current_user, user_id):
     """Update user details (admin only)"""
     data = request.get_json(force=True) or {}
     
-    if mongo_db:
+    if mongo_db is not None:
         # Check if user exists
         existing_user = mongo_db.get_collection("users").find_one({"id": user_id})
         if not existing_user:
@@ -124,11 +120,15 @@ def update_user(current_user, user_id):
         
         if update_data:
             update_data['updated_at'] = datetime.utcnow()
+            update_data.update(user_search.search_fields({**existing_user, **update_data}))
             
             mongo_db.get_collection("users").update_one(
                 {"id": user_id},
                 {"$set": update_data}
             )
+            user_cache.invalidate(user_id)
+            admin_stats.record_user_change(existing_user, {**existing_user, **update_data})
+            audit.record('update', 'user', user_id, current_user['id'], audit.diff(existing_user, update_data))
             
             return jsonify({'message': 'User updated successfully'}), 200
         
@@ -141,7 +141,7 @@ def update_user(current_user, user_id):
 @cross_origin()
 def delete_user(current_user, user_id):
     """Delete user (admin only)"""
-    if mongo_db:
+    if mongo_db is not None:
         # Check if user exists
         existing_user = mongo_db.get_collection("users").find_one({"id": user_id})
         if not existing_user:
@@ -162,6 +162,11 @@ def delete_user(current_user, user_id):
                 }
             }
         )
+        user_cache.invalidate(user_id)
+        admin_stats.record_user_change(existing_user, {**existing_user, "is_active": False, "is_suspended": True})
+        audit.record('suspend', 'user', user_id, current_user['id'],
+                     audit.diff(existing_user, {"is_active": False, "is_suspended": True}))
+        refresh_tokens.revoke_user(user_id)
         
         return jsonify({'message': 'User suspended successfully'}), 200
     
@@ -172,7 +177,7 @@ def delete_user(current_user, user_id):
 @cross_origin()
 def activate_user(current_user, user_id):
     """Activate suspended user (admin only)"""
-    if mongo_db:
+    if mongo_db is not None:
         # Check if user exists
         existing_user = mongo_db.get_collection("users").find_one({"id": user_id})
         if not existing_user:
@@ -189,6 +194,10 @@ def activate_user(current_user, user_id):
                 }
             }
         )
+        user_cache.invalidate(user_id)
+        admin_stats.record_user_change(existing_user, {**existing_user, "is_active": True, "is_suspended": False})
+        audit.record('activate', 'user', user_id, current_user['id'],
+                     audit.diff(existing_user, {"is_active": True, "is_suspended": False}))
         
         return jsonify({'message': 'User activated successfully'}), 200
     
@@ -209,7 +218,7 @@ def upgrade_user(current_user, user_id):
     if new_user_type not in valid_types:
         return jsonify({'message': f'Invalid user type. Must be one of: {", ".join(valid_types)}'}), 400
     
-    if mongo_db:
+    if mongo_db is not None:
         # Check if user exists
         existing_user = mongo_db.get_collection("users").find_one({"id": user_id})
         if not existing_user:
@@ -225,55 +234,125 @@ def upgrade_user(current_user, user_id):
                 }
             }
         )
+        user_cache.invalidate(user_id)
+        admin_stats.record_user_change(existing_user, {**existing_user, "user_type": new_user_type})
+        audit.record('upgrade', 'user', user_id, current_user['id'],
+                     audit.diff(existing_user, {"user_type": new_user_type}))
         
         return jsonify({'message': f'User upgraded to {new_user_type} successfully'}), 200
     
     return jsonify({'message': 'User management not available'}), 500
 
+BULK_OPERATIONS = {
+    'suspend': {"is_active": False, "is_suspended": True},
+    'activate': {"is_active": True, "is_suspended": False},
+}
+
+@api_bp.post("/admin/users/bulk")
+@admin_required
+@cross_origin()
+def bulk_update_users(current_user):
+    """Suspend, activate or upgrade many users in one write (admin only)
+    
+    Body: {"operation": "suspend"|"activate"|"upgrade", "user_type": ... (upgrade only),
+    and either "ids": [...] or "filter": {"user_type", "search", "status": "active"|"suspended"}}
+    """
+    data = request.get_json(force=True) or {}
+    operation = data.get('operation')
+    
+    if operation == 'upgrade':
+        valid_types = ['guest', 'user', 'subscribed', 'admin']
+        if data.get('user_type') not in valid_types:
+            return jsonify({'message': f'Invalid user type. Must be one of: {", ".join(valid_types)}'}), 400
+        changes = {"user_type": data['user_type']}
+    elif operation in BULK_OPERATIONS:
+        changes = BULK_OPERATIONS[operation]
+    else:
+        return jsonify({'message': 'operation must be one of: suspend, activate, upgrade'}), 400
+    
+    # Resolve the target set
+    ids = data.get('ids')
+    criteria = data.get('filter')
+    if (ids is None) == (criteria is None):
+        return jsonify({'message': 'Provide exactly one of ids or filter'}), 400
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return jsonify({'message': 'ids must be a list of integers'}), 400
+        ids = list(dict.fromkeys(ids))
+        filter_query = {"id": {"$in": ids}}
+    else:
+        if not isinstance(criteria, dict):
+            return jsonify({'message': 'filter must be an object'}), 400
+        filter_query = {}
+        if criteria.get('user_type'):
+            filter_query['user_type'] = criteria['user_type']
+        if criteria.get('status') == 'active':
+            filter_query['is_active'] = True
+        elif criteria.get('status') == 'suspended':
+            filter_query['is_suspended'] = True
+        if str(criteria.get('search') or '').strip():
+            filter_query.update(user_search.search_filter(criteria['search']))
+        if not filter_query:
+            return jsonify({'message': 'filter must narrow the user set'}), 400
+    
+    if mongo_db is not None:
+        max_users = current_app.config.get('ADMIN_BULK_MAX_USERS', 50000)
+        if ids is not None and len(ids) > max_users:
+            return jsonify({'message': f'At most {max_users} users per bulk operation'}), 400
+        
+        users_collection = mongo_db.get_collection("users")
+        # One read of just the fields the summary and stats need
+        projection = {"_id": 0, "id": 1, "is_active": 1, "is_suspended": 1, "user_type": 1}
+        existing = list(users_collection.find(filter_query, projection).limit(max_users + 1))
+        if len(existing) > max_users:
+            return jsonify({'message': f'Filter matches more than {max_users} users; narrow it down'}), 400
+        
+        summary = {'updated': [], 'unchanged': [], 'skipped': [], 'not_found': []}
+        pending = []
+        for user in existing:
+            if user['id'] == current_user['id'] and operation != 'activate':
+                # Same rule as the single-user endpoints: admins can't demote or suspend themselves
+                summary['skipped'].append(user['id'])
+            elif all(user.get(field) == value for field, value in changes.items()):
+                summary['unchanged'].append(user['id'])
+            else:
+                pending.append(user)
+        if ids is not None:
+            found = {user['id'] for user in existing}
+            summary['not_found'] = [i for i in ids if i not in found]
+        
+        if pending:
+            pending_ids = [user['id'] for user in pending]
+            users_collection.update_many(
+                {"id": {"$in": pending_ids}},
+                {"$set": {**changes, "updated_at": datetime.utcnow()}}
+            )
+            user_cache.invalidate(*pending_ids)
+            admin_stats.record_user_changes([(user, {**user, **changes}) for user in pending])
+            audit.record_many(operation, 'user', [(user['id'], audit.diff(user, changes)) for user in pending],
+                              current_user['id'])
+            if operation == 'suspend':
+                refresh_tokens.revoke_users(pending_ids)
+            summary['updated'] = pending_ids
+        
+        return jsonify({
+            'message': f'Bulk {operation} applied to {len(summary["updated"])} users',
+            'operation': operation,
+            'matched': len(existing),
+            'results': summary
+        }), 200
+    
+    return jsonify({'message': 'User management not available'}), 500
+
 @api_bp.get("/admin/stats")
 @admin_required
 @cross_origin()
 def get_admin_stats(current_user):
     """Get system statistics (admin only)"""
-    if mongo_db:
+    if mongo_db is not None:
         try:
-            # User statistics
-            total_users = mongo_db.get_collection("users").count_documents({})
-            active_users = mongo_db.get_collection("users").count_documents({"is_active": True})
-            suspended_users = mongo_db.get_collection("users").count_documents({"is_suspended": True})
-            
-            # User type breakdown
-            user_types = {}
-            for user_type in ['guest', 'user', 'subscribed', 'admin']:
-                count = mongo_db.get_collection("users").count_documents({"user_type": user_type})
-                user_types[user_type] = count
-            
-            # Recent activity
-            recent_users = mongo_db.get_collection("users").count_documents({
-                "created_at": {"$gte": datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)}
-            })
-            
-            # Collection statistics
-            total_influencers = mongo_db.get_collection("influencers").count_documents({})
-            total_subscribers = mongo_db.get_collection("subscribers").count_documents({})
-            
-            stats = {
-                'users': {
-                    'total': total_users,
-                    'active': active_users,
-                    'suspended': suspended_users,
-                    'by_type': user_types,
-                    'recent_today': recent_users
-                },
-                'content': {
-                    'influencers': total_influencers,
-                    'subscribers': total_subscribers
-                },
-                'system': {
-                    'database': 'MongoDB',
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-            }
+            # One aggregation per collection (or the maintained counters), cached with a short TTL
+            stats = admin_stats.get_stats()
             
             return jsonify({
                 'message': 'Statistics retrieved successfully',
@@ -284,3 +363,116 @@ def get_admin_stats(current_user):
             return jsonify({'message': f'Error retrieving statistics: {str(e)}'}), 500
     
     return jsonify({'message': 'Statistics not available'}), 500
+
+@api_bp.get("/admin/audit")
+@admin_required
+@cross_origin()
+def list_audit_log(current_user):
+    """Query the admin audit log by target, actor or action, newest first (admin only)"""
+    if mongo_db is not None:
+        try:
+            params = page_params(default_limit=50, max_limit=500)
+        except PaginationError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        # Each filter combination is served by one of the audit_log indexes
+        filter_query = {}
+        if request.args.get('target_type'):
+            filter_query['target_type'] = request.args['target_type']
+        if request.args.get('target_id'):
+            filter_query['target_id'] = request.args.get('target_id', type=int)
+        if request.args.get('actor_id'):
+            filter_query['actor_id'] = request.args.get('actor_id', type=int)
+        if request.args.get('action'):
+            filter_query['action'] = request.args['action']
+        
+        # Include entries still waiting in this worker's buffer
+        audit.flush()
+        audit_collection = mongo_db.get_collection("audit_log")
+        audit.ensure_indexes()
+        entries, pagination = find_page(audit_collection, filter_query, {'_id': 0}, **params)
+        for entry in entries:
+            entry['created_at'] = entry['created_at'].isoformat()
+        
+        return jsonify({
+            'message': 'Audit log retrieved successfully',
+            'entries': entries,
+            'pagination': pagination
+        }), 200
+    
+    return jsonify({'message': 'Audit log not available'}), 500
+
+@api_bp.post("/admin/stats/counters/rebuild")
+@admin_required
+@cross_origin()
+def rebuild_stats_counters(current_user):
+    """Recompute the incrementally maintained user counters (admin only)"""
+    if mongo_db is not None:
+        return jsonify({
+            'message': 'Statistics counters rebuilt successfully',
+            'users': admin_stats.rebuild_counters()
+        }), 200
+    
+    return jsonify({'message': 'Statistics not available'}), 500
+
+@api_bp.get("/admin/payments")
+@admin_required
+@cross_origin()
+def list_payments(current_user):
+    """List payments newest first with cursor pagination (admin only)"""
+    if mongo_db is not None:
+        try:
+            params = page_params()
+        except PaginationError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        filter_query = {}
+        if request.args.get('status'):
+            filter_query['status'] = request.args['status']
+        if request.args.get('influencer_id'):
+            filter_query['influencer_id'] = request.args.get('influencer_id', type=int)
+        
+        payments_collection = mongo_db.get_collection("payments")
+        ensure_sort_index(payments_collection, 'status')
+        ensure_sort_index(payments_collection, 'influencer_id')
+        ensure_sort_index(payments_collection)
+        payments, pagination = find_page(payments_collection, filter_query, **params)
+        
+        for payment in payments:
+            payment['_id'] = str(payment['_id'])
+            for field in ('created_at', 'updated_at', 'paid_at'):
+                if isinstance(payment.get(field), datetime):
+                    payment[field] = payment[field].isoformat()
+        
+        return jsonify({
+            'message': 'Payments retrieved successfully',
+            'payments': payments,
+            'pagination': pagination
+        }), 200
+    
+    return jsonify({'message': 'Payments not available'}), 500
+
+@api_bp.post("/admin/subscriptions/aggregates/rebuild")
+@admin_required
+@cross_origin()
+def rebuild_subscription_aggregates(current_user):
+    """Rebuild per-influencer subscription aggregates by replaying the event log (admin only)"""
+    try:
+        rebuilt = subscription_events.rebuild_aggregates()
+    except Exception as e:
+        return jsonify({'message': f'Error rebuilding aggregates: {str(e)}'}), 500
+    
+    return jsonify({
+        'message': 'Subscription aggregates rebuilt successfully',
+        'influencers': rebuilt
+    }), 200
+
+@api_bp.get("/admin/metrics/password-hashing")
+@admin_required
+@cross_origin()
+def get_password_hashing_metrics(current_user):
+    """Queue depth and throughput of this worker's password hashing pool (admin only)"""
+    return jsonify({
+        'message': 'Metrics retrieved successfully',
+        'metrics': passwords.metrics()
+    }), 200
@@ -1,5 +1,8 @@
 from flask import jsonify, request
 from . import api_bp
+from ..services import audit, catalog, influencer_search, onboarding, shortcodes
+from ..utils.pagination import PaginationError, list_page, page_params
+from ..utils.phone import clean_msisdn
 from .auth import admin_required
 
 # In-memory storage for demo purposes (replace with database later)
@@ -13,18 +16,27 @@ INFLUENCERS_DB = [
     }
 ]
 
+# Shortcodes for this store are reserved through the allocator, never by scanning the list
+shortcodes.bind_store(INFLUENCERS_DB)
+
 @api_bp.get("/admin/influencers")
 @admin_required
-def admin_list_influencers():
-    """Admin endpoint to list all influencers with full details"""
+def admin_list_influencers(current_user):
+    """Admin endpoint to list influencers with full details, a page at a time"""
+    try:
+        params = page_params()
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+    influencers, pagination = list_page(INFLUENCERS_DB, **params)
     return jsonify({
         "total": len(INFLUENCERS_DB),
-        "influencers": INFLUENCERS_DB
+        "influencers": influencers,
+        "pagination": pagination
     })
 
 @api_bp.post("/admin/influencers")
 @admin_required
-def admin_create_influencer():
+def admin_create_influencer(current_user):
     """Admin endpoint to create a new influencer"""
     payload = request.get_json(force=True) or {}
     
@@ -34,32 +46,79 @@ def admin_create_influencer():
         if not payload.get(field):
             return jsonify({"error": f"Missing required field: {field}"}), 400
     
-    # Check if phone already exists
-    if any(inf["phone"] == payload["phone"] for inf in INFLUENCERS_DB):
+    # Check if phone already exists (bulk onboarding stores numbers normalized)
+    phone = clean_msisdn(payload["phone"])
+    if any(clean_msisdn(inf["phone"]) == phone for inf in INFLUENCERS_DB):
         return jsonify({"error": "Phone number already exists"}), 409
     
-    # Create new influencer
+    # A requested shortcode must be free; otherwise the lowest free one in range is assigned
     new_id = max(inf["id"] for inf in INFLUENCERS_DB) + 1 if INFLUENCERS_DB else 1
+    try:
+        if str(payload.get("ussd_shortcode") or "").strip():
+            shortcode = shortcodes.claim(payload["ussd_shortcode"], new_id)
+        else:
+            shortcode = shortcodes.allocate(new_id)
+    except shortcodes.ShortcodeTaken as e:
+        return jsonify({"error": str(e)}), 409
+    except shortcodes.ShortcodeError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Create new influencer
     new_influencer = {
         "id": new_id,
         "name": payload["name"],
         "phone": payload["phone"],
         "received": payload.get("received", 0),
         "imageUrl": payload.get("imageUrl", ""),
-        "ussd_shortcode": payload.get("ussd_shortcode", ""),
+        "ussd_shortcode": shortcode,
         "created_at": "2025-08-10T20:00:00Z"  # Demo timestamp
     }
     
     INFLUENCERS_DB.append(new_influencer)
+    influencer_search.observe(new_influencer, catalog.invalidate())
+    audit.record("create", "influencer", new_id, current_user["id"], audit.diff({}, new_influencer))
     
     return jsonify({
         "message": "Influencer created successfully",
         "influencer": new_influencer
     }), 201
 
+@api_bp.post("/admin/influencers/bulk")
+@admin_required
+def admin_bulk_create_influencers(current_user):
+    """Admin endpoint to onboard many influencers at once.
+
+    Body is a JSON array (or {"influencers": [...]}) or a CSV upload in `file`
+    with name, phone and optional imageUrl, ussd_shortcode and received columns.
+    Rows with an invalid or already-known phone, or a taken shortcode, are
+    reported in `skipped`; the rest are added to the shared store in one batch.
+    """
+    try:
+        created, skipped = onboarding.onboard(onboarding.read_rows(), INFLUENCERS_DB)
+    except onboarding.OnboardingError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if created:
+        # One catalogue bump covers the whole batch
+        version = catalog.invalidate()
+        for influencer in created:
+            influencer_search.observe(influencer, version)
+            version = None
+        audit.record_many("create", "influencer",
+                          [(influencer["id"], audit.diff({}, influencer)) for influencer in created],
+                          current_user["id"])
+    
+    return jsonify({
+        "message": f"Onboarded {len(created)} of {len(created) + len(skipped)} influencers",
+        "created": len(created),
+        "skipped": len(skipped),
+        "influencers": created,
+        "errors": skipped
+    }), 201 if created else 200
+
 @api_bp.put("/admin/influencers/<int:influencer_id>")
 @admin_required
-def admin_update_influencer(influencer_id):
+def admin_update_influencer(current_user, influencer_id):
     """Admin endpoint to update an existing influencer"""
     payload = request.get_json(force=True) or {}
     
@@ -68,20 +127,37 @@ def admin_update_influencer(influencer_id):
     if not influencer:
         return jsonify({"error": "Influencer not found"}), 404
     
+    # Validate conflicts before touching anything, so a 409 leaves the influencer unchanged
+    if "phone" in payload:
+        phone = clean_msisdn(payload["phone"])
+        if any(clean_msisdn(inf["phone"]) == phone and inf["id"] != influencer_id for inf in INFLUENCERS_DB):
+            return jsonify({"error": "Phone number already exists"}), 409
+    shortcode = str(payload.get("ussd_shortcode") or "").strip()
+    previous_shortcode = influencer.get("ussd_shortcode")
+    if shortcode and shortcode != str(previous_shortcode or ""):
+        try:
+            shortcodes.claim(shortcode, influencer_id)
+        except shortcodes.ShortcodeTaken as e:
+            return jsonify({"error": str(e)}), 409
+    else:
+        shortcode = ""
+    
+    before = dict(influencer)
+    
     # Update fields
     if "name" in payload:
         influencer["name"] = payload["name"]
     if "phone" in payload:
-        # Check if new phone conflicts with existing
-        if any(inf["phone"] == payload["phone"] and inf["id"] != influencer_id for inf in INFLUENCERS_DB):
-            return jsonify({"error": "Phone number already exists"}), 409
         influencer["phone"] = payload["phone"]
     if "received" in payload:
         influencer["received"] = payload["received"]
     if "imageUrl" in payload:
         influencer["imageUrl"] = payload["imageUrl"]
-    if "ussd_shortcode" in payload:
-        influencer["ussd_shortcode"] = payload["ussd_shortcode"]
+    if shortcode:
+        influencer["ussd_shortcode"] = shortcode
+        shortcodes.release(previous_shortcode)
+    influencer_search.observe(influencer, catalog.invalidate())
+    audit.record("update", "influencer", influencer_id, current_user["id"], audit.diff(before, influencer))
     
     return jsonify({
         "message": "Influencer updated successfully",
@@ -90,7 +166,7 @@ def admin_update_influencer(influencer_id):
 
 @api_bp.delete("/admin/influencers/<int:influencer_id>")
 @admin_required
-def admin_delete_influencer(influencer_id):
+def admin_delete_influencer(current_user, influencer_id):
     """Admin endpoint to delete an influencer"""
     global INFLUENCERS_DB
     
@@ -98,6 +174,10 @@ def admin_delete_influencer(influencer_id):
     for i, influencer in enumerate(INFLUENCERS_DB):
         if influencer["id"] == influencer_id:
             deleted_influencer = INFLUENCERS_DB.pop(i)
+            shortcodes.release(deleted_influencer.get("ussd_shortcode"))
+            influencer_search.forget(influencer_id, catalog.invalidate())
+            audit.record("delete", "influencer", influencer_id, current_user["id"],
+                         {key: [value, None] for key, value in deleted_influencer.items()})
             return jsonify({
                 "message": "Influencer deleted successfully",
                 "deleted_influencer": deleted_influencer
@@ -1,8 +1,9 @@
-from flask import jsonify, request
+from flask import current_app, jsonify, request
 from flask_cors import cross_origin
-from werkzeug.security import generate_password_hash
 from datetime import datetime
+from ..services import ids, passwords, user_search
 from . import api_bp
+from .auth import admin_required
 
 # Try to import mongo_db, but don't fail if it's not available
 try:
@@ -11,8 +12,18 @@ except ImportError:
     mongo_db = None
 
 def init_users_db():
-    """Initialize the users database in MongoDB with default admin user"""
+    """Initialize the users database in MongoDB with default admin user.
+
+    Only runs with ADMIN_SETUP_ENABLED on; every account gets ADMIN_SETUP_PASSWORD.
+    """
     try:
+        if not current_app.config.get("ADMIN_SETUP_ENABLED"):
+            print("Admin setup is disabled (ADMIN_SETUP_ENABLED)")
+            return False
+        password = current_app.config.get("ADMIN_SETUP_PASSWORD")
+        if not password:
+            print("Admin setup requires ADMIN_SETUP_PASSWORD")
+            return False
         if mongo_db is None:
             print("MongoDB not available for admin setup")
             return False
@@ -26,9 +37,12 @@ def init_users_db():
             print("Admin user already exists in MongoDB")
             return True
         
+        # Hash the three default passwords in parallel on the hashing pool
+        admin_hash, john_hash, jane_hash = passwords.hash_passwords([password] * 3)
+        
         # Create default admin user
         admin_user = {
-            'id': 1,
+            'id': ids.next_id('users'),
             'email': 'admin@ussd.com',
             'phone': '+254700000001',
             'username': 'admin',
@@ -39,20 +53,21 @@ def init_users_db():
             'email_verified': True,
             'phone_verified': True,
             'is_active': True,
-            'password_hash': generate_password_hash('password123'),  # Default password
+            'password_hash': admin_hash,
             'last_login': datetime.utcnow(),
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
         
         # Insert admin user
+        admin_user.update(user_search.search_fields(admin_user))
         result = users_collection.insert_one(admin_user)
         admin_user['_id'] = str(result.inserted_id)
         
         # Create additional test users
         test_users = [
             {
-                'id': 2,
+                'id': ids.next_id('users'),
                 'email': 'john@example.com',
                 'phone': '+254700000002',
                 'username': 'john_doe',
@@ -63,13 +78,13 @@ def init_users_db():
                 'email_verified': True,
                 'phone_verified': True,
                 'is_active': True,
-                'password_hash': generate_password_hash('password123'),
+                'password_hash': john_hash,
                 'last_login': datetime.utcnow(),
                 'created_at': datetime.utcnow(),
                 'updated_at': datetime.utcnow()
             },
             {
-                'id': 3,
+                'id': ids.next_id('users'),
                 'email': 'jane@example.com',
                 'phone': '+254700000003',
                 'username': 'jane_smith',
@@ -80,7 +95,7 @@ def init_users_db():
                 'email_verified': True,
                 'phone_verified': False,
                 'is_active': True,
-                'password_hash': generate_password_hash('password123'),
+                'password_hash': jane_hash,
                 'last_login': datetime.utcnow(),
                 'created_at': datetime.utcnow(),
                 'updated_at': datetime.utcnow()
@@ -89,6 +104,7 @@ def init_users_db():
         
         # Insert test users
         for user in test_users:
+            user.update(user_search.search_fields(user))
             result = users_collection.insert_one(user)
             user['_id'] = str(result.inserted_id)
         
@@ -100,17 +116,20 @@ def init_users_db():
         return False
 
 @api_bp.post("/admin/setup")
+@admin_required
 @cross_origin()
-def admin_setup():
-    """Initialize the system with admin users and basic data in MongoDB"""
+def admin_setup(current_user):
+    """Initialize the system with admin users and basic data in MongoDB (admin only, off by default)"""
+    if not current_app.config.get("ADMIN_SETUP_ENABLED"):
+        return jsonify({'message': 'Admin setup is disabled'}), 404
     try:
         success = init_users_db()
         if success:
-        return jsonify({
+            return jsonify({
                 'message': 'Admin setup completed successfully',
                 'database': 'MongoDB',
                 'users_created': 3  # admin + 2 test users
-        }), 200
+            }), 200
         else:
             return jsonify({
                 'message': 'Admin setup failed',
@@ -153,7 +172,3 @@ def admin_status():
             'message': 'Status check error',
             'error': str(e)
         }), 500
-
-# Auto-initialize when the module is imported (only if MongoDB is available)
-if mongo_db is not None:
-    init_users_db()
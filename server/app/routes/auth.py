@@ -3,75 +3,123 @@ from flask_cors import cross_origin
 from functools import wraps
 import jwt
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash, check_password_hash
 import requests
+import uuid
 # Try to import mongo_db, but don't fail if it's not available
 try:
     from ..extensions import mongo_db
 except ImportError:
     mongo_db = None
 from ..models.user import User, UserType
+from ..services import admin_stats, google_auth, ids, passwords, rate_limit, refresh_tokens, revocation, user_cache, user_search
 from . import api_bp
 
+@api_bp.errorhandler(passwords.HashingBusy)
+def handle_hashing_busy(e):
+    """Shed login/register load instead of queueing unbounded hashing work"""
+    response = jsonify({'message': 'Server is busy, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def _issue_token(user_doc):
+    """Mint a short-lived access token; its claims are trusted until it expires"""
+    return jwt.encode({
+        'user_id': user_doc['id'],
+        'user_type': user_doc['user_type'],
+        'is_active': user_doc.get('is_active', True),
+        'jti': uuid.uuid4().hex,
+        'exp': datetime.utcnow() + timedelta(minutes=current_app.config.get('ACCESS_TOKEN_MINUTES', 15))
+    }, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
+
+def _issue_tokens(user_doc, family=None):
+    """Access token plus a single-use refresh token in the given rotation family"""
+    return {
+        'token': _issue_token(user_doc),
+        'refresh_token': refresh_tokens.issue(user_doc['id'], family),
+        'expires_in': current_app.config.get('ACCESS_TOKEN_MINUTES', 15) * 60
+    }
+
+def _decode_request_token():
+    """Decode the bearer token; returns (payload, None) or (None, error response)"""
+    token = None
+    
+    # Get token from header
+    if 'Authorization' in request.headers:
+        auth_header = request.headers['Authorization']
+        try:
+            token = auth_header.split(" ")[1]  # Bearer <token>
+        except IndexError:
+            return None, (jsonify({'message': 'Invalid token format'}), 401)
+    
+    if not token:
+        return None, (jsonify({'message': 'Token is missing'}), 401)
+    
+    try:
+        payload = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        return None, (jsonify({'message': 'Token has expired'}), 401)
+    except jwt.InvalidTokenError:
+        return None, (jsonify({'message': 'Invalid token'}), 401)
+    
+    # Checked in memory against the synced revocation filter
+    if revocation.is_revoked(payload.get('jti')):
+        return None, (jsonify({'message': 'Token has been revoked'}), 401)
+    if payload.get('is_active') is False:
+        return None, (jsonify({'message': 'Account is suspended'}), 401)
+    return payload, None
+
+def request_user_id():
+    """Caller's user id from a valid bearer token, or None (for routes that don't require auth)"""
+    if 'Authorization' not in request.headers:
+        return None
+    payload, _ = _decode_request_token()
+    return payload['user_id'] if payload else None
+
 # JWT token decorator for protected routes
 def jwt_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = None
+        payload, error = _decode_request_token()
+        if error:
+            return error
         
-        # Get token from header
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]  # Bearer <token>
-            except IndexError:
-                return jsonify({'message': 'Invalid token format'}), 401
+        # Get user from the per-process cache (falls back to the database)
+        current_user = user_cache.get_user(payload['user_id'], getattr(api_bp, '_users_db', None))
+        if not current_user:
+            return jsonify({'message': 'User not found'}), 401
         
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
-        
-        try:
-            # Verify token
-            payload = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-            current_user_id = payload['user_id']
-            
-            # Get user from database
-            if mongo_db is not None:
-                user_doc = mongo_db.get_collection("users").find_one({"id": current_user_id})
-                if not user_doc:
-                    return jsonify({'message': 'User not found'}), 401
-                current_user = user_doc
-            else:
-                # Fallback to in-memory storage
-                if hasattr(api_bp, '_users_db'):
-                    current_user = next((u for u in api_bp._users_db if u['id'] == current_user_id), None)
-                    if not current_user:
-                        return jsonify({'message': 'User not found'}), 401
-                else:
-                    # Fallback to SQLAlchemy
-                    current_user = User.query.get(current_user_id)
-                    if not current_user:
-                        return jsonify({'message': 'User not found'}), 401
-                    current_user = current_user.to_dict()
-            
-            # Check if user is active
-            if not current_user.get('is_active', True):
-                return jsonify({'message': 'Account is suspended'}), 401
-                
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Invalid token'}), 401
+        # Check if user is active
+        if not current_user.get('is_active', True):
+            return jsonify({'message': 'Account is suspended'}), 401
         
         return f(current_user, *args, **kwargs)
     
     return decorated_function
 
-# Admin required decorator
+# Claims-only decorator for endpoints that just need the caller's id and type
+def jwt_claims_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        payload, error = _decode_request_token()
+        if error:
+            return error
+        
+        claims = {
+            'id': payload['user_id'],
+            'user_type': payload.get('user_type'),
+            'is_active': payload.get('is_active', True),
+            'jti': payload.get('jti'),
+            'exp': payload.get('exp'),
+        }
+        return f(claims, *args, **kwargs)
+    
+    return decorated_function
+
+# Admin required decorator (trusts the user_type claim; demotions apply on the next refresh)
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        @jwt_required
+        @jwt_claims_required
         def check_admin(current_user, *args, **kwargs):
             if current_user.get('user_type') != 'admin':
                 return jsonify({'message': 'Admin access required'}), 403
@@ -82,6 +130,7 @@ def admin_required(f):
     return decorated_function
 
 @api_bp.post("/auth/register")
+@rate_limit.limit("register", ip="10/minute")
 @cross_origin()
 def register():
     """User registration endpoint"""
@@ -106,9 +155,9 @@ def register():
         
         # Create new user
         user_doc = {
-            "id": mongo_db.get_collection("users").count_documents({}) + 1,
+            "id": ids.next_id("users"),
             "email": email,
-            "password_hash": generate_password_hash(password),
+            "password_hash": passwords.hash_password(password),
             "first_name": first_name,
             "last_name": last_name,
             "user_type": data.get("user_type", "user"),  # Allow custom user type
@@ -120,19 +169,17 @@ def register():
             "updated_at": datetime.utcnow()
         }
         
+        user_doc.update(user_search.search_fields(user_doc))
         result = mongo_db.get_collection("users").insert_one(user_doc)
         user_doc['_id'] = str(result.inserted_id)
+        admin_stats.record_user_change(None, user_doc)
         
-        # Generate JWT token
-        token = jwt.encode({
-            'user_id': user_doc['id'],
-            'user_type': user_doc['user_type'],
-            'exp': datetime.utcnow() + timedelta(hours=24)
-        }, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
+        # Generate access and refresh tokens
+        tokens = _issue_tokens(user_doc)
         
         return jsonify({
             'message': 'User registered successfully',
-            'token': token,
+            **tokens,
             'user': {
                 'id': user_doc['id'],
                 'email': user_doc['email'],
@@ -146,6 +193,7 @@ def register():
     return jsonify({'message': 'Database not available. Please contact administrator.'}), 500
 
 @api_bp.post("/auth/login")
+@rate_limit.limit("login", ip="30/minute", email="5/minute")
 @cross_origin()
 def login():
     """User login endpoint"""
@@ -164,29 +212,28 @@ def login():
             return jsonify({'message': 'Invalid credentials'}), 401
         
         # Check password
-        if not check_password_hash(user_doc['password_hash'], password):
+        if not passwords.verify_password(user_doc.get('password_hash'), password):
             return jsonify({'message': 'Invalid credentials'}), 401
         
         # Check if account is active
         if not user_doc.get('is_active', True):
             return jsonify({'message': 'Account is suspended'}), 401
         
-        # Update last login
+        # Update last login, upgrading the hash if the configured cost changed
+        login_update = {"last_login": datetime.utcnow()}
+        if passwords.needs_rehash(user_doc['password_hash']):
+            login_update["password_hash"] = passwords.hash_password(password)
         mongo_db.get_collection("users").update_one(
             {"_id": user_doc["_id"]},
-            {"$set": {"last_login": datetime.utcnow()}}
+            {"$set": login_update}
         )
         
-        # Generate JWT token
-        token = jwt.encode({
-            'user_id': user_doc['id'],
-            'user_type': user_doc['user_type'],
-            'exp': datetime.utcnow() + timedelta(hours=24)
-        }, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
+        # Generate access and refresh tokens
+        tokens = _issue_tokens(user_doc)
         
         return jsonify({
             'message': 'Login successful',
-            'token': token,
+            **tokens,
             'user': {
                 'id': user_doc['id'],
                 'email': user_doc['email'],
@@ -201,26 +248,23 @@ def login():
     return jsonify({'message': 'Database not available. Please contact administrator.'}), 500
 
 @api_bp.post("/auth/google")
+@rate_limit.limit("google_login", ip="30/minute")
 @cross_origin()
 def google_login():
     """Google OAuth login endpoint"""
     data = request.get_json(force=True) or {}
     
-    if not data.get('id_token'):
+    # The web client posts the credential as `token`
+    id_token = data.get('id_token') or data.get('token')
+    if not id_token:
         return jsonify({'message': 'Google ID token is required'}), 400
     
-    id_token = data['id_token']
-    
     try:
-        # Verify Google ID token (in production, use Google's verification)
-        # For now, we'll accept the token and extract user info
-        # In production, verify with: https://oauth2.googleapis.com/tokeninfo?id_token={id_token}
-        
-        # Extract user info from token (this is simplified - in production verify with Google)
-        user_info = data.get('user_info', {})
-        
-        if not user_info.get('email'):
-            return jsonify({'message': 'Invalid Google token'}), 400
+        # Verified locally against Google's cached signing keys; no per-login network call
+        try:
+            user_info = google_auth.verify_id_token(id_token)
+        except google_auth.GoogleAuthError as e:
+            return jsonify({'message': str(e)}), 401
         
         email = user_info['email'].lower().strip()
         google_id = user_info.get('sub') or user_info.get('id')
@@ -249,7 +293,7 @@ def google_login():
             else:
                 # Create new user
                 user_doc = {
-                    "id": mongo_db.get_collection("users").count_documents({}) + 1,
+                    "id": ids.next_id("users"),
                     "email": email,
                     "google_id": google_id,
                     "first_name": first_name,
@@ -264,19 +308,17 @@ def google_login():
                     "updated_at": datetime.utcnow()
                 }
                 
+                user_doc.update(user_search.search_fields(user_doc))
                 result = mongo_db.get_collection("users").insert_one(user_doc)
                 user_doc['_id'] = str(result.inserted_id)
+                admin_stats.record_user_change(None, user_doc)
             
-            # Generate JWT token
-            token = jwt.encode({
-                'user_id': user_doc['id'],
-                'user_type': user_doc['user_type'],
-                'exp': datetime.utcnow() + timedelta(hours=24)
-            }, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
+            # Generate access and refresh tokens
+            tokens = _issue_tokens(user_doc)
             
             return jsonify({
                 'message': 'Google login successful',
-                'token': token,
+                **tokens,
                 'user': {
                     'id': user_doc['id'],
                     'email': user_doc['email'],
@@ -320,11 +362,13 @@ def update_profile(current_user):
         
         if update_data:
             update_data['updated_at'] = datetime.utcnow()
+            update_data.update(user_search.search_fields({**current_user, **update_data}))
             
             mongo_db.get_collection("users").update_one(
                 {"id": current_user['id']},
                 {"$set": update_data}
             )
+            user_cache.invalidate(current_user['id'])
             
             # Get updated user
             updated_user = mongo_db.get_collection("users").find_one({"id": current_user['id']})
@@ -347,6 +391,7 @@ def update_profile(current_user):
     return jsonify({'message': 'Profile update not available'}), 500
 
 @api_bp.post("/auth/change-password")
+@rate_limit.limit("change_password", ip="10/minute")
 @jwt_required
 @cross_origin()
 def change_password(current_user):
@@ -362,7 +407,7 @@ def change_password(current_user):
     if mongo_db is not None:
         # Verify current password
         user_doc = mongo_db.get_collection("users").find_one({"id": current_user['id']})
-        if not user_doc or not check_password_hash(user_doc['password_hash'], current_password):
+        if not user_doc or not passwords.verify_password(user_doc.get('password_hash'), current_password):
             return jsonify({'message': 'Current password is incorrect'}), 401
         
         # Update password
@@ -370,31 +415,60 @@ def change_password(current_user):
             {"id": current_user['id']},
             {
                 "$set": {
-                    "password_hash": generate_password_hash(new_password),
+                    "password_hash": passwords.hash_password(new_password),
                     "updated_at": datetime.utcnow()
                 }
             }
         )
         
-        return jsonify({'message': 'Password changed successfully'}), 200
+        # Sign out other sessions; this one continues with a fresh refresh token
+        refresh_tokens.revoke_user(current_user['id'])
+        return jsonify({
+            'message': 'Password changed successfully',
+            **_issue_tokens(user_doc)
+        }), 200
     
     return jsonify({'message': 'Password change not available'}), 500
 
 @api_bp.post("/auth/refresh")
+@rate_limit.limit("refresh", ip="60/minute")
 @cross_origin()
 def refresh_token():
-    """Refresh JWT token"""
-    # This would typically validate a refresh token
-    # For now, we'll require re-authentication
-    return jsonify({'message': 'Please login again'}), 401
+    """Exchange a refresh token for a new access/refresh pair"""
+    data = request.get_json(force=True, silent=True) or {}
+    
+    if not data.get('refresh_token'):
+        return jsonify({'message': 'refresh_token is required'}), 400
+    
+    if mongo_db is not None:
+        try:
+            user_id, family = refresh_tokens.rotate(data['refresh_token'])
+        except refresh_tokens.RefreshTokenError as e:
+            return jsonify({'message': str(e)}), 401
+        
+        # Re-read the user so role and suspension changes reach the new access token
+        user_cache.invalidate(user_id)
+        user_doc = user_cache.get_user(user_id)
+        if not user_doc or not user_doc.get('is_active', True):
+            refresh_tokens.revoke_family(family)
+            return jsonify({'message': 'Account is suspended'}), 401
+        
+        return jsonify({
+            'message': 'Token refreshed',
+            **_issue_tokens(user_doc, family)
+        }), 200
+    
+    return jsonify({'message': 'Token refresh not available'}), 500
 
 @api_bp.post("/auth/logout")
-@jwt_required
+@jwt_claims_required
 @cross_origin()
 def logout(current_user):
     """User logout endpoint"""
-    # In a real application, you might blacklist the token
-    # For now, just return success
+    # Revoked until the token would have expired anyway
+    revocation.revoke(current_user['jti'], current_user['exp'])
+    data = request.get_json(force=True, silent=True) or {}
+    refresh_tokens.revoke_token(data.get('refresh_token'))
     return jsonify({'message': 'Logged out successfully'}), 200
 
 
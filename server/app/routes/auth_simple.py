@@ -1,5 +1,6 @@
 from flask import jsonify, request
 from . import api_bp
+from ..services import rate_limit
 from flask_cors import cross_origin
 import hashlib
 from datetime import datetime
@@ -15,6 +16,7 @@ def generate_simple_token(user_id, email):
     return hashlib.md5(token_string.encode()).hexdigest()
 
 @api_bp.post("/auth/simple/register")
+@rate_limit.limit("simple_register", ip="10/minute")
 @cross_origin()
 def simple_register():
     """Simplified user registration endpoint"""
@@ -75,6 +77,7 @@ def simple_register():
         return jsonify({'message': f'Registration error: {str(e)}'}), 500
 
 @api_bp.post("/auth/simple/login")
+@rate_limit.limit("simple_login", ip="30/minute", email="5/minute")
 @cross_origin()
 def simple_login():
     """Simplified user login endpoint"""
@@ -142,6 +145,7 @@ def list_simple_users():
         return jsonify({'message': f'Error listing users: {str(e)}'}), 500
 
 @api_bp.post("/auth/simple/create-admin")
+@rate_limit.limit("simple_create_admin", ip="5/minute")
 @cross_origin()
 def create_admin():
     """Create admin user directly"""
@@ -0,0 +1,189 @@
+from datetime import datetime, timedelta, timezone
+from flask import jsonify, request
+from flask_cors import cross_origin
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+from ..services import earnings, ids, leaderboard, ledger, rollups
+from .auth import admin_required, jwt_claims_required, jwt_required
+from . import api_bp
+
+
+def _can_access_influencer(current_user, influencer_id):
+    """Admins see every influencer; other users only the influencer linked to them"""
+    if current_user.get('user_type') == 'admin':
+        return True
+    influencer = mongo_db.get_collection("influencers").find_one({"id": influencer_id}, {"user_id": 1}) or {}
+    return influencer.get("user_id") is not None and influencer.get("user_id") == current_user.get('id')
+
+
+@api_bp.get("/influencers/top")
+@cross_origin()
+def top_influencers():
+    """Top influencers by received, served from the incrementally maintained leaderboard"""
+    try:
+        n = int(request.args.get("n", 10))
+    except ValueError:
+        return jsonify({'message': 'n must be an integer'}), 400
+    if n < 1 or n > 1000:
+        return jsonify({'message': 'n must be between 1 and 1000'}), 400
+    
+    return jsonify(leaderboard.top(n))
+
+
+@api_bp.get("/influencers/<int:influencer_id>/earnings")
+@cross_origin()
+def get_influencer_earnings(influencer_id):
+    """Current received total for an influencer (sharded counters summed, cached)"""
+    return jsonify({
+        "influencer_id": influencer_id,
+        "received": earnings.get_received(influencer_id)
+    })
+
+
+@api_bp.post("/influencers/<int:influencer_id>/earnings")
+@admin_required
+@cross_origin()
+def add_influencer_earnings(current_user, influencer_id):
+    """Atomically add an amount to an influencer's received total (admin only)"""
+    data = request.get_json(force=True) or {}
+    
+    try:
+        amount = int(data.get("amount"))
+    except (TypeError, ValueError):
+        return jsonify({'message': 'amount must be an integer'}), 400
+    
+    if not earnings.increment_received(influencer_id, amount):
+        return jsonify({'message': 'Influencer not found'}), 404
+    
+    return jsonify({
+        'message': 'Earnings recorded successfully',
+        'influencer_id': influencer_id,
+        'received': earnings.get_received(influencer_id)
+    }), 200
+
+
+@api_bp.post("/influencers/<int:influencer_id>/earnings/shard")
+@admin_required
+@cross_origin()
+def shard_influencer_earnings(current_user, influencer_id):
+    """Spread a hot influencer's counter over shard documents (admin only)"""
+    data = request.get_json(silent=True) or {}
+    
+    if not earnings.mark_hot(influencer_id, data.get("shards")):
+        return jsonify({'message': 'Sharded counters require MongoDB'}), 400
+    
+    return jsonify({'message': 'Earnings counter sharded successfully'}), 200
+
+
+def _parse_utc(value):
+    """ISO 8601 date/time as naive UTC; offsets (+03:00, Z) are converted, naive input is taken as UTC"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+@api_bp.get("/influencers/<int:influencer_id>/earnings/series")
+@jwt_claims_required
+@cross_origin()
+def get_influencer_earnings_series(current_user, influencer_id):
+    """Earnings time series over a range, read from hourly/daily rollups"""
+    if mongo_db is None:
+        return jsonify({'message': 'Earnings history not available'}), 500
+    if not _can_access_influencer(current_user, influencer_id):
+        return jsonify({'message': 'Access denied'}), 403
+    
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in rollups.GRANULARITIES:
+        return jsonify({'message': 'granularity must be hour or day'}), 400
+    
+    try:
+        end = _parse_utc(request.args['to']) if request.args.get('to') else datetime.utcnow()
+        start = _parse_utc(request.args['from']) if request.args.get('from') else end - timedelta(days=30)
+    except ValueError:
+        return jsonify({'message': 'from and to must be ISO 8601 dates'}), 400
+    
+    # Keep responses bounded: about a year of days or a month of hours
+    max_span = timedelta(days=366) if granularity == 'day' else timedelta(days=31)
+    if start >= end or end - start > max_span:
+        return jsonify({'message': f'Range must be positive and at most {max_span.days} days for {granularity} buckets'}), 400
+    
+    series = rollups.get_series(influencer_id, start, end, granularity)
+    return jsonify({
+        'influencer_id': influencer_id,
+        'granularity': granularity,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'total': sum(point['amount'] for point in series),
+        'series': series
+    }), 200
+
+
+@api_bp.get("/influencers/<int:influencer_id>/balance")
+@jwt_claims_required
+@cross_origin()
+def get_influencer_balance(current_user, influencer_id):
+    """Withdrawable balance from the ledger (latest snapshot plus newer entries)"""
+    if mongo_db is None:
+        return jsonify({'message': 'Ledger not available'}), 500
+    if not _can_access_influencer(current_user, influencer_id):
+        return jsonify({'message': 'Access denied'}), 403
+    
+    return jsonify({
+        'influencer_id': influencer_id,
+        'balance': ledger.get_influencer_balance(influencer_id)
+    }), 200
+
+
+@api_bp.post("/influencers/<int:influencer_id>/withdrawals")
+@jwt_required
+@cross_origin()
+def request_withdrawal(current_user, influencer_id):
+    """Request a withdrawal; the amount is debited from the ledger immediately"""
+    if mongo_db is None:
+        return jsonify({'message': 'Withdrawals not available'}), 500
+    if not _can_access_influencer(current_user, influencer_id):
+        return jsonify({'message': 'Access denied'}), 403
+    
+    data = request.get_json(force=True) or {}
+    try:
+        amount = int(data.get("amount"))
+    except (TypeError, ValueError):
+        return jsonify({'message': 'amount must be an integer'}), 400
+    if amount <= 0:
+        return jsonify({'message': 'amount must be positive'}), 400
+    if not ledger.can_withdraw(influencer_id, amount):
+        return jsonify({'message': 'Insufficient balance'}), 400
+    
+    coll = mongo_db.get_collection("withdrawals")
+    withdrawal = {
+        "id": ids.next_id("withdrawals"),
+        "influencer_id": influencer_id,
+        "amount": amount,
+        "phone": data.get("phone"),
+        "status": "pending",
+        "external_ref": None,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+    coll.insert_one(withdrawal)
+    ledger.debit_withdrawal(withdrawal["id"], influencer_id, amount)
+    
+    # Two concurrent requests can both pass the check above; undo the loser
+    if ledger.get_influencer_balance(influencer_id) < 0:
+        ledger.reverse_withdrawal(withdrawal["id"], influencer_id, amount)
+        coll.update_one({"id": withdrawal["id"]}, {"$set": {"status": "rejected", "updated_at": datetime.utcnow()}})
+        return jsonify({'message': 'Insufficient balance'}), 400
+    
+    return jsonify({
+        'message': 'Withdrawal requested successfully',
+        'withdrawal': {
+            'id': withdrawal['id'],
+            'amount': amount,
+            'status': withdrawal['status']
+        }
+    }), 201
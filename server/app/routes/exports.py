@@ -0,0 +1,133 @@
+from datetime import datetime
+
+from flask import jsonify, request
+from flask_cors import cross_origin
+
+from ..models import Influencer, Payment, Subscription, User
+from ..utils.export import ExportError, select_fields, stream_rows
+from .auth import admin_required
+from . import api_bp
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+BATCH_SIZE = 1000
+
+# dataset -> where it lives, which columns may leave the server, and which equality filters apply
+DATASETS = {
+    "users": {
+        "collection": "users",
+        "model": User,
+        "fields": ("id", "email", "phone", "username", "first_name", "last_name", "user_type",
+                   "is_active", "is_suspended", "email_verified", "phone_verified",
+                   "last_login", "created_at", "updated_at"),
+        "default": ("id", "email", "phone", "first_name", "last_name", "user_type", "is_active", "created_at"),
+        "filters": {"user_type": str, "is_active": bool},
+    },
+    "influencers": {
+        "collection": "influencers",
+        "model": Influencer,
+        "fields": ("id", "name", "phone", "ussd_shortcode", "status", "received", "created_at", "updated_at"),
+        "default": ("id", "name", "phone", "ussd_shortcode", "status", "received"),
+        "filters": {"status": str},
+    },
+    "subscriptions": {
+        "collection": "subscribers",
+        "model": Subscription,
+        "fields": ("id", "influencer_id", "fan_phone", "amount", "frequency", "is_active",
+                   "next_charge_at", "created_at"),
+        "default": ("influencer_id", "fan_phone", "amount", "frequency", "is_active", "created_at"),
+        "filters": {"influencer_id": int, "is_active": bool},
+    },
+    "payments": {
+        "collection": "payments",
+        "model": Payment,
+        "fields": ("id", "subscription_id", "influencer_id", "amount", "status", "phone", "external_ref",
+                   "receipt", "result_desc", "created_at", "paid_at", "updated_at"),
+        "default": ("id", "influencer_id", "amount", "status", "external_ref", "receipt", "created_at", "paid_at"),
+        "filters": {"status": str, "influencer_id": int},
+    },
+}
+
+
+def _filters(spec):
+    """Equality filters from the query string plus an optional created_at range"""
+    filters = {}
+    for name, kind in spec["filters"].items():
+        raw = request.args.get(name)
+        if raw is None or raw == "":
+            continue
+        if kind is bool:
+            filters[name] = raw.lower() in ("1", "true", "yes")
+        elif kind is int:
+            try:
+                filters[name] = int(raw)
+            except ValueError:
+                raise ExportError(f"{name} must be an integer")
+        else:
+            filters[name] = raw
+    created = {}
+    for name, op in (("created_from", "$gte"), ("created_to", "$lt")):
+        if request.args.get(name):
+            try:
+                created[op] = datetime.fromisoformat(request.args[name])
+            except ValueError:
+                raise ExportError(f"{name} must be an ISO date")
+    return filters, created
+
+
+def _mongo_rows(spec, fields, filters, created):
+    query = dict(filters)
+    if created:
+        query["created_at"] = created
+    projection = {field: 1 for field in fields}
+    projection["_id"] = 0
+    cursor = mongo_db.get_collection(spec["collection"]).find(query, projection).batch_size(BATCH_SIZE)
+    try:
+        yield from cursor
+    finally:
+        # Client disconnected mid-download: release the server-side cursor
+        cursor.close()
+
+
+def _sql_rows(spec, fields, filters, created):
+    """Build the query up front, so a filter the model can't apply is a 400 rather than a
+    failure halfway through an already-started stream"""
+    model = spec["model"]
+    columns = model.__table__.columns
+    unsupported = [name for name in filters if name not in columns]
+    if unsupported:
+        raise ExportError(f"Filter not available for this dataset: {', '.join(unsupported)}")
+    query = model.query.filter_by(**filters)
+    if "$gte" in created:
+        query = query.filter(model.created_at >= created["$gte"])
+    if "$lt" in created:
+        query = query.filter(model.created_at < created["$lt"])
+    rows = query.order_by(model.id).yield_per(BATCH_SIZE)
+    return ({field: getattr(obj, field, None) for field in fields} for obj in rows)
+
+
+@api_bp.get("/admin/export/<dataset>")
+@admin_required
+@cross_origin()
+def export_dataset(current_user, dataset):
+    """Stream a dataset as CSV or NDJSON (admin only)
+
+    Query: format=csv|ndjson, fields=a,b,c, created_from/created_to (ISO dates)
+    and the dataset's equality filters.
+    """
+    spec = DATASETS.get(dataset)
+    if spec is None:
+        return jsonify({'message': f'Unknown dataset. Must be one of: {", ".join(DATASETS)}'}), 404
+
+    try:
+        fields = select_fields(request.args.get('fields'), spec["default"], spec["fields"])
+        filters, created = _filters(spec)
+        rows = (_mongo_rows if mongo_db is not None else _sql_rows)(spec, fields, filters, created)
+        filename = f"{dataset}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+        return stream_rows(rows, fields, request.args.get('format', 'csv'), filename)
+    except ExportError as e:
+        return jsonify({'message': str(e)}), 400
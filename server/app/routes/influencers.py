@@ -1,9 +1,14 @@
 from flask import jsonify, request, abort
 from flask import current_app
 from ..extensions import db
-from ..models import Influencer, InfluencerStatus
+from sqlalchemy import and_, or_
+from ..models import Influencer
+from ..models.influencer import InfluencerStatus
 from ..schemas import InfluencerSchema
+from ..services import audit, catalog, earnings, ids, influencer_search, leaderboard, shortcodes
+from ..utils.pagination import PaginationError, encode_cursor, ensure_sort_index, find_page
 from . import api_bp
+from .auth import request_user_id
 from datetime import datetime
 
 # Try to import mongo_db, but don't fail if it's not available
@@ -15,50 +20,99 @@ except ImportError:
 
 @api_bp.get("/influencers")
 def list_influencers():
-    # Debug logging
-    print(f"DEBUG: mongo_db available: {mongo_db is not None}")
-    print(f"DEBUG: mongo_db type: {type(mongo_db)}")
+    """Public influencer listing, served from a pre-serialized snapshot with ETag/304"""
+    try:
+        return catalog.serve(_listing)
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+
+
+def _listing(params):
+    """`limit`/`cursor`, `status`, `sort` and `fields` are pushed down into the query,
+    so only the requested page and columns leave the database"""
+    fields, sort = params["fields"], params["sort"]
+    query = {"status": params["status"]} if params["status"] else {}
     
     # If Mongo is available, read from Mongo and normalize keys for frontend
     if mongo_db is not None:
-        print("DEBUG: Using MongoDB")
         coll = mongo_db.get_collection("influencers")
-        docs = list(coll.find({}, {"_id": 0}))
-        print(f"DEBUG: Found {len(docs)} docs from MongoDB")
-        normalized = [
-            {
-                "id": d.get("id"),
-                "name": d.get("name", ""),
-                "phone": d.get("phone", ""),
-                "received": d.get("received", 0),
-                "imageUrl": d.get("imageUrl") or d.get("image_url") or "",
-                "ussd_shortcode": d.get("ussd_shortcode", ""),
-                "status": d.get("status", "active"),
-                "created_at": d.get("created_at"),
-                "updated_at": d.get("updated_at")
-            }
-            for d in docs
-        ]
-        return jsonify(normalized)
+        ensure_sort_index(coll, "status", sort=sort)
+        ensure_sort_index(coll, sort=sort)
+        if params["paged"]:
+            docs, pagination = find_page(
+                coll, query, catalog.projection(fields, sort),
+                limit=params["limit"], cursor=params["cursor"], total=params["total"], sort=sort
+            )
+        else:
+            docs = coll.find(query, catalog.projection(fields, sort)).sort(sort)
+        normalized = [catalog.normalize(d, fields) for d in docs]
+        if params["paged"]:
+            return {"influencers": normalized, "pagination": pagination}
+        return normalized
     
-    print("DEBUG: Falling back to SQLAlchemy")
-    influencers = Influencer.query.order_by(Influencer.id).all()
-    # Normalize SQLAlchemy model output to camelCase for the frontend
-    normalized = [
-        {
-            "id": inf.id,
-            "name": inf.name,
-            "phone": inf.phone or "",
-            "received": inf.received or 0,
-            "imageUrl": getattr(inf, "image_url", None) or "",
-            "ussd_shortcode": inf.ussd_shortcode or "",
-            "status": inf.status or "active",
-            "created_at": inf.created_at.isoformat() if inf.created_at else None,
-            "updated_at": inf.updated_at.isoformat() if inf.updated_at else None
+    # SQLAlchemy: same keyset page, selecting only the needed columns
+    columns = {"imageUrl": Influencer.image_url}
+    selected = {field: columns.get(field, getattr(Influencer, field)) for field in fields}
+    (sort_field, direction), (tie, _) = sort
+    sort_column, tie_column = getattr(Influencer, sort_field), getattr(Influencer, tie)
+    rows = Influencer.query.with_entities(
+        *[column.label(field) for field, column in selected.items()],
+        sort_column.label("_sort"), tie_column.label("_tie")
+    )
+    if params["status"]:
+        rows = rows.filter(Influencer.status == params["status"])
+    if params["cursor"] is not None:
+        value, item_id = params["cursor"]
+        if isinstance(value, str) and sort_field == "created_at":
+            value = datetime.fromisoformat(value)
+        if direction < 0:
+            rows = rows.filter(or_(sort_column < value, and_(sort_column == value, tie_column < item_id)))
+        else:
+            rows = rows.filter(or_(sort_column > value, and_(sort_column == value, tie_column > item_id)))
+    order = (sort_column.desc(), tie_column.desc()) if direction < 0 else (sort_column.asc(), tie_column.asc())
+    rows = rows.order_by(*order)
+    if params["paged"]:
+        rows = rows.limit(params["limit"] + 1)
+    rows = rows.all()
+    
+    has_more = params["paged"] and len(rows) > params["limit"]
+    if params["paged"]:
+        rows = rows[:params["limit"]]
+    # Normalize SQLAlchemy rows to camelCase for the frontend
+    normalized = [catalog.normalize(row._asdict(), fields) for row in rows]
+    if not params["paged"]:
+        return normalized
+    return {
+        "influencers": normalized,
+        "pagination": {
+            "limit": params["limit"],
+            "has_more": has_more,
+            "next_cursor": encode_cursor(rows[-1]._sort, rows[-1]._tie) if has_more else None,
         }
-        for inf in influencers
-    ]
-    return jsonify(normalized)
+    }
+
+
+@api_bp.get("/influencers/search")
+def search_influencers():
+    """Fuzzy name/shortcode search from the in-memory trigram index"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"message": "q is required"}), 400
+    limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+    return jsonify({"query": query, "results": influencer_search.search(query, limit, _searchable)})
+
+
+def _searchable():
+    """Every active influencer's searchable fields, for (re)building the index"""
+    fields = list(influencer_search.LISTED_FIELDS) + ["status"]
+    if mongo_db is not None:
+        coll = mongo_db.get_collection("influencers")
+        return coll.find({"status": {"$in": ["active", None]}}, catalog.projection(fields, []))
+    rows = Influencer.query.filter(Influencer.status == InfluencerStatus.ACTIVE.value).with_entities(
+        Influencer.id, Influencer.name, Influencer.ussd_shortcode,
+        Influencer.image_url.label("imageUrl"), Influencer.status
+    )
+    return [row._asdict() for row in rows]
 
 
 @api_bp.get("/influencers/<int:influencer_id>")
@@ -97,6 +151,16 @@ def get_influencer(influencer_id):
     return jsonify(normalized)
 
 
+def _reserve_shortcode(payload, influencer_id=None):
+    """Claim the requested shortcode, or allocate the next free one; aborts with 400 when taken"""
+    try:
+        if payload.get("ussd_shortcode"):
+            return shortcodes.claim(payload["ussd_shortcode"], influencer_id)
+        return shortcodes.allocate(influencer_id)
+    except shortcodes.ShortcodeError as e:
+        abort(400, description=str(e))
+
+
 @api_bp.post("/influencers")
 def create_influencer():
     payload = request.get_json(force=True) or {}
@@ -105,45 +169,45 @@ def create_influencer():
     if not payload.get("name"):
         abort(400, description="Name is required")
     
-    if not payload.get("ussd_shortcode"):
-        abort(400, description="USSD shortcode is required")
-    
-    # Check if shortcode already exists
+    # A requested shortcode is claimed atomically; otherwise the allocator assigns the next free one
     if mongo_db is not None:
         coll = mongo_db.get_collection("influencers")
-        existing = coll.find_one({"ussd_shortcode": payload.get("ussd_shortcode")})
-        if existing:
-            abort(400, description="USSD shortcode already exists")
+        influencer_id = ids.next_id("influencers")
+        shortcode = _reserve_shortcode(payload, influencer_id)
         
         doc = {
-            "id": coll.count_documents({}) + 1,  # Simple ID generation
+            "id": influencer_id,
             "phone": payload.get("phone"),
             "name": payload.get("name", ""),
             "imageUrl": payload.get("imageUrl") or payload.get("image_url"),
-            "ussd_shortcode": payload.get("ussd_shortcode"),
+            "ussd_shortcode": shortcode,
             "received": payload.get("received", 0),
             "status": payload.get("status", "active"),
             "created_at": datetime.utcnow().isoformat(),
             "updated_at": datetime.utcnow().isoformat()
         }
-        coll.insert_one(doc)
+        try:
+            coll.insert_one(doc)
+        except Exception:
+            shortcodes.release(shortcode)
+            raise
+        doc.pop("_id", None)
+        leaderboard.observe(doc)
+        influencer_search.observe(doc, catalog.invalidate())
         return jsonify(doc), 201
     
-    # Check if shortcode already exists in SQLAlchemy
-    existing = Influencer.query.filter_by(ussd_shortcode=payload.get("ussd_shortcode")).first()
-    if existing:
-        abort(400, description="USSD shortcode already exists")
-    
     influencer = Influencer(
         phone=payload.get("phone"),
         name=payload.get("name", ""),
         image_url=payload.get("imageUrl") or payload.get("image_url"),
-        ussd_shortcode=payload.get("ussd_shortcode"),
+        ussd_shortcode=_reserve_shortcode(payload),
         received=payload.get("received", 0),
         status=payload.get("status", InfluencerStatus.ACTIVE.value)
     )
     db.session.add(influencer)
     db.session.commit()
+    leaderboard.invalidate()
+    catalog.invalidate()
     return jsonify(InfluencerSchema().dump(influencer)), 201
 
 
@@ -157,33 +221,44 @@ def update_influencer(influencer_id):
         if not doc:
             abort(404, description="Influencer not found")
         
-        # Check if shortcode is being changed and if it already exists
-        if payload.get("ussd_shortcode") and payload.get("ussd_shortcode") != doc.get("ussd_shortcode"):
-            existing = coll.find_one({"ussd_shortcode": payload.get("ussd_shortcode")})
-            if existing:
-                abort(400, description="USSD shortcode already exists")
+        # A changed shortcode is claimed before the write and the old one released after it
+        changed_shortcode = payload.get("ussd_shortcode") and payload.get("ussd_shortcode") != doc.get("ussd_shortcode")
+        if changed_shortcode:
+            _reserve_shortcode(payload, influencer_id)
         
         update_data = {
             "phone": payload.get("phone", doc.get("phone")),
             "name": payload.get("name", doc.get("name")),
             "imageUrl": payload.get("imageUrl") or payload.get("image_url") or doc.get("imageUrl"),
             "ussd_shortcode": payload.get("ussd_shortcode", doc.get("ussd_shortcode")),
-            "received": payload.get("received", doc.get("received")),
             "status": payload.get("status", doc.get("status")),
             "updated_at": datetime.utcnow().isoformat()
         }
         
-        coll.update_one({"id": influencer_id}, {"$set": update_data})
+        try:
+            coll.update_one({"id": influencer_id}, {"$set": update_data})
+        except Exception:
+            if changed_shortcode:
+                shortcodes.release(payload.get("ussd_shortcode"))
+            raise
+        if changed_shortcode:
+            shortcodes.release(doc.get("ussd_shortcode"))
+        # Earnings go through the counter service so concurrent payments aren't lost
+        if payload.get("received") is not None:
+            earnings.set_received(influencer_id, payload.get("received"))
+        if payload.get("received_delta"):
+            earnings.increment_received(influencer_id, payload.get("received_delta"))
         updated_doc = coll.find_one({"id": influencer_id}, {"_id": 0})
+        leaderboard.invalidate()
+        influencer_search.observe(updated_doc, catalog.invalidate())
         return jsonify(updated_doc)
     
     influencer = Influencer.query.get_or_404(influencer_id)
     
-    # Check if shortcode is being changed and if it already exists
-    if payload.get("ussd_shortcode") and payload.get("ussd_shortcode") != influencer.ussd_shortcode:
-        existing = Influencer.query.filter_by(ussd_shortcode=payload.get("ussd_shortcode")).first()
-        if existing:
-            abort(400, description="USSD shortcode already exists")
+    # Check if shortcode is being changed and if it is free
+    previous_shortcode = influencer.ussd_shortcode
+    if payload.get("ussd_shortcode") and payload.get("ussd_shortcode") != previous_shortcode:
+        _reserve_shortcode(payload)
     
     if payload.get("name"):
         influencer.name = payload.get("name")
@@ -193,12 +268,19 @@ def update_influencer(influencer_id):
         influencer.image_url = payload.get("imageUrl") or payload.get("image_url")
     if payload.get("ussd_shortcode"):
         influencer.ussd_shortcode = payload.get("ussd_shortcode")
-    if payload.get("received") is not None:
-        influencer.received = payload.get("received")
     if payload.get("status"):
         influencer.status = payload.get("status")
     
     db.session.commit()
+    if influencer.ussd_shortcode != previous_shortcode:
+        shortcodes.release(previous_shortcode)
+    if payload.get("received") is not None:
+        earnings.set_received(influencer_id, payload.get("received"))
+    if payload.get("received_delta"):
+        earnings.increment_received(influencer_id, payload.get("received_delta"))
+    db.session.refresh(influencer)
+    leaderboard.invalidate()
+    catalog.invalidate()
     return jsonify(InfluencerSchema().dump(influencer))
 
 
@@ -206,14 +288,25 @@ def update_influencer(influencer_id):
 def delete_influencer(influencer_id):
     if mongo_db is not None:
         coll = mongo_db.get_collection("influencers")
-        result = coll.delete_one({"id": influencer_id})
-        if result.deleted_count == 0:
+        deleted = coll.find_one_and_delete(
+            {"id": influencer_id},
+            projection={"_id": 0, "name": 1, "phone": 1, "ussd_shortcode": 1, "status": 1}
+        )
+        if deleted is None:
             abort(404, description="Influencer not found")
+        audit.record("delete", "influencer", influencer_id, request_user_id(),
+                     {key: [value, None] for key, value in deleted.items()})
+        shortcodes.release(deleted.get("ussd_shortcode"))
+        leaderboard.invalidate()
+        influencer_search.forget(influencer_id, catalog.invalidate())
         return jsonify({"message": "Influencer deleted successfully"})
     
     influencer = Influencer.query.get_or_404(influencer_id)
     db.session.delete(influencer)
     db.session.commit()
+    shortcodes.release(influencer.ussd_shortcode)
+    leaderboard.invalidate()
+    catalog.invalidate()
     return jsonify({"message": "Influencer deleted successfully"})
 
 
@@ -221,17 +314,24 @@ def delete_influencer(influencer_id):
 def suspend_influencer(influencer_id):
     if mongo_db is not None:
         coll = mongo_db.get_collection("influencers")
-        result = coll.update_one(
+        before = coll.find_one_and_update(
             {"id": influencer_id}, 
-            {"$set": {"status": "suspended", "updated_at": datetime.utcnow().isoformat()}}
+            {"$set": {"status": "suspended", "updated_at": datetime.utcnow().isoformat()}},
+            projection={"_id": 0, "status": 1}
         )
-        if result.matched_count == 0:
+        if before is None:
             abort(404, description="Influencer not found")
+        audit.record("suspend", "influencer", influencer_id, request_user_id(),
+                     audit.diff(before, {"status": "suspended"}))
+        leaderboard.invalidate()
+        influencer_search.forget(influencer_id, catalog.invalidate())
         return jsonify({"message": "Influencer suspended successfully"})
     
     influencer = Influencer.query.get_or_404(influencer_id)
     influencer.status = InfluencerStatus.SUSPENDED.value
     db.session.commit()
+    leaderboard.invalidate()
+    catalog.invalidate()
     return jsonify({"message": "Influencer suspended successfully"})
 
 
@@ -239,17 +339,24 @@ def suspend_influencer(influencer_id):
 def activate_influencer(influencer_id):
     if mongo_db is not None:
         coll = mongo_db.get_collection("influencers")
-        result = coll.update_one(
+        before = coll.find_one_and_update(
             {"id": influencer_id}, 
-            {"$set": {"status": "active", "updated_at": datetime.utcnow().isoformat()}}
+            {"$set": {"status": "active", "updated_at": datetime.utcnow().isoformat()}},
+            projection={"_id": 0, "status": 1}
         )
-        if result.matched_count == 0:
+        if before is None:
             abort(404, description="Influencer not found")
+        audit.record("activate", "influencer", influencer_id, request_user_id(),
+                     audit.diff(before, {"status": "active"}))
+        leaderboard.invalidate()
+        catalog.invalidate()
         return jsonify({"message": "Influencer activated successfully"})
     
     influencer = Influencer.query.get_or_404(influencer_id)
     influencer.status = InfluencerStatus.ACTIVE.value
     db.session.commit()
+    leaderboard.invalidate()
+    catalog.invalidate()
     return jsonify({"message": "Influencer activated successfully"})
 
 
@@ -257,17 +364,29 @@ def activate_influencer(influencer_id):
 def terminate_influencer(influencer_id):
     if mongo_db is not None:
         coll = mongo_db.get_collection("influencers")
-        result = coll.update_one(
+        # The shortcode goes back to the pool, so a terminated influencer no longer holds it
+        before = coll.find_one_and_update(
             {"id": influencer_id}, 
-            {"$set": {"status": "terminated", "updated_at": datetime.utcnow().isoformat()}}
+            {"$set": {"status": "terminated", "ussd_shortcode": None, "updated_at": datetime.utcnow().isoformat()}},
+            projection={"_id": 0, "status": 1, "ussd_shortcode": 1}
         )
-        if result.matched_count == 0:
+        if before is None:
             abort(404, description="Influencer not found")
+        shortcodes.release(before.get("ussd_shortcode"))
+        audit.record("terminate", "influencer", influencer_id, request_user_id(),
+                     audit.diff(before, {"status": "terminated", "ussd_shortcode": None}))
+        leaderboard.invalidate()
+        influencer_search.forget(influencer_id, catalog.invalidate())
         return jsonify({"message": "Influencer terminated successfully"})
     
     influencer = Influencer.query.get_or_404(influencer_id)
+    released = influencer.ussd_shortcode
     influencer.status = InfluencerStatus.TERMINATED.value
+    influencer.ussd_shortcode = None
     db.session.commit()
+    shortcodes.release(released)
+    leaderboard.invalidate()
+    catalog.invalidate()
     return jsonify({"message": "Influencer terminated successfully"})
 
 
@@ -1,4 +1,6 @@
 from flask import jsonify, request
+from ..services import catalog, influencer_search, shortcodes
+from ..utils.pagination import PaginationError, list_page
 from . import api_bp
 
 # Import the shared data from admin_influencers
@@ -15,11 +17,39 @@ except ImportError:
             "imageUrl": ""
         }
     ]
+    shortcodes.bind_store(INFLUENCERS_DB)
 
 @api_bp.get("/influencers")
 def list_simple_influencers():
-    """Public endpoint to list all influencers"""
-    return jsonify(INFLUENCERS_DB)
+    """Public endpoint to list influencers (`limit`/`cursor`, `status`, `sort`, `fields`),
+    served from a pre-serialized snapshot with ETag/304"""
+    try:
+        return catalog.serve(_listing)
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+
+def _listing(params):
+    items = INFLUENCERS_DB
+    if params["status"]:
+        items = [inf for inf in items if inf.get("status", "active") == params["status"]]
+    if not params["paged"]:
+        return [catalog.normalize(inf, params["fields"]) for inf in items]
+    page, pagination = list_page(
+        items, limit=params["limit"], cursor=params["cursor"], total=params["total"], sort=params["sort"]
+    )
+    return {
+        "influencers": [catalog.normalize(inf, params["fields"]) for inf in page],
+        "pagination": pagination
+    }
+
+@api_bp.get("/influencers/search")
+def search_simple_influencers():
+    """Fuzzy name/shortcode search from the in-memory trigram index"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"message": "q is required"}), 400
+    limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+    return jsonify({"query": query, "results": influencer_search.search(query, limit, lambda: INFLUENCERS_DB)})
 
 @api_bp.post("/influencers")
 def create_influencer():
@@ -88,22 +118,39 @@ def populate_demo_influencers():
         }
     ]
     
-    # Add each sample influencer to the shared database
-    added_count = 0
+    # Add each sample influencer to the shared database, deduping on phone with a set
+    known_phones = {inf["phone"] for inf in INFLUENCERS_DB}
+    next_id = max((inf["id"] for inf in INFLUENCERS_DB), default=0) + 1
+    new_influencers = []
     for influencer_data in sample_influencers:
+        if influencer_data["phone"] in known_phones:
+            continue
+        # Keep the sample's code when it is free; the allocator is the only source of truth
         try:
-            # Check if phone already exists
-            if not any(inf["phone"] == influencer_data["phone"] for inf in INFLUENCERS_DB):
-                new_id = max(inf["id"] for inf in INFLUENCERS_DB) + 1 if INFLUENCERS_DB else 1
-                new_influencer = {
-                    "id": new_id,
-                    **influencer_data,
-                    "created_at": "2025-08-10T20:00:00Z"
-                }
-                INFLUENCERS_DB.append(new_influencer)
-                added_count += 1
-        except Exception as e:
-            print(f"Error adding {influencer_data['name']}: {e}")
+            shortcode = shortcodes.claim(influencer_data["ussd_shortcode"], next_id)
+        except shortcodes.ShortcodeTaken:
+            try:
+                shortcode = shortcodes.allocate(next_id)
+            except shortcodes.ShortcodeError:
+                break
+        new_influencer = {
+            "id": next_id,
+            **influencer_data,
+            "ussd_shortcode": shortcode,
+            "created_at": "2025-08-10T20:00:00Z"
+        }
+        new_influencers.append(new_influencer)
+        known_phones.add(influencer_data["phone"])
+        next_id += 1
+    INFLUENCERS_DB.extend(new_influencers)
+    added_count = len(new_influencers)
+    
+    if added_count:
+        # One catalogue bump covers the whole batch
+        version = catalog.invalidate()
+        for new_influencer in new_influencers:
+            influencer_search.observe(new_influencer, version)
+            version = None
     
     return jsonify({
         "message": f"Successfully added {added_count} demo influencers",
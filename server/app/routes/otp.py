@@ -0,0 +1,70 @@
+from datetime import datetime
+
+from flask import jsonify, request
+from flask_cors import cross_origin
+
+from . import api_bp
+from ..services import otp, rate_limit, user_cache
+from ..utils.phone import clean_msisdn, normalize_msisdn
+from .auth import request_user_id
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+
+@api_bp.post("/auth/otp/request")
+@rate_limit.limit("otp_request", ip="20/minute", phone="5/hour")
+@cross_origin()
+def request_otp():
+    """Send a verification code to a phone number"""
+    data = request.get_json(force=True) or {}
+    
+    if not data.get('phone'):
+        return jsonify({'message': 'phone is required'}), 400
+    
+    try:
+        otp.request_code(data['phone'])
+    except otp.OtpThrottled as e:
+        response = jsonify({'message': str(e)})
+        response.headers['Retry-After'] = str(max(int(e.retry_after + 0.999), 1))
+        return response, 429
+    except otp.OtpError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify({'message': 'Verification code sent'}), 202
+
+
+@api_bp.post("/auth/otp/verify")
+@rate_limit.limit("otp_verify", ip="30/minute", phone="10/minute")
+@cross_origin()
+def verify_otp():
+    """Verify a code sent by /auth/otp/request.
+
+    With a bearer token, the caller's own account is marked phone_verified when
+    its stored number (in whatever form it was saved) is the verified one.
+    """
+    data = request.get_json(force=True) or {}
+    
+    if not data.get('phone') or not data.get('code'):
+        return jsonify({'message': 'phone and code are required'}), 400
+    
+    if not otp.verify_code(data['phone'], data['code']):
+        return jsonify({'message': 'Invalid or expired code'}), 400
+    
+    user_id = request_user_id()
+    marked = False
+    if mongo_db is not None and user_id is not None:
+        users = mongo_db.get_collection("users")
+        user = users.find_one({"id": user_id}, {"phone": 1, "_id": 0}) or {}
+        if user.get("phone") and clean_msisdn(user["phone"]) == normalize_msisdn(data['phone']):
+            # Match the stored value too, so a concurrent phone change isn't marked verified
+            marked = users.update_one(
+                {"id": user_id, "phone": user["phone"]},
+                {"$set": {"phone_verified": True, "updated_at": datetime.utcnow()}}
+            ).matched_count == 1
+            user_cache.invalidate(user_id)
+    
+    return jsonify({'message': 'Phone verified', 'verified': True, 'phone_verified': marked}), 200
@@ -0,0 +1,91 @@
+from datetime import datetime
+from flask import jsonify, request
+from flask_cors import cross_origin
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+from ..services import ledger, payouts
+from .auth import admin_required
+from . import api_bp
+
+
+@api_bp.get("/admin/withdrawals")
+@admin_required
+@cross_origin()
+def admin_list_withdrawals(current_user):
+    """List withdrawals, optionally filtered by status (admin only)"""
+    if mongo_db is None:
+        return jsonify({'message': 'Withdrawals not available'}), 500
+    
+    filter_query = {}
+    if request.args.get('status'):
+        filter_query['status'] = request.args['status']
+    limit = max(1, min(request.args.get('limit', 100, type=int), 500))
+    
+    withdrawals = list(mongo_db.get_collection("withdrawals").find(
+        filter_query, {"_id": 0}
+    ).sort("created_at", -1).limit(limit))
+    for withdrawal in withdrawals:
+        for field in ('created_at', 'updated_at'):
+            if isinstance(withdrawal.get(field), datetime):
+                withdrawal[field] = withdrawal[field].isoformat()
+    
+    return jsonify({'withdrawals': withdrawals}), 200
+
+
+@api_bp.post("/admin/withdrawals/<int:withdrawal_id>/approve")
+@admin_required
+@cross_origin()
+def admin_approve_withdrawal(current_user, withdrawal_id):
+    """Approve a pending withdrawal for the next payout run (admin only)"""
+    if mongo_db is None:
+        return jsonify({'message': 'Withdrawals not available'}), 500
+    
+    result = mongo_db.get_collection("withdrawals").update_one(
+        {"id": withdrawal_id, "status": "pending"},
+        {"$set": {"status": "approved", "approved_by": current_user['id'], "updated_at": datetime.utcnow()}}
+    )
+    if result.matched_count == 0:
+        return jsonify({'message': 'Pending withdrawal not found'}), 404
+    
+    return jsonify({'message': 'Withdrawal approved successfully'}), 200
+
+
+@api_bp.post("/admin/withdrawals/<int:withdrawal_id>/reject")
+@admin_required
+@cross_origin()
+def admin_reject_withdrawal(current_user, withdrawal_id):
+    """Reject a pending or approved withdrawal and return the funds (admin only)"""
+    if mongo_db is None:
+        return jsonify({'message': 'Withdrawals not available'}), 500
+    
+    withdrawal = mongo_db.get_collection("withdrawals").find_one_and_update(
+        {"id": withdrawal_id, "status": {"$in": ["pending", "approved"]}},
+        {"$set": {"status": "rejected", "updated_at": datetime.utcnow()}}
+    )
+    if not withdrawal:
+        return jsonify({'message': 'Withdrawal not found or already processed'}), 404
+    
+    ledger.reverse_withdrawal(withdrawal["id"], withdrawal["influencer_id"], withdrawal["amount"])
+    return jsonify({'message': 'Withdrawal rejected successfully'}), 200
+
+
+@api_bp.post("/admin/payouts/run")
+@admin_required
+@cross_origin()
+def admin_run_payouts(current_user):
+    """Submit approved withdrawals to M-Pesa B2C in batches (admin only)"""
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        summary = payouts.run_payouts(max_batches=data.get('max_batches'))
+    except Exception as e:
+        return jsonify({'message': f'Payout run failed: {str(e)}'}), 500
+    
+    return jsonify({
+        'message': 'Payout run completed',
+        'summary': summary
+    }), 200
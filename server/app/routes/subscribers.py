@@ -9,15 +9,26 @@ except ImportError:
     mongo_db = None
 from ..models import Subscription
 from ..schemas import SubscriptionSchema
+from ..services import subscription_events
+from ..utils.pagination import PaginationError, ensure_sort_index, find_page, page_params
 from . import api_bp
 
 
 @api_bp.get("/subscribers")
 def list_subscribers():
-    if mongo_db:
+    if mongo_db is not None:
+        try:
+            params = page_params(default_limit=50)
+        except PaginationError as e:
+            return jsonify({"message": str(e)}), 400
+        query = {}
+        if request.args.get("influencer_id"):
+            query["influencer_id"] = request.args.get("influencer_id", type=int)
         coll = mongo_db.get_collection("subscribers")
-        docs = list(coll.find({}, {"_id": 0}))
-        return jsonify(docs)
+        ensure_sort_index(coll, "influencer_id")
+        ensure_sort_index(coll)
+        docs, pagination = find_page(coll, query, {"_id": 0}, **params)
+        return jsonify({"subscribers": docs, "pagination": pagination})
     subs = Subscription.query.order_by(Subscription.id).all()
     data = SubscriptionSchema(many=True).dump(subs)
     return jsonify(data)
@@ -26,7 +37,7 @@ def list_subscribers():
 @api_bp.post("/subscribers")
 def create_subscription():
     payload = request.get_json(force=True) or {}
-    if mongo_db:
+    if mongo_db is not None:
         coll = mongo_db.get_collection("subscribers")
         doc = {
             "influencer_id": payload.get("influencer_id"),
@@ -36,6 +47,8 @@ def create_subscription():
             "is_active": bool(payload.get("is_active", True)),
         }
         coll.insert_one(doc)
+        subscription_events.record_event("created", doc)
+        doc.pop("_id", None)
         return jsonify(doc), 201
     sub = Subscription(
         influencer_id=payload.get("influencer_id"),
@@ -46,6 +59,7 @@ def create_subscription():
     )
     db.session.add(sub)
     db.session.commit()
+    subscription_events.record_event("created", SubscriptionSchema().dump(sub))
     return jsonify(SubscriptionSchema().dump(sub)), 201
 
 
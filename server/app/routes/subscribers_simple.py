@@ -2,19 +2,52 @@ from flask import jsonify, request
 from . import api_bp
 from flask_cors import cross_origin
 from datetime import datetime
+from ..services import subscription_events
+from ..utils.pagination import PaginationError, list_page, page_params
 
 # Simple in-memory subscribers storage
 SUBSCRIBERS_DB = []
 
+def _change_event(previous, subscription):
+    """Classify an update as a pause, resume or plain update for the event log"""
+    if previous.get('is_active', True) and not subscription.get('is_active', True):
+        return "paused"
+    if not previous.get('is_active', True) and subscription.get('is_active', True):
+        return "resumed"
+    return "updated"
+
+def _set_subscription_state(subscription_id, event_type, is_active, status):
+    """Apply a pause/resume/cancel transition and append it to the event log"""
+    subscription = next((s for s in SUBSCRIBERS_DB if s['id'] == subscription_id), None)
+    if not subscription:
+        return jsonify({'message': 'Subscription not found'}), 404
+    if subscription.get('status') == 'cancelled':
+        return jsonify({'message': 'Subscription is cancelled'}), 409
+    
+    previous = dict(subscription)
+    subscription['is_active'] = is_active
+    subscription['status'] = status
+    subscription['updated_at'] = datetime.utcnow().isoformat()
+    subscription_events.record_event(event_type, subscription, previous)
+    
+    return jsonify({
+        'message': f'Subscription {event_type} successfully',
+        'subscription': subscription
+    })
+
 @api_bp.get("/subscribers")
 @cross_origin()
 def list_simple_subscribers():
-    """List all subscribers"""
+    """List subscribers newest first, a page at a time"""
     try:
+        subscribers, pagination = list_page(SUBSCRIBERS_DB, **page_params(default_limit=50))
         return jsonify({
             'total': len(SUBSCRIBERS_DB),
-            'subscribers': SUBSCRIBERS_DB
+            'subscribers': subscribers,
+            'pagination': pagination
         })
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': f'Error listing subscribers: {str(e)}'}), 500
 
@@ -44,6 +77,7 @@ def create_simple_subscription():
         }
         
         SUBSCRIBERS_DB.append(new_subscription)
+        subscription_events.record_event("created", new_subscription)
         
         return jsonify({
             'message': 'Subscription created successfully',
@@ -78,6 +112,8 @@ def update_simple_subscription(subscription_id):
         if not subscription:
             return jsonify({'message': 'Subscription not found'}), 404
         
+        previous = dict(subscription)
+        
         # Update fields
         if 'amount' in payload:
             subscription['amount'] = float(payload['amount'])
@@ -87,6 +123,7 @@ def update_simple_subscription(subscription_id):
             subscription['is_active'] = bool(payload['is_active'])
         
         subscription['updated_at'] = datetime.utcnow().isoformat()
+        subscription_events.record_event(_change_event(previous, subscription), subscription, previous)
         
         return jsonify({
             'message': 'Subscription updated successfully',
@@ -106,12 +143,44 @@ def delete_simple_subscription(subscription_id):
             return jsonify({'message': 'Subscription not found'}), 404
         
         SUBSCRIBERS_DB.remove(subscription)
+        if subscription.get('status') != 'cancelled':
+            subscription_events.record_event("cancelled", {**subscription, 'status': 'cancelled'}, subscription)
         
         return jsonify({'message': 'Subscription deleted successfully'})
         
     except Exception as e:
         return jsonify({'message': f'Error deleting subscription: {str(e)}'}), 500
 
+@api_bp.post("/subscribers/<int:subscription_id>/pause")
+@cross_origin()
+def pause_simple_subscription(subscription_id):
+    """Pause a subscription without cancelling it"""
+    return _set_subscription_state(subscription_id, "paused", False, "paused")
+
+@api_bp.post("/subscribers/<int:subscription_id>/resume")
+@cross_origin()
+def resume_simple_subscription(subscription_id):
+    """Resume a paused subscription"""
+    return _set_subscription_state(subscription_id, "resumed", True, "active")
+
+@api_bp.post("/subscribers/<int:subscription_id>/cancel")
+@cross_origin()
+def cancel_simple_subscription(subscription_id):
+    """Cancel a subscription; it stays listed but no longer counts towards MRR"""
+    return _set_subscription_state(subscription_id, "cancelled", False, "cancelled")
+
+@api_bp.get("/subscribers/aggregates")
+@cross_origin()
+def get_subscription_totals():
+    """Platform-wide subscriber and MRR totals read from the aggregates"""
+    return jsonify(subscription_events.get_totals())
+
+@api_bp.get("/subscribers/aggregates/<int:influencer_id>")
+@cross_origin()
+def get_subscription_aggregates(influencer_id):
+    """Active subscribers, MRR and churn for one influencer"""
+    return jsonify(subscription_events.get_aggregates(influencer_id))
+
 @api_bp.post("/subscribers/populate-demo")
 @cross_origin()
 def populate_demo_subscribers():
@@ -160,6 +229,7 @@ def populate_demo_subscribers():
                 "updated_at": datetime.utcnow().isoformat()
             }
             SUBSCRIBERS_DB.append(new_subscriber)
+            subscription_events.record_event("created", new_subscriber)
             added_count += 1
         except Exception as e:
             print(f"Error adding subscriber: {e}")
@@ -1,9 +1,12 @@
-from flask import Blueprint, jsonify, request, Response
+import hmac
+from datetime import datetime
+from flask import Blueprint, current_app, jsonify, request, Response
 # Try to import mongo_db, but don't fail if it's not available
 try:
     from ..extensions import mongo_db
 except ImportError:
     mongo_db = None
+from ..services import payouts, rate_limit, settlement
 
 webhooks_bp = Blueprint("webhooks", __name__)
 
@@ -32,9 +35,49 @@ def ussd_webhook():
 def mpesa_callback():
     # Accept and acknowledge M-Pesa callbacks
     payload = request.get_json(silent=True) or {}
-    # TODO: validate signature/IP and persist transaction outcome
-    if mongo_db:
-        mongo_db.get_collection("payments").insert_one({"callback": payload})
+    # TODO: validate signature/IP
+    if mongo_db is not None:
+        mongo_db.get_collection("mpesa_callbacks").insert_one({"callback": payload, "received_at": datetime.utcnow()})
+        try:
+            settlement.record_stk_result(payload)
+        except Exception as e:
+            print(f"Error settling M-Pesa callback: {e}")
     return jsonify({"ResultCode": 0, "ResultDesc": "Accepted"})
 
 
+def _b2c_caller_allowed():
+    """B2C callbacks move money, so they need the shared secret or an allowlisted source address"""
+    secret = current_app.config.get("DARAJA_CALLBACK_SECRET", "")
+    if secret and hmac.compare_digest(request.args.get("token", ""), secret):
+        return True
+    allowed = {ip.strip() for ip in current_app.config.get("DARAJA_CALLBACK_IPS", "").split(",") if ip.strip()}
+    return rate_limit.client_ip() in allowed
+
+
+@webhooks_bp.post("/b2c/result")
+def b2c_result_callback():
+    # Daraja B2C results are stored and applied to withdrawals in bulk by the payout engine
+    if not _b2c_caller_allowed():
+        return jsonify({"ResultCode": 1, "ResultDesc": "Forbidden"}), 403
+    payload = request.get_json(silent=True) or {}
+    payouts.record_result(payload)
+    return jsonify({"ResultCode": 0, "ResultDesc": "Accepted"})
+
+
+@webhooks_bp.post("/b2c/timeout")
+def b2c_timeout_callback():
+    if not _b2c_caller_allowed():
+        return jsonify({"ResultCode": 1, "ResultDesc": "Forbidden"}), 403
+    payload = request.get_json(silent=True) or {}
+    payouts.record_result(payload, timed_out=True)
+    return jsonify({"ResultCode": 0, "ResultDesc": "Accepted"})
+
+
+@webhooks_bp.post("/b2c/status")
+def b2c_status_callback():
+    # TransactionStatus answers for payouts whose B2C callback never arrived
+    if not _b2c_caller_allowed():
+        return jsonify({"ResultCode": 1, "ResultDesc": "Forbidden"}), 403
+    payload = request.get_json(silent=True) or {}
+    payouts.record_status_result(payload)
+    return jsonify({"ResultCode": 0, "ResultDesc": "Accepted"})
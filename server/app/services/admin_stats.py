@@ -0,0 +1,180 @@
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+USER_TYPES = ("guest", "user", "subscribed", "admin")
+COUNTERS_ID = "users"
+
+_cache = {"stats": None, "computed_at": 0.0, "refreshing": False}
+_lock = threading.Lock()
+
+
+def _counters():
+    return mongo_db.get_collection("stats_counters")
+
+
+def _today():
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _aggregate_users():
+    """All user figures from one pass over the users collection"""
+    today = _today()
+    rows = list(mongo_db.get_collection("users").aggregate([
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "active": {"$sum": {"$cond": [{"$eq": ["$is_active", True]}, 1, 0]}},
+                "suspended": {"$sum": {"$cond": [{"$eq": ["$is_suspended", True]}, 1, 0]}},
+                "recent_today": {"$sum": {"$cond": [{"$gte": ["$created_at", today]}, 1, 0]}},
+            }}],
+            "by_type": [{"$group": {"_id": "$user_type", "count": {"$sum": 1}}}],
+        }},
+    ]))
+    facets = rows[0] if rows else {"totals": [], "by_type": []}
+    totals = facets["totals"][0] if facets["totals"] else {}
+    by_type = {user_type: 0 for user_type in USER_TYPES}
+    for row in facets["by_type"]:
+        if row["_id"] in by_type:
+            by_type[row["_id"]] = row["count"]
+    return {
+        "total": totals.get("total", 0),
+        "active": totals.get("active", 0),
+        "suspended": totals.get("suspended", 0),
+        "by_type": by_type,
+        "recent_today": totals.get("recent_today", 0),
+    }
+
+
+def rebuild_counters():
+    """Reset the incrementally maintained counters from a full aggregation"""
+    users = _aggregate_users()
+    _counters().replace_one({"_id": COUNTERS_ID}, {
+        "_id": COUNTERS_ID,
+        "total": users["total"],
+        "active": users["active"],
+        "suspended": users["suspended"],
+        "by_type": users["by_type"],
+        "created_by_day": {_today().strftime("%Y-%m-%d"): users["recent_today"]},
+    }, upsert=True)
+    return users
+
+
+def _read_counters():
+    doc = _counters().find_one({"_id": COUNTERS_ID})
+    if doc is None:
+        return rebuild_counters()
+    today = _today().strftime("%Y-%m-%d")
+    past_days = [day for day in doc.get("created_by_day", {}) if day < today]
+    if past_days:
+        # Only today's bucket is ever read; drop the rest so the document stays small
+        _counters().update_one({"_id": COUNTERS_ID}, {"$unset": {f"created_by_day.{day}": "" for day in past_days}})
+    return {
+        "total": doc.get("total", 0),
+        "active": doc.get("active", 0),
+        "suspended": doc.get("suspended", 0),
+        "by_type": {user_type: doc.get("by_type", {}).get(user_type, 0) for user_type in USER_TYPES},
+        "recent_today": doc.get("created_by_day", {}).get(today, 0),
+    }
+
+
+def _flags(user_doc):
+    if not user_doc:
+        return {}
+    flags = {
+        "total": 1,
+        "active": 1 if user_doc.get("is_active") is True else 0,
+        "suspended": 1 if user_doc.get("is_suspended") is True else 0,
+    }
+    if user_doc.get("user_type") in USER_TYPES:
+        flags[f"by_type.{user_doc['user_type']}"] = 1
+    return flags
+
+
+def record_user_change(before, after):
+    """Apply a user insert/update to the counters; a no-op until they are first built"""
+    record_user_changes([(before, after)])
+
+
+def record_user_changes(changes):
+    """Apply many (before, after) pairs as one $inc on the counters document"""
+    if mongo_db is None or current_app.config.get("ADMIN_STATS_MODE", "aggregate") != "counters":
+        return
+    deltas = {}
+    for before, after in changes:
+        old, new = _flags(before), _flags(after)
+        for field in set(old) | set(new):
+            deltas[field] = deltas.get(field, 0) + new.get(field, 0) - old.get(field, 0)
+        if before is None and after is not None:
+            day = f"created_by_day.{datetime.utcnow().strftime('%Y-%m-%d')}"
+            deltas[day] = deltas.get(day, 0) + 1
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if deltas:
+        _counters().update_one({"_id": COUNTERS_ID}, {"$inc": deltas})
+
+
+def compute():
+    if current_app.config.get("ADMIN_STATS_MODE", "aggregate") == "counters":
+        users = _read_counters()
+    else:
+        users = _aggregate_users()
+    return {
+        "users": users,
+        "content": {
+            # Unfiltered totals come from collection metadata, not a scan
+            "influencers": mongo_db.get_collection("influencers").estimated_document_count(),
+            "subscribers": mongo_db.get_collection("subscribers").estimated_document_count(),
+        },
+        "system": {
+            "database": "MongoDB",
+            "mode": current_app.config.get("ADMIN_STATS_MODE", "aggregate"),
+            "timestamp": datetime.utcnow().isoformat(),
+        },
+    }
+
+
+def _store(stats):
+    with _lock:
+        _cache["stats"] = stats
+        _cache["computed_at"] = time.monotonic()
+        _cache["refreshing"] = False
+
+
+def _refresh_in_background(app):
+    def run():
+        try:
+            with app.app_context():
+                _store(compute())
+        except Exception as e:
+            print(f"Admin stats refresh failed: {e}")
+            _cache["refreshing"] = False
+
+    with _lock:
+        if _cache["refreshing"]:
+            return
+        _cache["refreshing"] = True
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_stats():
+    """Dashboard statistics: fresh within ADMIN_STATS_TTL_SECONDS, then served stale
+    for up to ADMIN_STATS_STALE_SECONDS while one background refresh runs"""
+    age = time.monotonic() - _cache["computed_at"]
+    if _cache["stats"] is not None:
+        if age < current_app.config.get("ADMIN_STATS_TTL_SECONDS", 15):
+            return _cache["stats"]
+        if age < current_app.config.get("ADMIN_STATS_STALE_SECONDS", 300):
+            _refresh_in_background(current_app._get_current_object())
+            return _cache["stats"]
+    stats = compute()
+    _store(stats)
+    return stats
@@ -0,0 +1,169 @@
+import atexit
+import os
+import threading
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from pymongo.errors import BulkWriteError
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+# Entries wait here until the flusher thread (or atexit) writes them in one insert_many
+_buffer = []
+_lock = threading.Lock()
+_wake = threading.Event()
+_flusher = {"thread": None, "pid": None, "settings": None}
+_flusher_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_stats = {"recorded": 0, "written": 0, "failed_flushes": 0, "dropped": 0}
+
+# Bookkeeping fields that change on every write and say nothing about the action
+IGNORED_FIELDS = ("updated_at", "search_prefixes")
+
+_indexes_ready = False
+
+
+def _audit():
+    return mongo_db.get_collection("audit_log")
+
+
+def ensure_indexes():
+    """Append-only log queried by target or actor, newest first"""
+    global _indexes_ready
+    if _indexes_ready or mongo_db is None:
+        return
+    _audit().create_index([("target_type", 1), ("target_id", 1), ("created_at", -1), ("id", -1)])
+    _audit().create_index([("actor_id", 1), ("created_at", -1), ("id", -1)])
+    _audit().create_index([("action", 1), ("created_at", -1), ("id", -1)])
+    _audit().create_index([("created_at", -1), ("id", -1)])
+    _indexes_ready = True
+
+
+def diff(before, after, fields=None):
+    """{field: [old, new]} for the fields that `after` changes"""
+    before = before or {}
+    keys = fields if fields is not None else after.keys()
+    return {
+        key: [before.get(key), after.get(key)]
+        for key in keys
+        if key in after and before.get(key) != after.get(key) and key not in IGNORED_FIELDS
+    }
+
+
+def _settings():
+    """Read in the request thread; the flusher thread has no app context"""
+    return {
+        "interval": current_app.config.get("AUDIT_FLUSH_SECONDS", 2),
+        "batch_size": current_app.config.get("AUDIT_BATCH_SIZE", 500),
+        "max_buffer": current_app.config.get("AUDIT_BUFFER_SIZE", 20000),
+    }
+
+
+def flush():
+    """Write everything buffered so far.
+
+    Entries keep the `_id` insert_many gives them, so a retry is idempotent:
+    duplicate-key errors mean the entry is already stored. Only entries that
+    genuinely failed go back to the front of the buffer.
+    """
+    if mongo_db is None:
+        return 0
+    batch_size = (_flusher["settings"] or {}).get("batch_size", 500)
+    written = 0
+    with _flush_lock:
+        while True:
+            with _lock:
+                batch = _buffer[:batch_size]
+                del _buffer[:batch_size]
+            if not batch:
+                return written
+            failed = []
+            try:
+                ensure_indexes()
+                _audit().insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                failed = [
+                    batch[error["index"]] for error in e.details.get("writeErrors", []) if error.get("code") != 11000
+                ]
+            except Exception as e:
+                # Unknown how much of the batch landed; the retry sorts it out by _id
+                failed = batch
+                print(f"Audit flush of {len(batch)} entries failed: {e}")
+            written += len(batch) - len(failed)
+            _stats["written"] += len(batch) - len(failed)
+            if failed:
+                _stats["failed_flushes"] += 1
+                with _lock:
+                    _buffer[:0] = failed
+                return written
+
+
+def _run():
+    while True:
+        settings = _flusher["settings"]
+        _wake.wait(settings["interval"])
+        _wake.clear()
+        flush()
+
+
+def _ensure_flusher():
+    """Per-process flusher thread, recreated after a fork"""
+    with _flusher_lock:
+        _flusher["settings"] = _settings()
+        if _flusher["thread"] is None or _flusher["pid"] != os.getpid():
+            _flusher["thread"] = threading.Thread(target=_run, daemon=True)
+            _flusher["thread"].start()
+            _flusher["pid"] = os.getpid()
+    return _flusher["settings"]
+
+
+def record(action, target_type, target_id, actor_id=None, changes=None):
+    """Queue one audit entry; returns immediately (the write happens in a later batch)"""
+    record_many(action, target_type, [(target_id, changes)], actor_id)
+
+
+def record_many(action, target_type, targets, actor_id=None):
+    """Queue one entry per (target_id, changes) pair, stamped with the same time"""
+    if mongo_db is None:
+        return
+    settings = _ensure_flusher()
+    now = datetime.utcnow()
+    entries = [
+        {
+            "id": uuid.uuid4().hex,
+            "created_at": now,
+            "action": action,
+            "target_type": target_type,
+            "target_id": target_id,
+            "actor_id": actor_id,
+            "changes": changes or {},
+        }
+        for target_id, changes in targets
+    ]
+    with _lock:
+        _buffer.extend(entries)
+        overflow = len(_buffer) - settings["max_buffer"]
+        if overflow > 0:
+            # Mongo is down or too slow: shed the oldest entries rather than grow
+            # without bound or stall requests on a flush that keeps failing
+            del _buffer[:overflow]
+        pending = len(_buffer)
+    _stats["recorded"] += len(entries)
+    if overflow > 0:
+        _stats["dropped"] += overflow
+        print(f"Audit buffer full; dropped {overflow} oldest entries")
+    if pending >= settings["batch_size"]:
+        _wake.set()
+
+
+def metrics():
+    return {**_stats, "pending": len(_buffer)}
+
+
+# Buffered entries survive a clean shutdown (gunicorn SIGTERM, Ctrl-C)
+atexit.register(flush)
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+
+from flask import Response, current_app, request
+from pymongo import ReturnDocument
+
+from ..utils.pagination import PaginationError, page_params
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+# Public influencer fields, in the camelCase the frontend uses
+FIELDS = ("id", "name", "phone", "received", "imageUrl", "ussd_shortcode", "status", "created_at", "updated_at")
+# Where a public field lives in storage (Mongo documents may carry either image key)
+STORED = {"imageUrl": ("imageUrl", "image_url")}
+DEFAULTS = {"name": "", "phone": "", "received": 0, "imageUrl": "", "ussd_shortcode": "", "status": "active"}
+
+# sort name -> (field, direction) pairs; `id` breaks ties
+SORTS = {
+    "newest": [("created_at", -1), ("id", -1)],
+    "name": [("name", 1), ("id", 1)],
+    "top": [("received", -1), ("id", -1)],
+}
+STATUSES = ("active", "suspended", "terminated")
+
+
+def list_params():
+    """Parse `limit`, `cursor`, `status`, `sort` and `fields` for the influencer listing.
+
+    `paged` is False for legacy callers that sent none of limit/cursor and expect a bare array.
+    """
+    params = page_params(default_limit=24, max_limit=100)
+    status = request.args.get("status")
+    if status and status not in STATUSES:
+        raise PaginationError(f"status must be one of: {', '.join(STATUSES)}")
+    sort = request.args.get("sort", "newest")
+    if sort not in SORTS:
+        raise PaginationError(f"sort must be one of: {', '.join(SORTS)}")
+    fields = list(FIELDS)
+    if request.args.get("fields"):
+        fields = [field.strip() for field in request.args["fields"].split(",") if field.strip()]
+        unknown = [field for field in fields if field not in FIELDS]
+        if unknown:
+            raise PaginationError(f"Unknown fields: {', '.join(unknown)}")
+    return {
+        **params,
+        "status": status,
+        "sort": SORTS[sort],
+        "fields": fields,
+        "paged": "limit" in request.args or "cursor" in request.args,
+    }
+
+
+def projection(fields, sort):
+    """Mongo projection for `fields` plus the sort keys the cursor needs"""
+    stored = {"_id": 0}
+    for field in fields:
+        for name in STORED.get(field, (field,)):
+            stored[name] = 1
+    for field, _ in sort:
+        stored[field] = 1
+    return stored
+
+
+def normalize(doc, fields):
+    """Public shape of one stored influencer, restricted to `fields`"""
+    item = {}
+    for field in fields:
+        value = None
+        for name in STORED.get(field, (field,)):
+            value = value or doc.get(name)
+        if value is None:
+            value = DEFAULTS.get(field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        item[field] = value
+    return item
+
+
+# Pre-serialized listing responses: canonical query string -> snapshot, least recently used first
+_snapshots = OrderedDict()
+# Catalogue version shared through Mongo; writes bump it, readers poll it at most once per interval
+_version = {"value": 0, "checked_at": 0.0}
+_lock = Lock()
+
+
+def _versions():
+    return mongo_db.get_collection("catalog_versions")
+
+
+def _apply_version(doc):
+    _version["value"] = doc.get("version", 0)
+    _version["checked_at"] = time.monotonic()
+
+
+def current_version():
+    """Catalogue version as last seen by this worker (polled from Mongo at most once per interval)"""
+    if mongo_db is None:
+        return _version["value"]
+    interval = current_app.config.get("CATALOG_VERSION_CHECK_SECONDS", 2)
+    if time.monotonic() - _version["checked_at"] >= interval:
+        _apply_version(_versions().find_one({"_id": "influencers"}) or {})
+    return _version["value"]
+
+
+def invalidate():
+    """Record an influencer write: bumps the shared version so every worker rebuilds.
+
+    Returns the new version.
+    """
+    now = datetime.utcnow()
+    if mongo_db is not None:
+        _apply_version(_versions().find_one_and_update(
+            {"_id": "influencers"},
+            {"$inc": {"version": 1}, "$set": {"updated_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        ))
+    else:
+        _version["value"] += 1
+    with _lock:
+        _snapshots.clear()
+    return _version["value"]
+
+
+def _snapshot(key, build):
+    version = current_version()
+    now = time.monotonic()
+    with _lock:
+        snapshot = _snapshots.get(key)
+        if snapshot and snapshot["version"] == version and snapshot["expires_at"] > now:
+            _snapshots.move_to_end(key)
+            return snapshot
+
+    # Miss: query and encode once; the ETag is the content hash, so an unchanged rebuild still 304s
+    body = json.dumps(build(list_params()), sort_keys=True, separators=(",", ":")).encode()
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    with _lock:
+        previous = _snapshots.get(key)
+    if previous and previous["etag"] == etag:
+        last_modified = previous["last_modified"]
+    else:
+        # New content (e.g. `received` moved without a version bump) needs a newer
+        # Last-Modified, or If-Modified-Since clients would be told their copy is current
+        last_modified = datetime.utcnow().replace(microsecond=0)
+        if previous and last_modified <= previous["last_modified"]:
+            last_modified = previous["last_modified"] + timedelta(seconds=1)
+    snapshot = {
+        "body": body,
+        "etag": etag,
+        "last_modified": last_modified,
+        "version": version,
+        # Earnings updates don't bump the version; the max age bounds how stale `received` gets
+        "expires_at": now + current_app.config.get("CATALOG_MAX_AGE_SECONDS", 60),
+    }
+    with _lock:
+        _snapshots[key] = snapshot
+        _snapshots.move_to_end(key)
+        while len(_snapshots) > current_app.config.get("CATALOG_SNAPSHOTS", 256):
+            _snapshots.popitem(last=False)
+    return snapshot
+
+
+def serve(build):
+    """Serve the listing for this request's query from a snapshot, answering
+    If-None-Match / If-Modified-Since with 304. `build(params)` returns the payload
+    and only runs on a miss; PaginationError from bad params propagates."""
+    key = tuple(sorted(request.args.items(multi=True)))
+    snapshot = _snapshot(key, build)
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(snapshot["etag"])
+    else:
+        since = request.if_modified_since
+        not_modified = since is not None and snapshot["last_modified"] <= since.replace(tzinfo=None)
+
+    response = Response(
+        b"" if not_modified else snapshot["body"],
+        status=304 if not_modified else 200,
+        mimetype="application/json",
+    )
+    response.set_etag(snapshot["etag"])
+    response.last_modified = snapshot["last_modified"]
+    response.headers["Cache-Control"] = "public, no-cache"
+    return response
@@ -0,0 +1,210 @@
+import random
+import time
+from datetime import datetime
+from threading import Lock
+
+from flask import current_app
+from pymongo import ReturnDocument
+
+from . import leaderboard
+from ..extensions import db
+from ..models import Influencer
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+# influencer_id -> (total, expires_at)
+_totals_cache = {}
+# influencer_id -> (shard_count, expires_at)
+_shard_counts = {}
+# influencer_id -> (minute, writes) used for hot influencer detection
+_write_rates = {}
+_lock = Lock()
+_indexes_ready = False
+
+_LEADERBOARD_PROJECTION = {field: 1 for field in leaderboard.LISTED_FIELDS + ("image_url", "status")}
+
+
+def _influencers():
+    return mongo_db.get_collection("influencers")
+
+
+def _shards():
+    return mongo_db.get_collection("influencer_received_shards")
+
+
+def _config(key, default):
+    return current_app.config.get(key, default)
+
+
+def ensure_indexes():
+    """Create the shard lookup index"""
+    global _indexes_ready
+    if _indexes_ready or mongo_db is None:
+        return
+    _shards().create_index([("influencer_id", 1), ("shard", 1)], unique=True)
+    _indexes_ready = True
+
+
+def _shard_count(influencer_id):
+    """Number of shard documents for an influencer; 1 means the plain `received` field"""
+    now = time.monotonic()
+    cached = _shard_counts.get(influencer_id)
+    if cached and cached[1] > now:
+        return cached[0]
+    doc = _influencers().find_one({"id": influencer_id}, {"received_shards": 1, "_id": 0}) or {}
+    count = int(doc.get("received_shards") or 1)
+    _shard_counts[influencer_id] = (count, now + _config("EARNINGS_CACHE_SECONDS", 5))
+    return count
+
+
+def _track_write(influencer_id):
+    """Count writes per minute and promote the influencer to sharded counters when hot"""
+    threshold = _config("EARNINGS_HOT_WRITES_PER_MINUTE", 600)
+    if not threshold:
+        return
+    minute = int(time.time() // 60)
+    with _lock:
+        last_minute, writes = _write_rates.get(influencer_id, (minute, 0))
+        writes = writes + 1 if last_minute == minute else 1
+        _write_rates[influencer_id] = (minute, writes)
+    if writes == threshold:
+        mark_hot(influencer_id)
+
+
+def _observe_sql(influencer_id):
+    influencer = Influencer.query.get(influencer_id)
+    leaderboard.observe({
+        "id": influencer.id,
+        "name": influencer.name,
+        "image_url": influencer.image_url,
+        "ussd_shortcode": influencer.ussd_shortcode,
+        "received": influencer.received,
+        "status": influencer.status,
+    })
+
+
+def increment_received(influencer_id, amount):
+    """Atomically add `amount` to an influencer's received total.
+
+    Hot influencers spread the `$inc` over N shard documents so concurrent
+    payments don't all contend on the single influencer document.
+    """
+    amount = int(amount)
+    if mongo_db is None:
+        updated = Influencer.query.filter_by(id=influencer_id).update(
+            {Influencer.received: Influencer.received + amount}
+        )
+        db.session.commit()
+        _totals_cache.pop(influencer_id, None)
+        if updated:
+            _observe_sql(influencer_id)
+        return bool(updated)
+
+    shards = _shard_count(influencer_id)
+    if shards > 1:
+        ensure_indexes()
+        _shards().update_one(
+            {"influencer_id": influencer_id, "shard": random.randrange(shards)},
+            {"$inc": {"value": amount}},
+            upsert=True,
+        )
+        leaderboard.add_delta(influencer_id, amount)
+    else:
+        doc = _influencers().find_one_and_update(
+            {"id": influencer_id},
+            {"$inc": {"received": amount}, "$set": {"updated_at": datetime.utcnow().isoformat()}},
+            projection=_LEADERBOARD_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            return False
+        leaderboard.observe(doc)
+
+    with _lock:
+        cached = _totals_cache.get(influencer_id)
+        if cached:
+            _totals_cache[influencer_id] = (cached[0] + amount, cached[1])
+    _track_write(influencer_id)
+    return True
+
+
+def get_received(influencer_id):
+    """Return the received total (base field plus shards), cached for a few seconds"""
+    now = time.monotonic()
+    cached = _totals_cache.get(influencer_id)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    if mongo_db is None:
+        influencer = Influencer.query.get(influencer_id)
+        total = (influencer.received or 0) if influencer else 0
+    else:
+        doc = _influencers().find_one({"id": influencer_id}, {"received": 1, "received_shards": 1, "_id": 0}) or {}
+        total = int(doc.get("received") or 0)
+        if int(doc.get("received_shards") or 1) > 1:
+            rows = list(_shards().aggregate([
+                {"$match": {"influencer_id": influencer_id}},
+                {"$group": {"_id": None, "total": {"$sum": "$value"}}},
+            ]))
+            total += int(rows[0]["total"]) if rows else 0
+
+    _totals_cache[influencer_id] = (total, now + _config("EARNINGS_CACHE_SECONDS", 5))
+    return total
+
+
+def set_received(influencer_id, value):
+    """Overwrite the received total (admin correction); discards any shard values"""
+    value = int(value)
+    _totals_cache.pop(influencer_id, None)
+    if mongo_db is None:
+        updated = Influencer.query.filter_by(id=influencer_id).update({Influencer.received: value})
+        db.session.commit()
+        if updated:
+            _observe_sql(influencer_id)
+        return bool(updated)
+
+    doc = _influencers().find_one_and_update(
+        {"id": influencer_id},
+        {"$set": {"received": value, "updated_at": datetime.utcnow().isoformat()}},
+        projection=_LEADERBOARD_PROJECTION,
+        return_document=ReturnDocument.AFTER,
+    )
+    _shards().delete_many({"influencer_id": influencer_id})
+    if doc is None:
+        return False
+    leaderboard.observe(doc)
+    return True
+
+
+def mark_hot(influencer_id, shards=None):
+    """Switch an influencer to sharded counters"""
+    if mongo_db is None:
+        return False
+    shards = int(shards or _config("EARNINGS_SHARDS", 8))
+    ensure_indexes()
+    _influencers().update_one({"id": influencer_id}, {"$max": {"received_shards": shards}})
+    _shard_counts.pop(influencer_id, None)
+    print(f"Earnings counter for influencer {influencer_id} sharded over {shards} documents")
+    return True
+
+
+def compact_shards(influencer_id):
+    """Fold shard values back into the influencer document without losing concurrent increments"""
+    if mongo_db is None:
+        return 0
+    folded = 0
+    for shard in _shards().find({"influencer_id": influencer_id, "value": {"$ne": 0}}, {"_id": 1}):
+        before = _shards().find_one_and_update(
+            {"_id": shard["_id"]},
+            {"$set": {"value": 0}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        value = int((before or {}).get("value") or 0)
+        if value:
+            _influencers().update_one({"id": influencer_id}, {"$inc": {"received": value}})
+            folded += value
+    return folded
@@ -0,0 +1,112 @@
+import json
+import re
+import threading
+import time
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import jwt
+import requests
+from flask import current_app
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+# kid -> public key, plus when the set goes stale according to Cache-Control
+_cache = {"keys": {}, "expires_at": 0.0, "refreshing": False, "last_miss_fetch": 0.0}
+_lock = threading.Lock()
+
+
+class GoogleAuthError(Exception):
+    pass
+
+
+def _settings():
+    return {
+        "url": current_app.config.get("GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs"),
+        "default_max_age": current_app.config.get("GOOGLE_JWKS_DEFAULT_MAX_AGE", 3600),
+        "timeout": current_app.config.get("GOOGLE_JWKS_TIMEOUT", 5),
+    }
+
+
+def _max_age(cache_control, default):
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else default
+
+
+def _download(settings):
+    """Return (jwks, max_age); file:// URLs let tests use a local fake key set"""
+    parsed = urlparse(settings["url"])
+    if parsed.scheme == "file":
+        with open(url2pathname(parsed.path)) as f:
+            return json.load(f), settings["default_max_age"]
+    response = requests.get(settings["url"], timeout=settings["timeout"])
+    response.raise_for_status()
+    return response.json(), _max_age(response.headers.get("Cache-Control"), settings["default_max_age"])
+
+
+def _refresh(settings):
+    try:
+        jwks, max_age = _download(settings)
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            if jwk.get("kty") == "RSA" and jwk.get("kid"):
+                keys[jwk["kid"]] = jwt.PyJWK(jwk, algorithm="RS256").key
+        with _lock:
+            _cache["keys"] = keys
+            _cache["expires_at"] = time.monotonic() + max_age
+    except (requests.RequestException, OSError, ValueError, jwt.PyJWKError) as e:
+        print(f"Google JWKS refresh failed: {e}")
+    finally:
+        _cache["refreshing"] = False
+
+
+def _refresh_in_background(settings):
+    with _lock:
+        if _cache["refreshing"]:
+            return
+        _cache["refreshing"] = True
+    threading.Thread(target=_refresh, args=(settings,), daemon=True).start()
+
+
+def _key_for(kid):
+    """Public key for `kid`; fetches synchronously only on a cold cache or unknown kid"""
+    settings = _settings()
+    now = time.monotonic()
+    key = _cache["keys"].get(kid)
+
+    if key is None:
+        # Google rotated keys (or the cache is cold); at most one forced fetch per interval
+        if not _cache["keys"] or now - _cache["last_miss_fetch"] > current_app.config.get("GOOGLE_JWKS_MISS_INTERVAL", 30):
+            _cache["last_miss_fetch"] = now
+            _cache["refreshing"] = True
+            _refresh(settings)
+            key = _cache["keys"].get(kid)
+        if key is None:
+            raise GoogleAuthError("Unknown signing key")
+    elif now > _cache["expires_at"] - current_app.config.get("GOOGLE_JWKS_REFRESH_MARGIN", 300):
+        # Still usable; swap in the new set without blocking this login
+        _refresh_in_background(settings)
+    return key
+
+
+def verify_id_token(id_token):
+    """Verify a Google ID token locally (RS256 against the cached JWKS) and return its claims"""
+    client_id = current_app.config.get("GOOGLE_CLIENT_ID")
+    if not client_id:
+        raise GoogleAuthError("Google login is not configured")
+    try:
+        header = jwt.get_unverified_header(id_token)
+        claims = jwt.decode(
+            id_token,
+            _key_for(header.get("kid")),
+            algorithms=["RS256"],
+            audience=client_id,
+            options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+        )
+    except jwt.InvalidTokenError as e:
+        raise GoogleAuthError(f"Invalid Google token: {e}")
+    if claims["iss"] not in GOOGLE_ISSUERS:
+        raise GoogleAuthError("Invalid Google token issuer")
+    if not claims.get("email") or claims.get("email_verified") not in (True, "true"):
+        raise GoogleAuthError("Google account email is not verified")
+    return claims
@@ -0,0 +1,72 @@
+import os
+from threading import Lock
+
+from flask import current_app
+from pymongo import ReturnDocument
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+# collection name -> [next id, last id] of the block this process holds
+_blocks = {}
+# collection names whose counter has been raised past the existing ids
+_seeded = set()
+_state = {"pid": None}
+_lock = Lock()
+
+
+class IdAllocationError(Exception):
+    pass
+
+
+def _counters():
+    return mongo_db.get_collection("counters")
+
+
+def _seed(name):
+    """Raise the counter to the highest id already stored (seed data, old count+1 ids)"""
+    mongo_db.get_collection(name).create_index("id")
+    latest = mongo_db.get_collection(name).find_one(
+        {"id": {"$type": "number"}}, {"id": 1, "_id": 0}, sort=[("id", -1)]
+    )
+    _counters().update_one({"_id": name}, {"$max": {"value": int(latest["id"]) if latest else 0}}, upsert=True)
+    _seeded.add(name)
+
+
+def _reserve(name, size):
+    doc = _counters().find_one_and_update(
+        {"_id": name},
+        {"$inc": {"value": size}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return [doc["value"] - size + 1, doc["value"]]
+
+
+def next_id(name):
+    """Next integer id for documents in collection `name`.
+
+    Each process reserves a block of ids with one atomic `$inc`, so most
+    calls are served from memory. Ids are unique but only increase within a
+    process; unused ids in a block are skipped when the process exits.
+    """
+    if mongo_db is None:
+        # SQLAlchemy models keep their native autoincrement sequences
+        raise IdAllocationError("Id allocation requires MongoDB")
+    with _lock:
+        if _state["pid"] != os.getpid():
+            # A forked worker must not hand out its parent's block
+            _blocks.clear()
+            _seeded.clear()
+            _state["pid"] = os.getpid()
+        block = _blocks.get(name)
+        if block is None or block[0] > block[1]:
+            if name not in _seeded:
+                _seed(name)
+            block = _blocks[name] = _reserve(name, current_app.config.get("ID_BLOCK_SIZE", 20))
+        allocated = block[0]
+        block[0] += 1
+        return allocated
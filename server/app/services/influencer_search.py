@@ -0,0 +1,126 @@
+import re
+import unicodedata
+from collections import Counter
+from threading import Lock
+
+from . import catalog
+
+LISTED_FIELDS = ("id", "name", "ussd_shortcode", "imageUrl")
+_WORD = re.compile(r"[a-z0-9]+")
+# Share of the query's trigrams an influencer must contain to match at all
+MIN_COVERAGE = 0.4
+
+# trigram -> influencer ids; `_entries` holds what a result shows plus each influencer's trigrams
+_postings = {}
+_entries = {}
+_state = {"version": None}
+_lock = Lock()
+
+
+def _words(text):
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode().lower()
+    return _WORD.findall(text)
+
+
+def trigrams(text):
+    """Padded per-word trigrams, as pg_trgm does: "ochieng" -> "  o", " oc", "och", ..., "ng " """
+    grams = set()
+    for word in _words(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _remove_locked(influencer_id):
+    entry = _entries.pop(influencer_id, None)
+    if entry is None:
+        return
+    for gram in entry["grams"]:
+        ids = _postings.get(gram)
+        if ids is not None:
+            ids.discard(influencer_id)
+            if not ids:
+                del _postings[gram]
+
+
+def _add_locked(doc):
+    influencer_id = doc.get("id")
+    _remove_locked(influencer_id)
+    if influencer_id is None or doc.get("status", "active") != "active":
+        # Only subscribable influencers are searchable
+        return
+    grams = trigrams(doc.get("name")) | trigrams(doc.get("ussd_shortcode"))
+    _entries[influencer_id] = {
+        "item": catalog.normalize(doc, LISTED_FIELDS),
+        "grams": grams,
+        "words": _words(doc.get("name")) + _words(doc.get("ussd_shortcode")),
+    }
+    for gram in grams:
+        _postings.setdefault(gram, set()).add(influencer_id)
+
+
+def rebuild(docs, version=None):
+    """Replace the index with `docs` (dicts in storage or public shape) read at catalogue `version`"""
+    with _lock:
+        _postings.clear()
+        _entries.clear()
+        for doc in docs:
+            _add_locked(doc)
+        _state["version"] = version
+
+
+def observe(doc, version=None):
+    """Apply one influencer write; `version` is what catalog.invalidate() returned for it.
+
+    If other workers wrote in between, the index is left stale and rebuilt on the next search.
+    """
+    with _lock:
+        _add_locked(doc)
+        _advance_locked(version)
+
+
+def forget(influencer_id, version=None):
+    with _lock:
+        _remove_locked(influencer_id)
+        _advance_locked(version)
+
+
+def _advance_locked(version):
+    if version is None:
+        return
+    if _state["version"] is not None and version == _state["version"] + 1:
+        _state["version"] = version
+    else:
+        _state["version"] = None
+
+
+def search(query, limit, load):
+    """Ranked fuzzy matches for `query`; `load()` returns every influencer and only
+    runs when the catalogue version has moved past what this worker indexed"""
+    version = catalog.current_version()
+    if _state["version"] != version:
+        rebuild(load(), version)
+
+    query_grams = trigrams(query)
+    if not query_grams:
+        return []
+    query_words = _words(query)
+    with _lock:
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(_postings.get(gram, ()))
+        ranked = []
+        for influencer_id, count in shared.items():
+            entry = _entries[influencer_id]
+            # Share of the query found in the influencer, then overall (Jaccard) similarity
+            coverage = count / len(query_grams)
+            if coverage < MIN_COVERAGE:
+                continue
+            similarity = count / (len(query_grams) + len(entry["grams"]) - count)
+            prefix = any(word.startswith(term) for term in query_words for word in entry["words"])
+            ranked.append((prefix, coverage, similarity, influencer_id))
+        ranked.sort(reverse=True)
+        return [
+            {**_entries[influencer_id]["item"], "score": round(coverage, 3)}
+            for _, coverage, _, influencer_id in ranked[:limit]
+        ]
@@ -0,0 +1,165 @@
+import time
+from bisect import bisect_left, insort
+from threading import Lock
+
+from flask import current_app
+
+from ..models.influencer import Influencer, InfluencerStatus
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+LISTED_FIELDS = ("id", "name", "imageUrl", "ussd_shortcode", "received")
+
+# Bounded top-K ranking kept sorted as (-received, id); `_entries` holds the display fields
+_ranking = []
+_entries = {}
+_state = {"loaded_at": 0, "stale": True}
+_lock = Lock()
+_indexes_ready = False
+
+
+def _capacity():
+    return current_app.config.get("LEADERBOARD_SIZE", 100)
+
+
+def ensure_indexes():
+    """Index that serves the refill query without an in-memory sort"""
+    global _indexes_ready
+    if _indexes_ready or mongo_db is None:
+        return
+    mongo_db.get_collection("influencers").create_index([("status", 1), ("received", -1)])
+    mongo_db.get_collection("influencers").create_index("received_shards", sparse=True)
+    _indexes_ready = True
+
+
+def _entry(doc):
+    return {
+        "id": doc.get("id"),
+        "name": doc.get("name", ""),
+        "imageUrl": doc.get("imageUrl") or doc.get("image_url") or "",
+        "ussd_shortcode": doc.get("ussd_shortcode", ""),
+        "received": int(doc.get("received") or 0),
+    }
+
+
+def _sharded_entries(active, projection):
+    """Hot influencers whose earnings live partly in `influencer_received_shards`, with their full totals"""
+    docs = list(mongo_db.get_collection("influencers").find({**active, "received_shards": {"$gt": 1}}, projection))
+    if not docs:
+        return []
+    totals = {
+        row["_id"]: row["total"]
+        for row in mongo_db.get_collection("influencer_received_shards").aggregate([
+            {"$match": {"influencer_id": {"$in": [doc.get("id") for doc in docs]}}},
+            {"$group": {"_id": "$influencer_id", "total": {"$sum": "$value"}}},
+        ])
+    }
+    return [_entry({**doc, "received": int(doc.get("received") or 0) + int(totals.get(doc.get("id")) or 0)}) for doc in docs]
+
+
+def _query_top(n):
+    """Indexed top-n query; never sorts the whole catalogue.
+
+    The base `received` field under-counts sharded influencers, so they are
+    ranked from their shard totals and merged with the top unsharded ones.
+    """
+    if mongo_db is not None:
+        ensure_indexes()
+        active = {"status": {"$in": [InfluencerStatus.ACTIVE.value, None]}}
+        projection = {field: 1 for field in LISTED_FIELDS + ("image_url",)}
+        docs = mongo_db.get_collection("influencers").find(
+            {**active, "received_shards": {"$not": {"$gt": 1}}}, projection,
+        ).sort("received", -1).limit(n)
+        entries = [_entry(doc) for doc in docs] + _sharded_entries(active, projection)
+        entries.sort(key=lambda entry: (-entry["received"], entry["id"]))
+        return entries[:n]
+
+    influencers = Influencer.query.filter(
+        Influencer.status == InfluencerStatus.ACTIVE.value
+    ).order_by(Influencer.received.desc()).limit(n).all()
+    return [
+        _entry({
+            "id": inf.id,
+            "name": inf.name,
+            "image_url": inf.image_url,
+            "ussd_shortcode": inf.ussd_shortcode,
+            "received": inf.received,
+        })
+        for inf in influencers
+    ]
+
+
+def _reload():
+    entries = _query_top(_capacity())
+    with _lock:
+        _entries.clear()
+        _ranking.clear()
+        for entry in entries:
+            _entries[entry["id"]] = entry
+            _ranking.append((-entry["received"], entry["id"]))
+        _ranking.sort()
+        _state["loaded_at"] = time.monotonic()
+        _state["stale"] = False
+
+
+def _remove_locked(influencer_id):
+    entry = _entries.pop(influencer_id, None)
+    if entry is not None:
+        index = bisect_left(_ranking, (-entry["received"], influencer_id))
+        del _ranking[index]
+    return entry
+
+
+def observe(doc):
+    """Apply an influencer's new received total to the ranking in O(log K)"""
+    if _state["stale"]:
+        return
+    influencer_id = doc.get("id")
+    with _lock:
+        full = len(_ranking) >= _capacity()
+        previous = _remove_locked(influencer_id)
+        if doc.get("status", InfluencerStatus.ACTIVE.value) != InfluencerStatus.ACTIVE.value:
+            if previous is not None:
+                # A slot opened that only the database can fill
+                _state["stale"] = True
+            return
+
+        entry = _entry({**(previous or {}), **doc})
+        if full and previous is None and (-entry["received"], influencer_id) > _ranking[-1]:
+            return
+        _entries[influencer_id] = entry
+        insort(_ranking, (-entry["received"], influencer_id))
+        if len(_ranking) > _capacity():
+            _, evicted = _ranking.pop()
+            _entries.pop(evicted, None)
+        elif previous is not None and full and entry["received"] < previous["received"]:
+            # The influencer moved down; someone outside the board may now outrank them
+            _state["stale"] = True
+
+
+def add_delta(influencer_id, amount):
+    """Bump an influencer already on the board (used for sharded counters)"""
+    entry = _entries.get(influencer_id)
+    if entry is not None:
+        observe({"id": influencer_id, "received": entry["received"] + int(amount)})
+
+
+def invalidate():
+    """Force a reload on the next read (status changes, deletes)"""
+    _state["stale"] = True
+
+
+def top(n):
+    """Top-n active influencers by received; O(n) from the in-process board"""
+    if n > _capacity():
+        return _query_top(n)
+    refresh_seconds = current_app.config.get("LEADERBOARD_REFRESH_SECONDS", 60)
+    if _state["stale"] or time.monotonic() - _state["loaded_at"] > refresh_seconds:
+        # Other workers apply their own earnings; a periodic reload picks those up
+        _reload()
+    with _lock:
+        return [dict(_entries[influencer_id]) for _, influencer_id in _ranking[:n]]
@@ -0,0 +1,211 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+# Counterpart accounts for money entering and leaving the platform
+MPESA_CLEARING_ACCOUNT = "platform:mpesa_clearing"
+PAYOUTS_ACCOUNT = "platform:payouts"
+
+_indexes_ready = False
+
+
+class LedgerError(Exception):
+    pass
+
+
+def _entries():
+    return mongo_db.get_collection("ledger_entries")
+
+
+def _accounts():
+    return mongo_db.get_collection("ledger_accounts")
+
+
+def _snapshots():
+    return mongo_db.get_collection("ledger_snapshots")
+
+
+def influencer_account(influencer_id):
+    return f"influencer:{influencer_id}"
+
+
+def ensure_indexes():
+    """Create the ledger indexes (sequence range scans and idempotent posting)"""
+    global _indexes_ready
+    if _indexes_ready or mongo_db is None:
+        return
+    _entries().create_index([("account", 1), ("seq", 1)], unique=True)
+    _entries().create_index([("txn_id", 1), ("account", 1)], unique=True)
+    _snapshots().create_index([("account", 1), ("seq", -1)])
+    _indexes_ready = True
+
+
+def _next_seq(account):
+    doc = _accounts().find_one_and_update(
+        {"_id": account},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["seq"]
+
+
+def post_transaction(txn_id, legs, source, ref=None):
+    """Post a balanced transaction as immutable entries, one per leg.
+
+    ``legs`` is a list of (account, amount) pairs whose amounts sum to zero;
+    positive amounts are credits and negative amounts are debits. Each leg is
+    unique on (txn_id, account), so a retry writes only the legs an interrupted
+    attempt left out; re-posting a complete transaction is a no-op (returns False).
+    """
+    if mongo_db is None:
+        raise LedgerError("Ledger requires MongoDB")
+    if sum(amount for _, amount in legs) != 0:
+        raise LedgerError(f"Unbalanced transaction {txn_id}")
+
+    ensure_indexes()
+    posted = {doc["account"] for doc in _entries().find({"txn_id": txn_id}, {"account": 1, "_id": 0})}
+    missing = [(account, amount) for account, amount in legs if account not in posted]
+    if not missing:
+        return False
+
+    now = datetime.utcnow()
+    snapshot_every = current_app.config.get("LEDGER_SNAPSHOT_EVERY", 1000)
+    written = False
+    for account, amount in missing:
+        seq = _next_seq(account)
+        try:
+            _entries().insert_one({
+                "txn_id": txn_id,
+                "account": account,
+                "seq": seq,
+                "amount": int(amount),
+                "direction": "credit" if amount > 0 else "debit",
+                "source": source,
+                "ref": ref,
+                "created_at": now,
+            })
+        except DuplicateKeyError:
+            # A concurrent retry posted this leg first; the skipped seq is harmless
+            continue
+        written = True
+        if snapshot_every and seq % snapshot_every == 0:
+            snapshot_account(account)
+    return written
+
+
+def credit_payment(payment_id, influencer_id, amount):
+    """Credit an influencer for a paid Payment"""
+    return post_transaction(
+        f"payment:{payment_id}",
+        [(MPESA_CLEARING_ACCOUNT, -int(amount)), (influencer_account(influencer_id), int(amount))],
+        source="payment",
+        ref=payment_id,
+    )
+
+
+def debit_withdrawal(withdrawal_id, influencer_id, amount):
+    """Debit an influencer for a Withdrawal"""
+    return post_transaction(
+        f"withdrawal:{withdrawal_id}",
+        [(influencer_account(influencer_id), -int(amount)), (PAYOUTS_ACCOUNT, int(amount))],
+        source="withdrawal",
+        ref=withdrawal_id,
+    )
+
+
+def reverse_withdrawal(withdrawal_id, influencer_id, amount):
+    """Return the funds of a failed or rejected Withdrawal to the influencer"""
+    return post_transaction(
+        f"withdrawal-reversal:{withdrawal_id}",
+        [(PAYOUTS_ACCOUNT, -int(amount)), (influencer_account(influencer_id), int(amount))],
+        source="withdrawal_reversal",
+        ref=withdrawal_id,
+    )
+
+
+def _latest_snapshot(account):
+    return _snapshots().find_one({"account": account}, sort=[("seq", -1)]) or {"seq": 0, "balance": 0}
+
+
+def _sum_entries(account, after_seq, upto_seq=None):
+    seq_range = {"$gt": after_seq}
+    if upto_seq is not None:
+        seq_range["$lte"] = upto_seq
+    rows = list(_entries().aggregate([
+        {"$match": {"account": account, "seq": seq_range}},
+        {"$group": {"_id": None, "total": {"$sum": "$amount"}, "last_seq": {"$max": "$seq"}}},
+    ]))
+    if not rows:
+        return 0, after_seq
+    return int(rows[0]["total"]), rows[0]["last_seq"]
+
+
+def get_balance(account):
+    """Latest snapshot plus the entries posted after it"""
+    if mongo_db is None:
+        raise LedgerError("Ledger requires MongoDB")
+    ensure_indexes()
+    snapshot = _latest_snapshot(account)
+    delta, _ = _sum_entries(account, snapshot["seq"])
+    return snapshot["balance"] + delta
+
+
+def get_influencer_balance(influencer_id):
+    return get_balance(influencer_account(influencer_id))
+
+
+def can_withdraw(influencer_id, amount):
+    return get_influencer_balance(influencer_id) >= int(amount)
+
+
+def snapshot_account(account):
+    """Record a balance snapshot covering entries that have settled.
+
+    Sequence numbers are allocated before the entry is inserted, so only
+    entries older than LEDGER_SNAPSHOT_SETTLE_SECONDS are folded in; a
+    snapshot never skips over a sequence number that is still in flight.
+    """
+    if mongo_db is None:
+        raise LedgerError("Ledger requires MongoDB")
+    ensure_indexes()
+    settle_seconds = current_app.config.get("LEDGER_SNAPSHOT_SETTLE_SECONDS", 5)
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    snapshot = _latest_snapshot(account)
+
+    newest_settled = _entries().find_one(
+        {"account": account, "seq": {"$gt": snapshot["seq"]}, "created_at": {"$lte": cutoff}},
+        {"seq": 1},
+        sort=[("seq", -1)],
+    )
+    if not newest_settled:
+        return None
+
+    delta, last_seq = _sum_entries(account, snapshot["seq"], newest_settled["seq"])
+    doc = {
+        "account": account,
+        "seq": last_seq,
+        "balance": snapshot["balance"] + delta,
+        "created_at": datetime.utcnow(),
+    }
+    _snapshots().insert_one(doc)
+    return doc
+
+
+def snapshot_all():
+    """Snapshot every account (run periodically)"""
+    if mongo_db is None:
+        raise LedgerError("Ledger requires MongoDB")
+    count = 0
+    for account in _accounts().find({}, {"_id": 1}):
+        if snapshot_account(account["_id"]):
+            count += 1
+    return count
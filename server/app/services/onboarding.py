@@ -0,0 +1,140 @@
+import csv
+import io
+from datetime import datetime
+
+from flask import current_app, request
+
+from ..utils.phone import clean_msisdn
+from . import shortcodes
+
+# Accepted column names (CSV headers or JSON keys) -> stored field
+COLUMNS = {
+    "name": "name",
+    "phone": "phone",
+    "msisdn": "phone",
+    "imageurl": "imageUrl",
+    "image_url": "imageUrl",
+    "ussd_shortcode": "ussd_shortcode",
+    "shortcode": "ussd_shortcode",
+    "received": "received",
+}
+
+
+class OnboardingError(ValueError):
+    pass
+
+
+def read_rows():
+    """Rows from this request: a JSON array (or {"influencers": [...]}), or a CSV upload in `file`"""
+    upload = request.files.get("file")
+    if upload is not None or request.mimetype == "text/csv":
+        raw = upload.read() if upload is not None else request.get_data()
+        try:
+            text = raw.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise OnboardingError("CSV must be UTF-8 encoded")
+        rows = list(csv.DictReader(io.StringIO(text)))
+    else:
+        payload = request.get_json(silent=True)
+        rows = payload.get("influencers") if isinstance(payload, dict) else payload
+        if not isinstance(rows, list):
+            raise OnboardingError("Send a JSON array of influencers or a CSV file")
+    if not rows:
+        raise OnboardingError("No influencers to onboard")
+    max_rows = current_app.config.get("INFLUENCER_BULK_MAX_ROWS", 5000)
+    if len(rows) > max_rows:
+        raise OnboardingError(f"At most {max_rows} influencers per request")
+    return rows
+
+
+def _clean(row):
+    if not isinstance(row, dict):
+        return None, "row must be an object"
+    item = {}
+    for key, value in row.items():
+        field = COLUMNS.get(str(key or "").strip().lower())
+        if field and value not in (None, ""):
+            item[field] = value.strip() if isinstance(value, str) else value
+    if not item.get("name"):
+        return None, "name is required"
+    phone = clean_msisdn(item.get("phone"))
+    if not phone.isdigit() or not 9 <= len(phone) <= 15:
+        return None, "phone is missing or invalid"
+    try:
+        received = int(float(item.get("received") or 0))
+    except (TypeError, ValueError):
+        return None, "received must be a number"
+    return {
+        "name": str(item["name"]),
+        "phone": phone,
+        "imageUrl": item.get("imageUrl", ""),
+        "ussd_shortcode": str(item["ussd_shortcode"]) if item.get("ussd_shortcode") else None,
+        "received": received,
+    }, None
+
+
+def prepare(rows, existing_phones):
+    """Validate rows and drop phone duplicates, within the batch and against the store, with a set lookup.
+
+    Returns (candidates, skipped); each candidate keeps its 1-based `row` number.
+    """
+    seen_phones = set(existing_phones)
+    candidates, skipped = [], []
+    for number, row in enumerate(rows, 1):
+        item, error = _clean(row)
+        if error:
+            skipped.append({"row": number, "reason": error})
+        elif item["phone"] in seen_phones:
+            skipped.append({"row": number, "phone": item["phone"], "reason": "duplicate phone"})
+        else:
+            seen_phones.add(item["phone"])
+            candidates.append({"row": number, **item})
+    return candidates, skipped
+
+
+def onboard(rows, store):
+    """Validate, dedupe and create influencers in `store` (the list the live routes read).
+
+    Phones are compared in normalized form. Shortcodes come from the shortcode
+    service: requested codes are claimed first, so the rest of the batch cannot
+    take them, then the remaining rows get codes in one allocator pass. The
+    batch is appended in one go. Returns (created, skipped).
+    """
+    existing_phones = {clean_msisdn(inf.get("phone")) for inf in store}
+    candidates, skipped = prepare(rows, existing_phones)
+
+    next_id = max((inf["id"] for inf in store), default=0) + 1
+    accepted = []
+    for item in candidates:
+        if item["ussd_shortcode"]:
+            try:
+                shortcodes.claim(item["ussd_shortcode"], next_id)
+            except shortcodes.ShortcodeTaken:
+                skipped.append({"row": item["row"], "ussd_shortcode": item["ussd_shortcode"], "reason": "shortcode taken"})
+                continue
+        accepted.append((next_id, item))
+        next_id += 1
+
+    pending = [influencer_id for influencer_id, item in accepted if not item["ussd_shortcode"]]
+    allocated = dict(zip(pending, shortcodes.allocate_many(pending)))
+
+    now = datetime.utcnow().isoformat()
+    created = []
+    for influencer_id, item in accepted:
+        code = item["ussd_shortcode"] or allocated.get(influencer_id)
+        if code is None:
+            skipped.append({"row": item["row"], "phone": item["phone"], "reason": "no free shortcodes"})
+            continue
+        created.append({
+            "id": influencer_id,
+            "name": item["name"],
+            "phone": item["phone"],
+            "received": item["received"],
+            "imageUrl": item["imageUrl"],
+            "ussd_shortcode": code,
+            "status": "active",
+            "created_at": now,
+        })
+    store.extend(created)
+    skipped.sort(key=lambda entry: entry["row"])
+    return created, skipped
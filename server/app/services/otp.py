@@ -0,0 +1,151 @@
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta
+
+from flask import current_app
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from . import sms
+from ..extensions import db
+from ..models import OtpCode
+from ..utils.phone import normalize_msisdn
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+_indexes_ready = False
+
+
+class OtpError(Exception):
+    pass
+
+
+class OtpThrottled(OtpError):
+    def __init__(self, retry_after):
+        super().__init__("Please wait before requesting another code")
+        self.retry_after = retry_after
+
+
+def _codes():
+    return mongo_db.get_collection("otp_codes")
+
+
+def _config(key, default):
+    return current_app.config.get(key, default)
+
+
+def _hash(phone, code):
+    """Keyed hash so a leaked table can't be brute-forced offline"""
+    key = current_app.config["SECRET_KEY"].encode()
+    return hmac.new(key, f"{phone}:{code}".encode(), hashlib.sha256).hexdigest()
+
+
+def ensure_indexes():
+    """One live code per phone; expired codes are removed by the TTL monitor"""
+    global _indexes_ready
+    if _indexes_ready or mongo_db is None:
+        return
+    _codes().create_index("phone", unique=True)
+    _codes().create_index([("phone", 1), ("expires_at", 1)])
+    _codes().create_index("expires_at", expireAfterSeconds=0)
+    _indexes_ready = True
+
+
+def _new_code():
+    digits = _config("OTP_DIGITS", 6)
+    return str(secrets.randbelow(10 ** digits)).zfill(digits)
+
+
+def request_code(phone):
+    """Issue a code for `phone` and queue the SMS; raises OtpThrottled on quick resends"""
+    phone = normalize_msisdn(phone)
+    if not phone:
+        raise OtpError("phone is required")
+    now = datetime.utcnow()
+    resend_after = timedelta(seconds=_config("OTP_RESEND_SECONDS", 60))
+    code = _new_code()
+    fields = {
+        "code_hash": _hash(phone, code),
+        "expires_at": now + timedelta(seconds=_config("OTP_TTL_SECONDS", 300)),
+        "sent_at": now,
+        "attempts": 0,
+    }
+
+    if mongo_db is not None:
+        ensure_indexes()
+        try:
+            # Matches only when no code exists or the last one is old enough to replace;
+            # otherwise the upsert collides with the unique phone index
+            _codes().find_one_and_update(
+                {"phone": phone, "sent_at": {"$lte": now - resend_after}},
+                {"$set": fields},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            existing = _codes().find_one({"phone": phone}, {"sent_at": 1}) or {"sent_at": now}
+            raise OtpThrottled((existing["sent_at"] + resend_after - now).total_seconds())
+    else:
+        existing = OtpCode.query.filter_by(phone=phone).first()
+        if existing and existing.created_at > now - resend_after:
+            raise OtpThrottled((existing.created_at + resend_after - now).total_seconds())
+        # Replace rather than append, so the table holds at most one row per phone
+        OtpCode.query.filter_by(phone=phone).delete()
+        db.session.add(OtpCode(phone=phone, code=fields["code_hash"], expires_at=fields["expires_at"], created_at=now))
+        db.session.commit()
+
+    sms.send(phone, f"Your verification code is {code}. It expires in {_config('OTP_TTL_SECONDS', 300) // 60} minutes.")
+    return True
+
+
+def verify_code(phone, code):
+    """Check a code with one indexed lookup and a constant-time compare; codes are single use"""
+    phone = normalize_msisdn(phone)
+    if not phone or not code:
+        return False
+    now = datetime.utcnow()
+    expected = _hash(phone, str(code).strip())
+
+    if mongo_db is not None:
+        ensure_indexes()
+        doc = _codes().find_one_and_update(
+            {"phone": phone, "expires_at": {"$gt": now}, "attempts": {"$lt": _config("OTP_MAX_ATTEMPTS", 5)}},
+            {"$inc": {"attempts": 1}},
+            projection={"code_hash": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None or not hmac.compare_digest(doc["code_hash"], expected):
+            return False
+        # Only the request that deletes the code wins a concurrent double submit
+        return _codes().delete_one({"_id": doc["_id"], "code_hash": expected}).deleted_count == 1
+
+    row = OtpCode.query.filter(OtpCode.phone == phone, OtpCode.expires_at > now).first()
+    if row is None or row.attempts >= _config("OTP_MAX_ATTEMPTS", 5):
+        return False
+    row.attempts += 1
+    if not hmac.compare_digest(row.code, expected):
+        db.session.commit()
+        return False
+    db.session.delete(row)
+    db.session.commit()
+    return True
+
+
+def purge_expired(batch_size=1000):
+    """Delete expired SQL rows in batches (MongoDB relies on its TTL index)"""
+    if mongo_db is not None:
+        return 0
+    purged = 0
+    while True:
+        ids = [row.id for row in OtpCode.query.with_entities(OtpCode.id).filter(
+            OtpCode.expires_at <= datetime.utcnow()
+        ).limit(batch_size)]
+        if not ids:
+            return purged
+        OtpCode.query.filter(OtpCode.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        purged += len(ids)
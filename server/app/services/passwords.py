@@ -0,0 +1,140 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from threading import BoundedSemaphore, Lock
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from ..config import get_config
+
+_pool = {"executor": None, "pid": None, "slots": None}
+_pool_lock = Lock()
+_stats = {"in_flight": 0, "completed": 0, "rejected": 0, "total_ms": 0.0}
+_stats_lock = Lock()
+# PASSWORD_HASH_METHOD -> the prefix of hashes it produces
+_prefixes = {}
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503"""
+    pass
+
+
+def _setting(key):
+    if has_app_context():
+        return current_app.config.get(key, getattr(get_config(), key))
+    return getattr(get_config(), key)
+
+
+def _workers():
+    workers = _setting("PASSWORD_HASH_WORKERS")
+    if workers < 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def _max_queue():
+    return _setting("PASSWORD_HASH_MAX_QUEUE") or _workers() * 8
+
+
+def _executor():
+    """Per-process pool, recreated after a fork (e.g. gunicorn workers)"""
+    with _pool_lock:
+        if _pool["executor"] is None or _pool["pid"] != os.getpid():
+            _pool["executor"] = ProcessPoolExecutor(max_workers=_workers())
+            _pool["slots"] = BoundedSemaphore(_max_queue())
+            _pool["pid"] = os.getpid()
+        return _pool["executor"], _pool["slots"]
+
+
+def _run(fn, *args):
+    """Run a CPU-bound hashing call on the pool.
+
+    Fails fast with HashingBusy when the queue is full, and again if the hash
+    isn't back within PASSWORD_HASH_TIMEOUT, so request threads never pile up
+    behind the pool. A slot is only freed when its hash actually finishes.
+    """
+    if _workers() == 0:
+        return fn(*args)
+
+    executor, slots = _executor()
+    if not slots.acquire(blocking=False):
+        with _stats_lock:
+            _stats["rejected"] += 1
+        raise HashingBusy("Password hashing queue is full")
+
+    started = time.perf_counter()
+    with _stats_lock:
+        _stats["in_flight"] += 1
+
+    def _done(_future):
+        slots.release()
+        with _stats_lock:
+            _stats["in_flight"] -= 1
+            _stats["completed"] += 1
+            _stats["total_ms"] += (time.perf_counter() - started) * 1000
+
+    try:
+        future = executor.submit(fn, *args)
+    except Exception:
+        _done(None)
+        raise
+    future.add_done_callback(_done)
+    try:
+        return future.result(timeout=_setting("PASSWORD_HASH_TIMEOUT"))
+    except FutureTimeout:
+        with _stats_lock:
+            _stats["rejected"] += 1
+        raise HashingBusy("Password hashing timed out")
+
+
+def hash_password(password):
+    """Hash with the configured method (e.g. pbkdf2:sha256:600000 or scrypt)"""
+    return _run(generate_password_hash, password, _setting("PASSWORD_HASH_METHOD"))
+
+
+def hash_passwords(passwords):
+    """Hash several passwords in parallel (seeding, bulk imports)"""
+    method = _setting("PASSWORD_HASH_METHOD")
+    if _workers() == 0:
+        return [generate_password_hash(password, method) for password in passwords]
+    executor, _ = _executor()
+    return list(executor.map(generate_password_hash, passwords, [method] * len(passwords)))
+
+
+def verify_password(password_hash, password):
+    if not password_hash:
+        return False
+    return _run(check_password_hash, password_hash, password)
+
+
+def _method_prefix(method):
+    """Parameter prefix werkzeug writes for `method` ("scrypt" -> "scrypt:32768:8:1"), computed once"""
+    prefix = _prefixes.get(method)
+    if prefix is None:
+        prefix = _prefixes[method] = generate_password_hash("", method).split("$", 1)[0]
+    return prefix
+
+
+def needs_rehash(password_hash):
+    """True when the stored hash was made with different parameters than configured"""
+    if not password_hash:
+        return False
+    return password_hash.split("$", 1)[0] != _method_prefix(_setting("PASSWORD_HASH_METHOD"))
+
+
+def metrics():
+    with _stats_lock:
+        stats = dict(_stats)
+    workers = _workers()
+    return {
+        "method": _setting("PASSWORD_HASH_METHOD"),
+        "workers": workers,
+        "max_queue": _max_queue() if workers else 0,
+        "in_flight": stats["in_flight"],
+        "queue_depth": max(stats["in_flight"] - workers, 0),
+        "completed": stats["completed"],
+        "rejected": stats["rejected"],
+        "avg_ms": round(stats["total_ms"] / stats["completed"], 2) if stats["completed"] else 0.0,
+    }
@@ -0,0 +1,454 @@
+import base64
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from flask import current_app
+from pymongo import UpdateOne
+
+from . import ledger
+from ..utils.phone import normalize_msisdn
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+_token = {"value": None, "expires_at": 0}
+_token_lock = Lock()
+_session = None
+
+
+class PayoutError(Exception):
+    pass
+
+
+def _withdrawals():
+    return mongo_db.get_collection("withdrawals")
+
+
+def _results():
+    return mongo_db.get_collection("b2c_results")
+
+
+def _dead_letters():
+    return mongo_db.get_collection("b2c_dead_letters")
+
+
+def _config(key, default=None):
+    return current_app.config.get(key) or default
+
+
+def _http():
+    """Shared session whose connection pool matches the submit concurrency"""
+    global _session
+    if _session is None:
+        size = _config("PAYOUT_CONCURRENCY", 4)
+        _session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=size, pool_maxsize=size)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
+
+
+def _access_token():
+    """OAuth token for the Daraja API, cached until shortly before it expires"""
+    with _token_lock:
+        if _token["value"] and _token["expires_at"] > time.monotonic():
+            return _token["value"]
+        credentials = f"{_config('DARAJA_CONSUMER_KEY', '')}:{_config('DARAJA_CONSUMER_SECRET', '')}"
+        response = _http().get(
+            f"{_config('DARAJA_BASE_URL')}/oauth/v1/generate",
+            params={"grant_type": "client_credentials"},
+            headers={"Authorization": "Basic " + base64.b64encode(credentials.encode()).decode()},
+            timeout=_config("PAYOUT_REQUEST_TIMEOUT", 10),
+        )
+        response.raise_for_status()
+        data = response.json()
+        _token["value"] = data["access_token"]
+        _token["expires_at"] = time.monotonic() + int(data.get("expires_in", 3599)) - 60
+        return _token["value"]
+
+
+def ensure_indexes():
+    if mongo_db is None:
+        return
+    _withdrawals().create_index([("status", 1), ("created_at", 1)])
+    _withdrawals().create_index("batch_id")
+    _withdrawals().create_index("originator_conversation_id")
+    _withdrawals().create_index("status_query_id", sparse=True)
+    _withdrawals().create_index([("status", 1), ("updated_at", 1)])
+    _results().create_index([("applied", 1), ("received_at", 1)])
+
+
+def claim_batch(batch_size):
+    """Atomically move up to `batch_size` approved withdrawals to `processing`"""
+    candidates = _withdrawals().find(
+        {"status": "approved"}, {"id": 1, "_id": 0}
+    ).sort("created_at", 1).limit(batch_size)
+    ids = [doc["id"] for doc in candidates]
+    if not ids:
+        return None, []
+
+    batch_id = uuid.uuid4().hex
+    # Concurrent runners may race for the same ids; the status filter lets only one win each
+    _withdrawals().update_many(
+        {"id": {"$in": ids}, "status": "approved"},
+        {"$set": {"status": "processing", "batch_id": batch_id, "updated_at": datetime.utcnow()}},
+    )
+    return batch_id, list(_withdrawals().find({"batch_id": batch_id}))
+
+
+def _payout_phones(batch):
+    """Destination MSISDN per withdrawal, falling back to the influencer's phone"""
+    missing = {w["influencer_id"] for w in batch if not w.get("phone")}
+    phones = {}
+    if missing:
+        for influencer in mongo_db.get_collection("influencers").find(
+            {"id": {"$in": list(missing)}}, {"id": 1, "phone": 1}
+        ):
+            phones[influencer["id"]] = influencer.get("phone")
+    return {w["id"]: normalize_msisdn(w.get("phone") or phones.get(w["influencer_id"])) for w in batch}
+
+
+def _callback_url(url):
+    """`url` carrying DARAJA_CALLBACK_SECRET as ?token=, which the webhooks check"""
+    secret = _config("DARAJA_CALLBACK_SECRET", "")
+    if not url or not secret:
+        return url
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != "token"] + [("token", secret)]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _b2c_settings():
+    """Request settings read once per batch; worker threads have no app context"""
+    return {
+        "url": f"{_config('DARAJA_BASE_URL')}/mpesa/b2c/v1/paymentrequest",
+        "initiator": _config("DARAJA_B2C_INITIATOR_NAME", ""),
+        "credential": _config("DARAJA_B2C_SECURITY_CREDENTIAL", ""),
+        "shortcode": _config("DARAJA_B2C_SHORTCODE") or _config("DARAJA_SHORTCODE", ""),
+        "result_url": _callback_url(_config("DARAJA_B2C_RESULT_URL", "")),
+        "timeout_url": _callback_url(_config("DARAJA_B2C_TIMEOUT_URL", "")),
+        "timeout": _config("PAYOUT_REQUEST_TIMEOUT", 10),
+    }
+
+
+def _originator_id(withdrawal):
+    return f"wd-{withdrawal['id']}-{withdrawal['batch_id'][:8]}"
+
+
+def _submit(session, settings, token, withdrawal, phone):
+    """Send one B2C payment request; returns (withdrawal, outcome).
+
+    The outcome is the accepted response body, {"rejected": reason} when Daraja
+    definitely refused the request, or {"unconfirmed": reason} when the request
+    may have reached Daraja (read timeout, reset, unparsable reply); only a
+    result/timeout callback can settle those.
+    """
+    body = {
+        "OriginatorConversationID": _originator_id(withdrawal),
+        "InitiatorName": settings["initiator"],
+        "SecurityCredential": settings["credential"],
+        "CommandID": "BusinessPayment",
+        "Amount": int(withdrawal["amount"]),
+        "PartyA": settings["shortcode"],
+        "PartyB": phone,
+        "Remarks": f"Withdrawal {withdrawal['id']}",
+        "QueueTimeOutURL": settings["timeout_url"],
+        "ResultURL": settings["result_url"],
+        "Occasion": "payout",
+    }
+    try:
+        response = session.post(
+            settings["url"],
+            json=body,
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=settings["timeout"],
+        )
+    except requests.exceptions.ConnectTimeout as e:
+        # The connection was never established, so nothing was sent
+        return withdrawal, {"rejected": str(e)}
+    except Exception as e:
+        return withdrawal, {"unconfirmed": str(e)}
+    try:
+        data = response.json()
+    except ValueError:
+        return withdrawal, {"unconfirmed": f"HTTP {response.status_code}: {response.text[:200]}"}
+    if not isinstance(data, dict):
+        return withdrawal, {"unconfirmed": f"HTTP {response.status_code}: unexpected body"}
+
+    code = data.get("ResponseCode")
+    if response.status_code == 200 and str(code) == "0":
+        data.setdefault("OriginatorConversationID", body["OriginatorConversationID"])
+        return withdrawal, data
+    if (code is not None and str(code) != "0") or data.get("errorCode"):
+        return withdrawal, {"rejected": data.get("errorMessage") or data.get("ResponseDescription") or response.text}
+    return withdrawal, {"unconfirmed": f"HTTP {response.status_code}: {response.text[:200]}"}
+
+
+def submit_batch(batch):
+    """Submit a claimed batch with bounded concurrency.
+
+    Withdrawals are marked `submitted` (with their originator id) before any
+    request goes out, so a callback can never arrive for a withdrawal that is
+    still `processing`. Only definite rejections are failed and refunded;
+    unconfirmed submissions stay `submitted` until their callback arrives.
+    Returns (submitted, failed).
+    """
+    token = _access_token()
+    session = _http()
+    settings = _b2c_settings()
+    phones = _payout_phones(batch)
+
+    _withdrawals().bulk_write([
+        UpdateOne(
+            {"_id": withdrawal["_id"], "status": "processing"},
+            {"$set": {
+                "status": "submitted",
+                "originator_conversation_id": _originator_id(withdrawal),
+                "updated_at": datetime.utcnow(),
+            }},
+        )
+        for withdrawal in batch
+    ], ordered=False)
+
+    operations = []
+    failed = []
+    with ThreadPoolExecutor(max_workers=_config("PAYOUT_CONCURRENCY", 4)) as pool:
+        futures = [pool.submit(_submit, session, settings, token, w, phones[w["id"]]) for w in batch]
+        for future in futures:
+            withdrawal, outcome = future.result()
+            now = datetime.utcnow()
+            if "rejected" in outcome:
+                failed.append(withdrawal)
+                operations.append(UpdateOne(
+                    {"_id": withdrawal["_id"], "status": "submitted"},
+                    {"$set": {"status": "failed", "failure_reason": outcome["rejected"], "updated_at": now}},
+                ))
+            elif "unconfirmed" in outcome:
+                operations.append(UpdateOne(
+                    {"_id": withdrawal["_id"]},
+                    {"$set": {"submit_error": outcome["unconfirmed"], "updated_at": now}},
+                ))
+            else:
+                operations.append(UpdateOne(
+                    {"_id": withdrawal["_id"]},
+                    {"$set": {"external_ref": outcome.get("ConversationID"), "updated_at": now}},
+                ))
+
+    if operations:
+        _withdrawals().bulk_write(operations, ordered=False)
+    for withdrawal in failed:
+        ledger.reverse_withdrawal(withdrawal["id"], withdrawal["influencer_id"], withdrawal["amount"])
+    return len(batch) - len(failed), len(failed)
+
+
+def record_result(payload, timed_out=False):
+    """Persist a B2C result or timeout callback; statuses are applied later in bulk"""
+    if mongo_db is None:
+        return False
+    result = payload.get("Result") or {}
+    _results().insert_one({
+        "originator_conversation_id": result.get("OriginatorConversationID"),
+        "conversation_id": result.get("ConversationID"),
+        "result_code": result.get("ResultCode"),
+        "result_desc": result.get("ResultDesc"),
+        "transaction_id": result.get("TransactionID"),
+        "timed_out": timed_out,
+        "applied": False,
+        "received_at": datetime.utcnow(),
+    })
+    return True
+
+
+def _dead_letter(results, reason):
+    """Move results that can never apply out of the pending queue, keeping them for inspection"""
+    if not results:
+        return
+    now = datetime.utcnow()
+    _dead_letters().insert_many([{**result, "reason": reason, "dead_lettered_at": now} for result in results])
+    _results().delete_many({"_id": {"$in": [result["_id"] for result in results]}})
+
+
+def query_stale_submissions(limit=100):
+    """Ask Daraja for the outcome of withdrawals left `submitted` without a callback.
+
+    Each stale withdrawal gets a TransactionStatus query keyed by a fresh
+    `status_query_id`; the answer arrives on DARAJA_B2C_STATUS_RESULT_URL and
+    is recorded by record_status_result. Bumping `updated_at` spaces repeat
+    queries by PAYOUT_STATUS_QUERY_AFTER_SECONDS. Returns the number queried.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get("PAYOUT_STATUS_QUERY_AFTER_SECONDS", 900))
+    stale = list(_withdrawals().find(
+        {"status": "submitted", "updated_at": {"$lte": cutoff}}
+    ).sort("updated_at", 1).limit(limit))
+    if not stale:
+        return 0
+
+    token = _access_token()
+    status_url = _callback_url(_config("DARAJA_B2C_STATUS_RESULT_URL", ""))
+    shortcode = _config("DARAJA_B2C_SHORTCODE") or _config("DARAJA_SHORTCODE", "")
+    queried = 0
+    for withdrawal in stale:
+        query_id = f"{withdrawal['originator_conversation_id']}-q{uuid.uuid4().hex[:8]}"
+        try:
+            response = _http().post(
+                f"{_config('DARAJA_BASE_URL')}/mpesa/transactionstatus/v1/query",
+                json={
+                    "Initiator": _config("DARAJA_B2C_INITIATOR_NAME", ""),
+                    "SecurityCredential": _config("DARAJA_B2C_SECURITY_CREDENTIAL", ""),
+                    "CommandID": "TransactionStatusQuery",
+                    "TransactionID": withdrawal.get("transaction_id") or "",
+                    "OriginatorConversationID": query_id,
+                    "OriginalConversationID": withdrawal["originator_conversation_id"],
+                    "PartyA": shortcode,
+                    "IdentifierType": "4",
+                    "ResultURL": status_url,
+                    "QueueTimeOutURL": status_url,
+                    "Remarks": f"Withdrawal {withdrawal['id']} status",
+                    "Occasion": "payout",
+                },
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=_config("PAYOUT_REQUEST_TIMEOUT", 10),
+            )
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Status query for withdrawal {withdrawal['id']} failed: {e}")
+            continue
+        _withdrawals().update_one(
+            {"_id": withdrawal["_id"], "status": "submitted"},
+            {"$set": {"status_query_id": query_id, "updated_at": datetime.utcnow()}, "$inc": {"status_queries": 1}},
+        )
+        queried += 1
+    return queried
+
+
+def record_status_result(payload):
+    """Turn a TransactionStatus answer into a B2C result for its withdrawal.
+
+    Only definite outcomes are recorded; errors, timeouts and in-flight
+    statuses leave the withdrawal `submitted` for the next sweep.
+    """
+    if mongo_db is None:
+        return False
+    result = payload.get("Result") or {}
+    withdrawal = _withdrawals().find_one(
+        {"status_query_id": result.get("OriginatorConversationID")}, {"originator_conversation_id": 1}
+    )
+    parameters = (result.get("ResultParameters") or {}).get("ResultParameter") or []
+    if isinstance(parameters, dict):
+        parameters = [parameters]
+    values = {item.get("Key"): item.get("Value") for item in parameters if isinstance(item, dict)}
+    status = str(values.get("TransactionStatus") or "")
+    if withdrawal is None or str(result.get("ResultCode")) != "0" or status not in ("Completed", "Failed", "Declined"):
+        return False
+    _results().insert_one({
+        "originator_conversation_id": withdrawal["originator_conversation_id"],
+        "conversation_id": result.get("ConversationID"),
+        "result_code": 0 if status == "Completed" else status,
+        "result_desc": f"Transaction status: {status}",
+        "transaction_id": values.get("ReceiptNo"),
+        "timed_out": False,
+        "applied": False,
+        "received_at": datetime.utcnow(),
+    })
+    return True
+
+
+def apply_results(limit=1000):
+    """Fold stored callbacks into withdrawal statuses with a single bulk write.
+
+    A result is marked applied only once its withdrawal has left `submitted`
+    (by this or an earlier callback). Results naming no withdrawal at all, or
+    still unmatched after PAYOUT_RESULT_MAX_AGE_SECONDS, are dead-lettered so
+    they cannot hold up the queue.
+    """
+    results = list(_results().find({"applied": False}).sort("received_at", 1).limit(limit))
+    if not results:
+        return 0
+
+    refs = list({result["originator_conversation_id"] for result in results if result.get("originator_conversation_id")})
+    known = {
+        doc["originator_conversation_id"]
+        for doc in _withdrawals().find({"originator_conversation_id": {"$in": refs}}, {"originator_conversation_id": 1})
+    }
+    unmatched = [result for result in results if result.get("originator_conversation_id") not in known]
+    _dead_letter(unmatched, "no matching withdrawal")
+    results = [result for result in results if result.get("originator_conversation_id") in known]
+    if not results:
+        return 0
+
+    now = datetime.utcnow()
+    operations = []
+    for result in results:
+        succeeded = not result["timed_out"] and str(result.get("result_code")) == "0"
+        update = {
+            "status": "paid" if succeeded else "failed",
+            "result_desc": result.get("result_desc"),
+            "updated_at": now,
+        }
+        if succeeded:
+            update["transaction_id"] = result.get("transaction_id")
+        # Only submitted withdrawals transition, so duplicate callbacks are ignored
+        operations.append(UpdateOne(
+            {"originator_conversation_id": result["originator_conversation_id"], "status": "submitted"},
+            {"$set": update},
+        ))
+    _withdrawals().bulk_write(operations, ordered=False)
+
+    refs = list({result["originator_conversation_id"] for result in results})
+    settled = {}
+    for withdrawal in _withdrawals().find(
+        {"originator_conversation_id": {"$in": refs}, "status": {"$in": ["paid", "failed"]}}
+    ):
+        settled[withdrawal["originator_conversation_id"]] = withdrawal
+    applied = [result["_id"] for result in results if result["originator_conversation_id"] in settled]
+    if applied:
+        _results().update_many({"_id": {"$in": applied}}, {"$set": {"applied": True}})
+    cutoff = now - timedelta(seconds=current_app.config.get("PAYOUT_RESULT_MAX_AGE_SECONDS", 86400))
+    _dead_letter(
+        [r for r in results if r["originator_conversation_id"] not in settled and r["received_at"] <= cutoff],
+        "withdrawal never settled",
+    )
+
+    # Reversals are keyed by withdrawal id in the ledger, so repeats are no-ops
+    for withdrawal in settled.values():
+        if withdrawal["status"] == "failed":
+            ledger.reverse_withdrawal(withdrawal["id"], withdrawal["influencer_id"], withdrawal["amount"])
+    return len(applied)
+
+
+def run_payouts(max_batches=None):
+    """Drain approved withdrawals batch by batch, query stuck submissions, then apply any pending callbacks"""
+    if mongo_db is None:
+        raise PayoutError("Payouts require MongoDB")
+    ensure_indexes()
+
+    batch_size = _config("PAYOUT_BATCH_SIZE", 50)
+    summary = {"batches": 0, "submitted": 0, "failed": 0, "status_queries": 0, "results_applied": 0}
+    while max_batches is None or summary["batches"] < max_batches:
+        batch_id, batch = claim_batch(batch_size)
+        if not batch:
+            break
+        try:
+            submitted, failed = submit_batch(batch)
+        except Exception:
+            # Nothing was recorded for this batch; hand it back for the next run
+            _withdrawals().update_many(
+                {"batch_id": batch_id, "status": "processing"},
+                {"$set": {"status": "approved"}, "$unset": {"batch_id": ""}},
+            )
+            raise
+        summary["batches"] += 1
+        summary["submitted"] += submitted
+        summary["failed"] += failed
+
+    summary["status_queries"] = query_stale_submissions()
+    summary["results_applied"] = apply_results()
+    return summary
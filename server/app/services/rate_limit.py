@@ -0,0 +1,165 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from threading import Lock
+
+from flask import current_app, jsonify, request
+from pymongo import ReturnDocument
+
+from ..utils.phone import normalize_msisdn
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# key -> theoretical arrival time (unix seconds) for the in-process backend
+_arrivals = {}
+# key -> unix time until which the shared backend already said no
+_denied = {}
+_lock = Lock()
+_indexes_ready = False
+
+
+def parse_rule(rule):
+    """'5/minute' -> (5, 60)"""
+    count, _, unit = rule.partition("/")
+    return int(count), PERIODS[unit.strip().rstrip("s")]
+
+
+def ensure_indexes():
+    """Expire limiter state once its theoretical arrival time has passed"""
+    global _indexes_ready
+    if _indexes_ready or mongo_db is None:
+        return
+    mongo_db.get_collection("rate_limits").create_index("expires_at", expireAfterSeconds=0)
+    _indexes_ready = True
+
+
+def _prune(now):
+    if len(_arrivals) > current_app.config.get("RATE_LIMIT_MAX_KEYS", 100000):
+        for key in [key for key, tat in _arrivals.items() if tat <= now]:
+            del _arrivals[key]
+    for key in [key for key, until in _denied.items() if until <= now]:
+        del _denied[key]
+
+
+def _hit_memory(key, count, period, now):
+    """GCRA: each request advances the key's theoretical arrival time by period/count"""
+    interval = period / count
+    with _lock:
+        tat = max(_arrivals.get(key, now), now) + interval
+        if tat - now > period:
+            return False, tat - period - now
+        _arrivals[key] = tat
+        if len(_arrivals) % 1024 == 0:
+            _prune(now)
+    return True, 0.0
+
+
+def _hit_shared(key, count, period, now):
+    """Same GCRA step, applied atomically in one round trip so it holds across workers"""
+    ensure_indexes()
+    interval = period / count
+    next_tat = {"$add": [{"$max": [{"$ifNull": ["$tat", now]}, now]}, interval]}
+    doc = mongo_db.get_collection("rate_limits").find_one_and_update(
+        {"_id": key},
+        [
+            {"$set": {"next_tat": next_tat}},
+            {"$set": {"allowed": {"$lte": [{"$subtract": ["$next_tat", now]}, period]}}},
+            {"$set": {
+                "tat": {"$cond": ["$allowed", "$next_tat", "$tat"]},
+                "expires_at": {"$cond": [
+                    "$allowed",
+                    datetime.utcfromtimestamp(now) + timedelta(seconds=period),
+                    "$expires_at",
+                ]},
+            }},
+        ],
+        projection={"allowed": 1, "next_tat": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc["allowed"]:
+        return True, 0.0
+    retry_after = doc["next_tat"] - period - now
+    # Remember the denial so repeats are rejected in memory until it lifts
+    with _lock:
+        _denied[key] = now + retry_after
+        if len(_denied) % 1024 == 0:
+            _prune(now)
+    return False, retry_after
+
+
+def _backend():
+    backend = current_app.config.get("RATE_LIMIT_BACKEND", "auto")
+    if backend == "auto":
+        return "mongo" if mongo_db is not None else "memory"
+    return backend
+
+
+def hit(key, rule):
+    """Count one request against `key`; returns (allowed, retry_after_seconds)"""
+    count, period = parse_rule(rule)
+    now = time.time()
+    until = _denied.get(key)
+    if until is not None and until > now:
+        return False, until - now
+    if _backend() == "mongo" and mongo_db is not None:
+        return _hit_shared(key, count, period, now)
+    return _hit_memory(key, count, period, now)
+
+
+def reset():
+    with _lock:
+        _arrivals.clear()
+        _denied.clear()
+
+
+def client_ip():
+    """Client address; X-Forwarded-For is only read when RATE_LIMIT_PROXY_HOPS trusted proxies are configured"""
+    hops = current_app.config.get("RATE_LIMIT_PROXY_HOPS", 0)
+    route = request.access_route
+    if hops and len(route) >= hops:
+        return route[-hops]
+    return request.remote_addr or "unknown"
+
+
+def _subject(kind):
+    if kind == "ip":
+        return client_ip()
+    data = request.get_json(force=True, silent=True) or {}
+    if kind == "email":
+        return str(data.get("email") or "").lower().strip() or None
+    if kind == "phone":
+        return normalize_msisdn(data.get("phone") or data.get("phone_number")) or None
+    raise ValueError(f"Unknown rate limit key: {kind}")
+
+
+def limit(scope, **rules):
+    """Rate-limit a route, e.g. @limit("login", ip="20/minute", email="5/minute").
+
+    Every rule that applies to the request must pass; a rejection answers 429
+    with Retry-After.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if current_app.config.get("RATE_LIMIT_ENABLED", True):
+                for kind, rule in rules.items():
+                    subject = _subject(kind)
+                    if subject is None:
+                        continue
+                    digest = hashlib.blake2b(subject.encode(), digest_size=12).hexdigest()
+                    allowed, retry_after = hit(f"{scope}:{kind}:{digest}", rule)
+                    if not allowed:
+                        response = jsonify({'message': 'Too many requests, please retry later'})
+                        response.headers['Retry-After'] = str(max(int(retry_after + 0.999), 1))
+                        return response, 429
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,110 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+
+from flask import current_app
+from pymongo import ReturnDocument
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+_indexes_ready = False
+
+
+class RefreshTokenError(Exception):
+    pass
+
+
+def _tokens():
+    return mongo_db.get_collection("refresh_tokens")
+
+
+def _hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def ensure_indexes():
+    """Lookup by hash, family revocation, and TTL cleanup of expired tokens"""
+    global _indexes_ready
+    if _indexes_ready or mongo_db is None:
+        return
+    _tokens().create_index("token_hash", unique=True)
+    _tokens().create_index("family")
+    _tokens().create_index("user_id")
+    _tokens().create_index("expires_at", expireAfterSeconds=0)
+    _indexes_ready = True
+
+
+def issue(user_id, family=None):
+    """Create an opaque refresh token; only its hash is stored"""
+    if mongo_db is None:
+        raise RefreshTokenError("Refresh tokens require MongoDB")
+    ensure_indexes()
+    token = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    _tokens().insert_one({
+        "token_hash": _hash(token),
+        "user_id": user_id,
+        "family": family or secrets.token_hex(8),
+        "used": False,
+        "revoked": False,
+        "created_at": now,
+        "expires_at": now + timedelta(days=current_app.config.get("REFRESH_TOKEN_DAYS", 30)),
+    })
+    return token
+
+
+def rotate(token):
+    """Consume a refresh token and return its (user_id, family).
+
+    Each token works once. Presenting an already used token means it was
+    copied, so the whole family is revoked and the holder must log in again.
+    """
+    if mongo_db is None:
+        raise RefreshTokenError("Refresh tokens require MongoDB")
+    ensure_indexes()
+    now = datetime.utcnow()
+    doc = _tokens().find_one_and_update(
+        {"token_hash": _hash(token), "used": False, "revoked": False, "expires_at": {"$gt": now}},
+        {"$set": {"used": True, "used_at": now}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is not None:
+        return doc["user_id"], doc["family"]
+
+    stale = _tokens().find_one({"token_hash": _hash(token)}, {"family": 1, "used": 1})
+    if stale is not None and stale.get("used"):
+        revoke_family(stale["family"])
+        raise RefreshTokenError("Refresh token reuse detected")
+    raise RefreshTokenError("Invalid refresh token")
+
+
+def revoke_family(family):
+    if mongo_db is None:
+        return 0
+    return _tokens().update_many({"family": family}, {"$set": {"revoked": True}}).modified_count
+
+
+def revoke_token(token):
+    """Revoke the family a presented token belongs to (logout)"""
+    if mongo_db is None or not token:
+        return 0
+    doc = _tokens().find_one({"token_hash": _hash(token)}, {"family": 1})
+    return revoke_family(doc["family"]) if doc else 0
+
+
+def revoke_user(user_id):
+    """Revoke every refresh token a user holds (password change, suspension)"""
+    if mongo_db is None:
+        return 0
+    return _tokens().update_many({"user_id": user_id, "revoked": False}, {"$set": {"revoked": True}}).modified_count
+
+
+def revoke_users(user_ids):
+    """revoke_user for many users in one update"""
+    if mongo_db is None or not user_ids:
+        return 0
+    return _tokens().update_many({"user_id": {"$in": list(user_ids)}, "revoked": False}, {"$set": {"revoked": True}}).modified_count
@@ -0,0 +1,158 @@
+import hashlib
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+
+from flask import current_app
+from pymongo.errors import DuplicateKeyError
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+# Overlap when pulling new revocations, so rows inserted slightly out of order aren't missed
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; no deletes, rebuilt to drop expired entries"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(int(capacity), 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+# jti -> expiry (unix seconds) for every revoked, unexpired token this worker knows about
+_revoked = {}
+_state = {"bloom": None, "synced_at": 0.0, "rebuilt_at": 0.0, "high_water": None}
+_lock = Lock()
+_sync_lock = Lock()
+_indexes_ready = False
+
+
+def _collection():
+    return mongo_db.get_collection("revoked_tokens")
+
+
+def ensure_indexes():
+    """Unique jti plus a TTL index so rows disappear when the token would have expired anyway"""
+    global _indexes_ready
+    if _indexes_ready or mongo_db is None:
+        return
+    _collection().create_index("jti", unique=True)
+    _collection().create_index("expires_at", expireAfterSeconds=0)
+    _collection().create_index("revoked_at")
+    _indexes_ready = True
+
+
+def _new_bloom(count):
+    capacity = max(current_app.config.get("REVOCATION_BLOOM_CAPACITY", 100000), count * 2)
+    return BloomFilter(capacity, current_app.config.get("REVOCATION_BLOOM_ERROR_RATE", 0.01))
+
+
+def _epoch(value):
+    """Mongo hands back naive UTC datetimes"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _remember(jti, expires_at):
+    _revoked[jti] = _epoch(expires_at)
+    _state["bloom"].add(jti)
+
+
+def _rebuild():
+    """Reload every unexpired revocation into a fresh filter"""
+    now = datetime.utcnow()
+    rows = list(_collection().find({"expires_at": {"$gt": now}}, {"jti": 1, "expires_at": 1, "revoked_at": 1}))
+    with _lock:
+        _revoked.clear()
+        _state["bloom"] = _new_bloom(len(rows))
+        for row in rows:
+            _remember(row["jti"], row["expires_at"])
+        _state["high_water"] = max((row["revoked_at"] for row in rows), default=now)
+        _state["rebuilt_at"] = _state["synced_at"] = time.monotonic()
+
+
+def _pull():
+    """Fetch revocations recorded by other workers since the last sync"""
+    since = _state["high_water"] - SYNC_OVERLAP
+    rows = list(_collection().find({"revoked_at": {"$gt": since}}, {"jti": 1, "expires_at": 1, "revoked_at": 1}))
+    with _lock:
+        for row in rows:
+            _remember(row["jti"], row["expires_at"])
+            _state["high_water"] = max(_state["high_water"], row["revoked_at"])
+        _state["synced_at"] = time.monotonic()
+
+
+def _maybe_sync():
+    if _state["bloom"] is None and mongo_db is None:
+        with _lock:
+            if _state["bloom"] is None:
+                _state["bloom"] = _new_bloom(0)
+        return
+    if mongo_db is None:
+        return
+
+    now = time.monotonic()
+    rebuild_due = _state["bloom"] is None or now - _state["rebuilt_at"] > current_app.config.get("REVOCATION_REBUILD_SECONDS", 600)
+    sync_due = now - _state["synced_at"] > current_app.config.get("REVOCATION_SYNC_SECONDS", 5)
+    if not (rebuild_due or sync_due):
+        return
+    # One request per worker refreshes; the rest keep using the current filter
+    if not _sync_lock.acquire(blocking=_state["bloom"] is None):
+        return
+    try:
+        ensure_indexes()
+        if rebuild_due:
+            _rebuild()
+        else:
+            _pull()
+    finally:
+        _sync_lock.release()
+
+
+def revoke(jti, expires_at):
+    """Revoke a token id until `expires_at` (a datetime or unix timestamp)"""
+    if not jti:
+        return False
+    if not isinstance(expires_at, datetime):
+        expires_at = datetime.utcfromtimestamp(expires_at)
+    _maybe_sync()
+
+    if mongo_db is not None:
+        try:
+            _collection().insert_one({"jti": jti, "expires_at": expires_at, "revoked_at": datetime.utcnow()})
+        except DuplicateKeyError:
+            pass
+    with _lock:
+        _remember(jti, expires_at)
+    return True
+
+
+def is_revoked(jti):
+    """Decided in memory: the Bloom filter rules out almost every live token without a set lookup"""
+    if not jti:
+        return False
+    _maybe_sync()
+    if jti not in _state["bloom"]:
+        return False
+    expires_at = _revoked.get(jti)
+    return expires_at is not None and expires_at > time.time()
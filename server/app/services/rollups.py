@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+GRANULARITIES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+_indexes_ready = False
+
+
+class RollupError(Exception):
+    pass
+
+
+def _rollups():
+    return mongo_db.get_collection("earnings_rollups")
+
+
+def ensure_indexes():
+    """One document per (influencer, granularity, bucket); range reads walk the same index"""
+    global _indexes_ready
+    if _indexes_ready or mongo_db is None:
+        return
+    _rollups().create_index([("influencer_id", 1), ("granularity", 1), ("bucket", 1)], unique=True)
+    _indexes_ready = True
+
+
+def bucket_start(at, granularity):
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def record_payment(influencer_id, amount, at=None):
+    """Add a settled payment to its hourly and daily buckets"""
+    if mongo_db is None:
+        return False
+    ensure_indexes()
+    at = at or datetime.utcnow()
+    _rollups().bulk_write([
+        UpdateOne(
+            {"influencer_id": influencer_id, "granularity": granularity, "bucket": bucket_start(at, granularity)},
+            {"$inc": {"amount": int(amount), "count": 1}},
+            upsert=True,
+        )
+        for granularity in GRANULARITIES
+    ], ordered=False)
+    return True
+
+
+def _payments_pipeline(start, end):
+    paid_at = {"$ifNull": ["$paid_at", "$created_at"]}
+    return [
+        {"$match": {
+            "status": "paid",
+            "$or": [
+                {"paid_at": {"$gte": start, "$lt": end}},
+                {"paid_at": None, "created_at": {"$gte": start, "$lt": end}},
+            ],
+        }},
+        # Older payment rows only reference their subscription
+        {"$lookup": {
+            "from": "subscribers",
+            "localField": "subscription_id",
+            "foreignField": "id",
+            "as": "subscription",
+        }},
+        {"$group": {
+            "_id": {
+                "influencer_id": {"$ifNull": ["$influencer_id", {"$arrayElemAt": ["$subscription.influencer_id", 0]}]},
+                "bucket": {"$dateFromParts": {
+                    "year": {"$year": paid_at},
+                    "month": {"$month": paid_at},
+                    "day": {"$dayOfMonth": paid_at},
+                    "hour": {"$hour": paid_at},
+                }},
+            },
+            "amount": {"$sum": "$amount"},
+            "count": {"$sum": 1},
+        }},
+    ]
+
+
+def backfill(start, end, chunk=timedelta(days=7)):
+    """Rebuild rollups for [start, end) from raw payments, one chunk at a time.
+
+    Buckets are overwritten rather than incremented, so re-running a range is
+    safe. Chunks cover whole days, and only buckets that lie entirely inside
+    the range are written: a trailing partial hour or day is left to the live
+    `record_payment` increments instead of being overwritten with a partial sum.
+    """
+    if mongo_db is None:
+        raise RollupError("Rollups require MongoDB")
+    ensure_indexes()
+    start = bucket_start(start, "day")
+    # The last complete hour and day inside the range
+    hour_end = bucket_start(end, "hour")
+    day_end = bucket_start(end, "day")
+    chunk = timedelta(days=max(1, chunk.days))
+    payments = mongo_db.get_collection("payments")
+
+    written = 0
+    chunk_start = start
+    while chunk_start < hour_end:
+        chunk_end = min(chunk_start + chunk, hour_end)
+        hourly = {}
+        daily = {}
+        for row in payments.aggregate(_payments_pipeline(chunk_start, chunk_end), allowDiskUse=True):
+            influencer_id = row["_id"]["influencer_id"]
+            if influencer_id is None:
+                continue
+            hour = row["_id"]["bucket"]
+            hourly[(influencer_id, hour)] = (row["amount"], row["count"])
+            day = bucket_start(hour, "day")
+            if day < day_end:
+                amount, count = daily.get((influencer_id, day), (0, 0))
+                daily[(influencer_id, day)] = (amount + row["amount"], count + row["count"])
+
+        operations = []
+        for granularity, buckets in (("hour", hourly), ("day", daily)):
+            for (influencer_id, bucket), (amount, count) in buckets.items():
+                operations.append(UpdateOne(
+                    {"influencer_id": influencer_id, "granularity": granularity, "bucket": bucket},
+                    {"$set": {"amount": int(amount), "count": count}},
+                    upsert=True,
+                ))
+        if operations:
+            _rollups().bulk_write(operations, ordered=False)
+            written += len(operations)
+        print(f"Rollup backfill {chunk_start.isoformat()} - {chunk_end.isoformat()}: {len(operations)} buckets")
+        chunk_start = chunk_end
+    return written
+
+
+def get_series(influencer_id, start, end, granularity="day"):
+    """Earnings per bucket over [start, end), read from rollups only; empty buckets are zero"""
+    if granularity not in GRANULARITIES:
+        raise RollupError(f"Unknown granularity: {granularity}")
+    if mongo_db is None:
+        raise RollupError("Rollups require MongoDB")
+    ensure_indexes()
+
+    start = bucket_start(start, granularity)
+    docs = _rollups().find(
+        {"influencer_id": influencer_id, "granularity": granularity, "bucket": {"$gte": start, "$lt": end}},
+        {"_id": 0, "bucket": 1, "amount": 1, "count": 1},
+    ).sort("bucket", 1)
+    found = {doc["bucket"]: doc for doc in docs}
+
+    series = []
+    step = GRANULARITIES[granularity]
+    bucket = start
+    while bucket < end:
+        doc = found.get(bucket, {})
+        series.append({
+            "bucket": bucket.isoformat(),
+            "amount": doc.get("amount", 0),
+            "count": doc.get("count", 0),
+        })
+        bucket += step
+    return series
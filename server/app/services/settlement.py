@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from pymongo import ReturnDocument
+
+from . import earnings, ledger, rollups
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+
+def _influencer_for(payment):
+    """Resolve the influencer a payment belongs to"""
+    if payment.get("influencer_id") is not None:
+        return payment["influencer_id"]
+    subscription = mongo_db.get_collection("subscribers").find_one(
+        {"id": payment.get("subscription_id")}, {"influencer_id": 1}
+    ) or {}
+    return subscription.get("influencer_id")
+
+
+def settle_payment(payment):
+    """Fan a paid payment out to the ledger and the earnings counter"""
+    influencer_id = _influencer_for(payment)
+    if influencer_id is None:
+        print(f"Payment {payment.get('id') or payment.get('_id')} has no influencer; skipping settlement")
+        return False
+
+    payment_id = payment.get("id") or str(payment.get("_id"))
+    amount = int(payment.get("amount") or 0)
+    # The ledger credit is idempotent per payment, so only count earnings once
+    if ledger.credit_payment(payment_id, influencer_id, amount):
+        earnings.increment_received(influencer_id, amount)
+        rollups.record_payment(influencer_id, amount, payment.get("paid_at"))
+    return True
+
+
+def record_stk_result(callback):
+    """Mark the payment matching an STK push callback as paid or failed"""
+    result = (callback.get("Body") or {}).get("stkCallback") or {}
+    checkout_id = result.get("CheckoutRequestID")
+    if mongo_db is None or not checkout_id:
+        return None
+
+    paid = result.get("ResultCode") == 0
+    metadata = {
+        item.get("Name"): item.get("Value")
+        for item in (result.get("CallbackMetadata") or {}).get("Item", [])
+    }
+    update = {
+        "status": "paid" if paid else "failed",
+        "result_desc": result.get("ResultDesc"),
+        "updated_at": datetime.utcnow(),
+    }
+    if paid:
+        update["paid_at"] = datetime.utcnow()
+        update["receipt"] = metadata.get("MpesaReceiptNumber")
+
+    # Only the first callback for a pending payment transitions it
+    payment = mongo_db.get_collection("payments").find_one_and_update(
+        {"external_ref": checkout_id, "status": "pending"},
+        {"$set": update},
+        return_document=ReturnDocument.AFTER,
+    )
+    if payment and paid:
+        settle_payment(payment)
+    return payment
@@ -0,0 +1,246 @@
+import os
+import time
+from datetime import datetime
+from threading import Lock
+
+from flask import current_app
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from ..models.influencer import Influencer
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+# Bit i set <=> code SHORTCODE_MIN + i is taken; one byte covers eight codes
+_state = {"bitmap": None, "low": None, "high": None, "loaded_at": 0.0, "pid": None, "seeded": False}
+_lock = Lock()
+
+# In-memory backing for routes that keep influencers in a process-local list:
+# `store` is that list, `held` maps each reserved code to its influencer id
+_memory = {"store": None, "held": {}}
+
+
+class ShortcodeError(Exception):
+    pass
+
+
+class ShortcodeTaken(ShortcodeError):
+    pass
+
+
+def bind_store(store):
+    """Reserve codes in-process against `store` (a list of influencer dicts) instead of Mongo/SQL.
+
+    The codes already in the store are reserved on first use; from then on
+    allocate/claim/release are the only way codes change hands.
+    """
+    with _lock:
+        _memory.update(store=store, held={})
+        _state.update(bitmap=None, seeded=False)
+
+
+def _in_memory():
+    return _memory["store"] is not None
+
+
+def _reservations():
+    return mongo_db.get_collection("shortcode_reservations")
+
+
+def _range():
+    low = current_app.config.get("SHORTCODE_MIN", 100)
+    high = current_app.config.get("SHORTCODE_MAX", 9999)
+    return low, high
+
+
+def _seed():
+    """Reserve the codes existing influencers already hold (seed data, hand-picked codes)"""
+    _reservations().create_index("number")
+    requests = [
+        UpdateOne(
+            {"_id": str(doc["ussd_shortcode"])},
+            {"$setOnInsert": {
+                "number": int(doc["ussd_shortcode"]) if str(doc["ussd_shortcode"]).isdigit() else None,
+                "influencer_id": doc.get("id"),
+                "reserved_at": datetime.utcnow(),
+            }},
+            upsert=True,
+        )
+        for doc in mongo_db.get_collection("influencers").find(
+            {"ussd_shortcode": {"$nin": [None, ""]}}, {"ussd_shortcode": 1, "id": 1, "_id": 0}
+        )
+    ]
+    if requests:
+        _reservations().bulk_write(requests, ordered=False)
+    _state["seeded"] = True
+
+
+def _seed_memory():
+    _memory["held"] = {
+        str(inf["ussd_shortcode"]): inf.get("id") for inf in _memory["store"] if inf.get("ussd_shortcode")
+    }
+    _state["seeded"] = True
+
+
+def _used_numbers(low, high):
+    if _in_memory():
+        return [int(code) for code in _memory["held"] if code.isdigit() and low <= int(code) <= high]
+    if mongo_db is not None:
+        docs = _reservations().find({"number": {"$gte": low, "$lte": high}}, {"number": 1, "_id": 0})
+        return [doc["number"] for doc in docs]
+    rows = Influencer.query.with_entities(Influencer.ussd_shortcode).filter(Influencer.ussd_shortcode.isnot(None))
+    return [int(code) for (code,) in rows if code.isdigit() and low <= int(code) <= high]
+
+
+def _load_locked():
+    """Rebuild the bitmap from the reservations (one projected, indexed query)"""
+    if _state["pid"] != os.getpid():
+        # A forked worker re-reads rather than trusting its parent's copy
+        _state["pid"] = os.getpid()
+        _state["seeded"] = False
+    if _in_memory():
+        # The store is process-local, so its reservations are seeded once and then kept
+        if not _state["seeded"]:
+            _seed_memory()
+    elif mongo_db is not None and not _state["seeded"]:
+        _seed()
+    low, high = _range()
+    bitmap = bytearray((high - low + 8) // 8)
+    for number in _used_numbers(low, high):
+        offset = number - low
+        bitmap[offset >> 3] |= 1 << (offset & 7)
+    _state.update(bitmap=bitmap, low=low, high=high, loaded_at=time.monotonic())
+
+
+def _bitmap_locked():
+    max_age = current_app.config.get("SHORTCODE_BITMAP_RELOAD_SECONDS", 300)
+    if (_state["bitmap"] is None or _state["pid"] != os.getpid()
+            or time.monotonic() - _state["loaded_at"] > max_age or (_state["low"], _state["high"]) != _range()):
+        _load_locked()
+    return _state["bitmap"]
+
+
+def _set_bit_locked(number, used):
+    low, high = _state["low"], _state["high"]
+    if _state["bitmap"] is None or not low <= number <= high:
+        return
+    offset = number - low
+    if used:
+        _state["bitmap"][offset >> 3] |= 1 << (offset & 7)
+    else:
+        _state["bitmap"][offset >> 3] &= ~(1 << (offset & 7)) & 0xFF
+
+
+def _first_free_locked():
+    bitmap = _bitmap_locked()
+    # Skip full bytes at C speed, then find the clear bit in the first partial byte
+    index = len(bitmap) - len(bitmap.lstrip(b"\xff"))
+    if index == len(bitmap):
+        return None
+    byte = bitmap[index]
+    bit = (~byte & (byte + 1)).bit_length() - 1
+    number = _state["low"] + index * 8 + bit
+    return number if number <= _state["high"] else None
+
+
+def _reserve(code, influencer_id):
+    """Atomically reserve `code`; the unique _id is what makes two workers unable to share it"""
+    _reservations().insert_one({
+        "_id": code,
+        "number": int(code) if code.isdigit() else None,
+        "influencer_id": influencer_id,
+        "reserved_at": datetime.utcnow(),
+    })
+
+
+def _allocate_locked(influencer_id):
+    reloaded = False
+    while True:
+        number = _first_free_locked()
+        if number is None:
+            raise ShortcodeError("No free shortcodes left in the configured range")
+        _set_bit_locked(number, True)
+        if _in_memory():
+            _memory["held"][str(number)] = influencer_id
+            return str(number)
+        if mongo_db is None:
+            # The unique ussd_shortcode column is the arbiter for SQLAlchemy inserts
+            return str(number)
+        try:
+            _reserve(str(number), influencer_id)
+            return str(number)
+        except DuplicateKeyError:
+            if reloaded:
+                continue
+            _load_locked()
+            reloaded = True
+
+
+def allocate(influencer_id=None):
+    """Reserve and return the lowest free shortcode in [SHORTCODE_MIN, SHORTCODE_MAX].
+
+    Served from this worker's bitmap; if another worker got there first, the
+    bitmap is reloaded once from the reservations instead of probing code by code.
+    """
+    with _lock:
+        return _allocate_locked(influencer_id)
+
+
+def allocate_many(influencer_ids):
+    """Reserve one code per id in a single pass over the bitmap.
+
+    Returns the codes in order; shorter than `influencer_ids` if the range runs out.
+    """
+    codes = []
+    with _lock:
+        for influencer_id in influencer_ids:
+            try:
+                codes.append(_allocate_locked(influencer_id))
+            except ShortcodeError:
+                break
+    return codes
+
+
+def claim(code, influencer_id=None):
+    """Reserve a specific code the caller asked for; raises ShortcodeTaken if it is held"""
+    code = str(code).strip()
+    if not code:
+        raise ShortcodeError("Shortcode must not be empty")
+    with _lock:
+        _bitmap_locked()
+        if _in_memory():
+            if code in _memory["held"]:
+                raise ShortcodeTaken(f"USSD shortcode {code} is already taken")
+            _memory["held"][code] = influencer_id
+        elif mongo_db is not None:
+            try:
+                _reserve(code, influencer_id)
+            except DuplicateKeyError:
+                raise ShortcodeTaken(f"USSD shortcode {code} is already taken")
+        elif Influencer.query.filter_by(ussd_shortcode=code).first() is not None:
+            raise ShortcodeTaken(f"USSD shortcode {code} is already taken")
+        if code.isdigit():
+            _set_bit_locked(int(code), True)
+    return code
+
+
+def release(code):
+    """Return a code to the pool (influencer terminated or deleted)"""
+    if not code:
+        return
+    code = str(code)
+    if _in_memory():
+        with _lock:
+            _memory["held"].pop(code, None)
+            if code.isdigit():
+                _set_bit_locked(int(code), False)
+        return
+    if mongo_db is not None:
+        _reservations().delete_one({"_id": code})
+    if code.isdigit():
+        with _lock:
+            _set_bit_locked(int(code), False)
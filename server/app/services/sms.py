@@ -0,0 +1,93 @@
+import os
+import queue
+import threading
+import time
+
+import requests
+from flask import current_app
+
+SANDBOX_URL = "https://api.sandbox.africastalking.com/version1/messaging"
+LIVE_URL = "https://api.africastalking.com/version1/messaging"
+
+_sender = {"queue": None, "thread": None, "pid": None}
+_sender_lock = threading.Lock()
+_stats = {"queued": 0, "sent": 0, "failed": 0, "dropped": 0}
+
+
+class SmsError(Exception):
+    pass
+
+
+def _settings():
+    """Read in the request thread; the sender thread has no app context"""
+    username = current_app.config.get("AT_USERNAME", "")
+    return {
+        "username": username,
+        "api_key": current_app.config.get("AT_API_KEY", ""),
+        "sender_id": current_app.config.get("AT_SENDER_ID", ""),
+        "url": SANDBOX_URL if username in ("", "sandbox") else LIVE_URL,
+        "timeout": current_app.config.get("SMS_REQUEST_TIMEOUT", 10),
+        "retries": current_app.config.get("SMS_MAX_RETRIES", 3),
+    }
+
+
+def _deliver(session, settings, phone, message):
+    if not settings["api_key"]:
+        # No credentials configured (local development): log instead of sending
+        print(f"SMS to {phone}: {message}")
+        return
+    data = {"username": settings["username"], "to": f"+{phone}", "message": message}
+    if settings["sender_id"]:
+        data["from"] = settings["sender_id"]
+    response = session.post(
+        settings["url"],
+        data=data,
+        headers={"apiKey": settings["api_key"], "Accept": "application/json"},
+        timeout=settings["timeout"],
+    )
+    if response.status_code >= 400:
+        raise SmsError(f"Africa's Talking returned {response.status_code}: {response.text[:200]}")
+
+
+def _worker(outbox):
+    session = requests.Session()
+    while True:
+        settings, phone, message = outbox.get()
+        for attempt in range(settings["retries"]):
+            try:
+                _deliver(session, settings, phone, message)
+                _stats["sent"] += 1
+                break
+            except (requests.RequestException, SmsError) as e:
+                print(f"SMS to {phone} failed (attempt {attempt + 1}): {e}")
+                time.sleep(2 ** attempt)
+        else:
+            _stats["failed"] += 1
+        outbox.task_done()
+
+
+def _outbox():
+    """Per-process queue and sender thread, recreated after a fork"""
+    with _sender_lock:
+        if _sender["queue"] is None or _sender["pid"] != os.getpid():
+            _sender["queue"] = queue.Queue(maxsize=current_app.config.get("SMS_QUEUE_SIZE", 1000))
+            _sender["thread"] = threading.Thread(target=_worker, args=(_sender["queue"],), daemon=True)
+            _sender["thread"].start()
+            _sender["pid"] = os.getpid()
+        return _sender["queue"]
+
+
+def send(phone, message):
+    """Queue an SMS; returns False when the outbox is full"""
+    try:
+        _outbox().put_nowait((_settings(), phone, message))
+    except queue.Full:
+        _stats["dropped"] += 1
+        return False
+    _stats["queued"] += 1
+    return True
+
+
+def metrics():
+    outbox = _sender["queue"]
+    return {**_stats, "pending": outbox.qsize() if outbox is not None else 0}
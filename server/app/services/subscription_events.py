@@ -0,0 +1,194 @@
+from datetime import datetime
+from threading import Lock
+
+from pymongo import ReplaceOne
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+EVENT_TYPES = ("created", "updated", "paused", "resumed", "cancelled")
+
+# Monthly multipliers used to normalise subscription amounts into MRR
+FREQUENCY_TO_MONTHLY = {
+    "daily": 365 / 12,
+    "weekly": 52 / 12,
+    "monthly": 1,
+    "yearly": 1 / 12,
+}
+
+AGGREGATE_FIELDS = ("active_subscribers", "total_subscriptions", "mrr", "paused", "churned")
+
+# In-memory fallback used when MongoDB is not configured
+EVENTS_DB = []
+AGGREGATES_DB = {}
+_lock = Lock()
+_indexes_ready = False
+
+
+def _events():
+    return mongo_db.get_collection("subscription_events")
+
+
+def _aggregates():
+    return mongo_db.get_collection("subscription_aggregates")
+
+
+def ensure_indexes():
+    """Create the indexes used by the event log and aggregate lookups"""
+    global _indexes_ready
+    if _indexes_ready or mongo_db is None:
+        return
+    _events().create_index([("influencer_id", 1), ("at", 1)])
+    _events().create_index([("subscription_id", 1), ("at", 1)])
+    _aggregates().create_index("influencer_id", unique=True)
+    _indexes_ready = True
+
+
+def monthly_value(amount, frequency):
+    """Normalise a subscription amount to its monthly recurring value"""
+    return float(amount or 0) * FREQUENCY_TO_MONTHLY.get(frequency or "monthly", 1)
+
+
+def _contribution(subscription):
+    """Return (active, paused, mrr) for a subscription snapshot"""
+    if not subscription or subscription.get("status") == "cancelled":
+        return 0, 0, 0.0
+    if subscription.get("is_active", True):
+        return 1, 0, monthly_value(subscription.get("amount"), subscription.get("frequency"))
+    return 0, 1, 0.0
+
+
+def _subscription_id(subscription):
+    sub_id = subscription.get("id")
+    if sub_id is None and subscription.get("_id") is not None:
+        sub_id = str(subscription["_id"])
+    return sub_id
+
+
+def _deltas(event_type, subscription, previous):
+    active_before, paused_before, mrr_before = _contribution(previous)
+    active_after, paused_after, mrr_after = _contribution(subscription)
+    return {
+        "active_subscribers": active_after - active_before,
+        "total_subscriptions": 1 if event_type == "created" else 0,
+        "mrr": round(mrr_after - mrr_before, 2),
+        "paused": paused_after - paused_before,
+        "churned": 1 if event_type == "cancelled" and previous and previous.get("status") != "cancelled" else 0,
+    }
+
+
+def _apply(aggregate, deltas):
+    for field in AGGREGATE_FIELDS:
+        aggregate[field] = aggregate.get(field, 0) + deltas.get(field, 0)
+    aggregate["mrr"] = round(aggregate["mrr"], 2)
+
+
+def record_event(event_type, subscription, previous=None):
+    """Append a subscription event and fold its deltas into the influencer aggregate.
+
+    ``previous`` is the subscription as it was before the change (None on create).
+    Events carry their own deltas so the aggregates can be rebuilt by replaying the log.
+    """
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown subscription event: {event_type}")
+
+    influencer_id = subscription.get("influencer_id")
+    now = datetime.utcnow()
+    deltas = _deltas(event_type, subscription, previous)
+    event = {
+        "type": event_type,
+        "subscription_id": _subscription_id(subscription),
+        "influencer_id": influencer_id,
+        "amount": subscription.get("amount"),
+        "frequency": subscription.get("frequency"),
+        "deltas": deltas,
+        "at": now,
+    }
+
+    if mongo_db is not None:
+        ensure_indexes()
+        _events().insert_one(event)
+        _aggregates().update_one(
+            {"influencer_id": influencer_id},
+            {
+                "$inc": {field: deltas[field] for field in AGGREGATE_FIELDS},
+                "$set": {"updated_at": now},
+            },
+            upsert=True,
+        )
+        return event
+
+    with _lock:
+        EVENTS_DB.append(event)
+        aggregate = AGGREGATES_DB.setdefault(influencer_id, {"influencer_id": influencer_id})
+        _apply(aggregate, deltas)
+        aggregate["updated_at"] = now
+    return event
+
+
+def _with_rates(aggregate, influencer_id):
+    result = {field: aggregate.get(field, 0) for field in AGGREGATE_FIELDS}
+    result["influencer_id"] = influencer_id
+    result["mrr"] = round(result["mrr"], 2)
+    lost_and_kept = result["churned"] + result["active_subscribers"]
+    result["churn_rate"] = round(result["churned"] / lost_and_kept, 4) if lost_and_kept else 0.0
+    updated_at = aggregate.get("updated_at")
+    result["updated_at"] = updated_at.isoformat() if isinstance(updated_at, datetime) else updated_at
+    return result
+
+
+def get_aggregates(influencer_id):
+    """Read the precomputed aggregates for one influencer (single keyed lookup)"""
+    if mongo_db is not None:
+        doc = _aggregates().find_one({"influencer_id": influencer_id}, {"_id": 0}) or {}
+    else:
+        doc = AGGREGATES_DB.get(influencer_id, {})
+    return _with_rates(doc, influencer_id)
+
+
+def get_totals():
+    """Platform-wide totals summed over the per-influencer aggregates"""
+    if mongo_db is not None:
+        group = {"_id": None}
+        group.update({field: {"$sum": f"${field}"} for field in AGGREGATE_FIELDS})
+        rows = list(_aggregates().aggregate([{"$group": group}]))
+        totals = rows[0] if rows else {}
+    else:
+        totals = {}
+        for aggregate in AGGREGATES_DB.values():
+            _apply(totals, aggregate)
+    return _with_rates(totals, None)
+
+
+def rebuild_aggregates():
+    """Replay the event log and rewrite every influencer aggregate from scratch"""
+    now = datetime.utcnow()
+
+    if mongo_db is not None:
+        ensure_indexes()
+        group = {"_id": "$influencer_id"}
+        group.update({field: {"$sum": f"$deltas.{field}"} for field in AGGREGATE_FIELDS})
+        rows = list(_events().aggregate([{"$group": group}], allowDiskUse=True))
+
+        operations = []
+        for row in rows:
+            doc = {"influencer_id": row["_id"], "updated_at": now}
+            doc.update({field: row.get(field, 0) for field in AGGREGATE_FIELDS})
+            doc["mrr"] = round(doc["mrr"], 2)
+            operations.append(ReplaceOne({"influencer_id": row["_id"]}, doc, upsert=True))
+        if operations:
+            _aggregates().bulk_write(operations, ordered=False)
+        _aggregates().delete_many({"influencer_id": {"$nin": [row["_id"] for row in rows]}})
+        return len(rows)
+
+    with _lock:
+        AGGREGATES_DB.clear()
+        for event in EVENTS_DB:
+            influencer_id = event["influencer_id"]
+            aggregate = AGGREGATES_DB.setdefault(influencer_id, {"influencer_id": influencer_id})
+            _apply(aggregate, event["deltas"])
+            aggregate["updated_at"] = now
+        return len(AGGREGATES_DB)
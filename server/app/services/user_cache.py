@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from flask import current_app
+
+from ..models.user import User
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+# user_id -> (user dict, expires_at), least recently used first
+_users = OrderedDict()
+_lock = Lock()
+
+
+def _load(user_id, users_db=None):
+    if mongo_db is not None:
+        user_doc = mongo_db.get_collection("users").find_one({"id": user_id}, {"password_hash": 0, "search_prefixes": 0})
+        if user_doc and "_id" in user_doc:
+            user_doc["_id"] = str(user_doc["_id"])
+        return user_doc
+    if users_db is not None:
+        return next((u for u in users_db if u['id'] == user_id), None)
+    user = User.query.get(user_id)
+    return user.to_dict() if user else None
+
+
+def get_user(user_id, users_db=None):
+    """Return the user for `user_id` from a per-process LRU cache with a TTL.
+
+    Entries are dropped explicitly when admins change a user; the TTL bounds
+    how long other worker processes may keep serving the old state.
+    """
+    now = time.monotonic()
+    with _lock:
+        cached = _users.get(user_id)
+        if cached and cached[1] > now:
+            _users.move_to_end(user_id)
+            return dict(cached[0])
+
+    user = _load(user_id, users_db)
+    if user is None:
+        return None
+
+    ttl = current_app.config.get("USER_CACHE_TTL_SECONDS", 30)
+    max_size = current_app.config.get("USER_CACHE_SIZE", 10000)
+    with _lock:
+        _users[user_id] = (user, now + ttl)
+        _users.move_to_end(user_id)
+        while len(_users) > max_size:
+            _users.popitem(last=False)
+    return dict(user)
+
+
+def invalidate(*user_ids):
+    with _lock:
+        for user_id in user_ids:
+            _users.pop(user_id, None)
+
+
+def clear():
+    with _lock:
+        _users.clear()
@@ -0,0 +1,74 @@
+import re
+
+from pymongo import UpdateOne
+
+# Try to import mongo_db, but don't fail if it's not available
+try:
+    from ..extensions import mongo_db
+except ImportError:
+    mongo_db = None
+
+SEARCH_FIELDS = ("email", "first_name", "last_name", "username")
+# Longer query terms are truncated to this, so they still hit a stored prefix
+MAX_PREFIX = 16
+_WORD = re.compile(r"[a-z0-9]+")
+
+_indexes_ready = False
+
+
+def _users():
+    return mongo_db.get_collection("users")
+
+
+def ensure_indexes():
+    """Multikey index over the prefix tokens, ordered for the admin list sort"""
+    global _indexes_ready
+    if _indexes_ready or mongo_db is None:
+        return
+    _users().create_index([("search_prefixes", 1), ("created_at", -1)])
+    _indexes_ready = True
+
+
+def _words(text):
+    return _WORD.findall(str(text or "").lower())
+
+
+def search_fields(user_doc):
+    """Fields to $set on a user so it can be found by search; merge into every write"""
+    prefixes = set()
+    for field in SEARCH_FIELDS:
+        for word in _words(user_doc.get(field)):
+            for length in range(1, min(len(word), MAX_PREFIX) + 1):
+                prefixes.add(word[:length])
+    return {"search_prefixes": sorted(prefixes)}
+
+
+def search_filter(query):
+    """Filter matching users where every word of `query` starts some word of their
+    email, names or username; served by the search_prefixes index"""
+    terms = {word[:MAX_PREFIX] for word in _words(query)}
+    if not terms:
+        return {}
+    ensure_indexes()
+    return {"search_prefixes": {"$all": sorted(terms)}}
+
+
+def backfill(batch_size=1000):
+    """Compute search_prefixes for users written before the index existed"""
+    if mongo_db is None:
+        return 0
+    ensure_indexes()
+    updated = 0
+    last_id = None
+    projection = {field: 1 for field in SEARCH_FIELDS}
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        batch = list(_users().find(query, projection).sort("_id", 1).limit(batch_size))
+        if not batch:
+            return updated
+        _users().bulk_write(
+            [UpdateOne({"_id": doc["_id"]}, {"$set": search_fields(doc)}) for doc in batch],
+            ordered=False,
+        )
+        updated += len(batch)
+        last_id = batch[-1]["_id"]
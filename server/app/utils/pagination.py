@@ -0,0 +1,160 @@
+import base64
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+
+from flask import current_app, request
+
+# Default order, newest first; `id` breaks ties between documents created in the same instant
+SORT = [("created_at", -1), ("id", -1)]
+
+# (collection, filter) -> (count, expires_at), least recently used first
+_totals = OrderedDict()
+_totals_lock = Lock()
+_indexed = set()
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(value, item_id):
+    """Opaque continuation token for the position after (sort value, id)"""
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    raw = json.dumps([value, item_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        value, item_id = json.loads(raw)
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$date"])
+    except (ValueError, TypeError, KeyError):
+        raise PaginationError("Invalid cursor")
+    return value, item_id
+
+
+def page_params(default_limit=20, max_limit=100):
+    """Read `limit` (or legacy `per_page`), `cursor` and `total` from the query string.
+
+    `total` is optional: `exact` counts matching documents, `estimated` uses
+    collection metadata when the listing is unfiltered. Both are cached briefly.
+    """
+    try:
+        limit = int(request.args.get("limit") or request.args.get("per_page") or default_limit)
+    except ValueError:
+        raise PaginationError("limit must be an integer")
+    cursor = request.args.get("cursor")
+    total = request.args.get("total")
+    if total not in (None, "exact", "estimated"):
+        raise PaginationError("total must be 'exact' or 'estimated'")
+    return {
+        "limit": max(1, min(limit, max_limit)),
+        "cursor": decode_cursor(cursor) if cursor else None,
+        "total": total,
+    }
+
+
+def ensure_sort_index(coll, *prefix, sort=SORT):
+    """Index serving `prefix` equality filters plus the keyset sort (default (created_at, id))"""
+    key = (coll.name, prefix, tuple(sort))
+    if key not in _indexed:
+        coll.create_index([(field, 1) for field in prefix] + list(sort))
+        _indexed.add(key)
+
+
+def _after(cursor, sort=SORT):
+    """Filter for documents after `cursor` in a two-key (field, id) sort"""
+    (field, direction), (tie, tie_direction) = sort
+    value, item_id = cursor
+    op = "$lt" if direction < 0 else "$gt"
+    tie_op = "$lt" if tie_direction < 0 else "$gt"
+    if value is None:
+        # Missing values sort lowest: last when descending (page by id alone), first when ascending
+        if direction < 0:
+            return {field: None, tie: {tie_op: item_id}}
+        return {"$or": [{field: None, tie: {tie_op: item_id}}, {field: {"$ne": None}}]}
+    clauses = [{field: {op: value}}, {field: value, tie: {tie_op: item_id}}]
+    if direction < 0:
+        clauses.append({field: None})
+    return {"$or": clauses}
+
+
+def _count(coll, query, mode):
+    key = (coll.name, mode, json.dumps(query, sort_keys=True, default=str))
+    now = time.monotonic()
+    with _totals_lock:
+        cached = _totals.get(key)
+        if cached and cached[1] > now:
+            _totals.move_to_end(key)
+            return cached[0]
+    if mode == "estimated" and not query:
+        count = coll.estimated_document_count()
+    else:
+        count = coll.count_documents(query)
+    max_entries = current_app.config.get("PAGINATION_TOTAL_CACHE_SIZE", 1024)
+    with _totals_lock:
+        _totals[key] = (count, now + current_app.config.get("PAGINATION_TOTAL_CACHE_SECONDS", 30))
+        _totals.move_to_end(key)
+        # Filters are caller-chosen, so keep only the most recently used counts
+        while len(_totals) > max_entries:
+            _totals.popitem(last=False)
+    return count
+
+
+def find_page(coll, query, projection=None, limit=20, cursor=None, total=None, sort=SORT):
+    """One page of `coll` in `sort` order (default (created_at, id)); every page costs
+    one index range scan. A projection must include both sort keys.
+
+    Returns (docs, pagination) where pagination carries the next cursor.
+    """
+    page_query = query
+    if cursor is not None:
+        page_query = {"$and": [query, _after(cursor, sort)]} if query else _after(cursor, sort)
+    docs = list(coll.find(page_query, projection).sort(list(sort)).limit(limit + 1))
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    (field, _), (tie, _) = sort
+    pagination = {
+        "limit": limit,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(docs[-1].get(field), docs[-1].get(tie)) if has_more else None,
+    }
+    if total:
+        pagination["total"] = _count(coll, query, total)
+    return docs, pagination
+
+
+def list_page(items, limit=20, cursor=None, total=None, sort=SORT):
+    """Same contract as find_page for the in-memory demo stores (both keys share a direction)"""
+    (field, direction), (tie, _) = sort
+
+    def key(value, item_id):
+        # Missing values sort lowest, as they do in Mongo
+        return (value is not None, value if value is not None else 0, item_id or 0)
+
+    descending = direction < 0
+    ordered = sorted(items, key=lambda item: key(item.get(field), item.get(tie)), reverse=descending)
+    if cursor is not None:
+        position = key(*cursor)
+        ordered = [
+            item for item in ordered
+            if (key(item.get(field), item.get(tie)) < position) == descending
+            and key(item.get(field), item.get(tie)) != position
+        ]
+    page = ordered[:limit]
+    has_more = len(ordered) > limit
+    pagination = {
+        "limit": limit,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(page[-1].get(field), page[-1].get(tie)) if has_more else None,
+    }
+    if total:
+        pagination["total"] = len(items)
+    return page, pagination
@@ -1,3 +1,8 @@
+import re
+
+_SEPARATORS = re.compile(r"[\s\-().]")
+
+
 def normalize_msisdn(phone: str) -> str:
     phone = str(phone or "").strip()
     if not phone:
@@ -10,3 +15,6 @@ def normalize_msisdn(phone: str) -> str:
     return phone
 
 
+def clean_msisdn(phone: str) -> str:
+    """normalize_msisdn for hand-typed input: drops spaces, dashes, dots and brackets first"""
+    return normalize_msisdn(_SEPARATORS.sub("", str(phone or "")))
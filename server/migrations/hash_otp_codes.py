@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Migration script to recreate the otp_codes table for hashed codes
+Codes live for minutes, so the old table is dropped rather than converted
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.extensions import db
+from app.models.otp import OtpCode
+
+def main():
+    """Run the migration"""
+    print("Recreating otp_codes table...")
+    
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            OtpCode.__table__.drop(db.engine, checkfirst=True)
+            OtpCode.__table__.create(db.engine)
+        except Exception as e:
+            print(f"otp_codes migration failed: {e}")
+            return
+    
+    print("Migration completed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Backfill hourly/daily earnings rollups from historical payments.
+
+Usage:
+    python scripts/backfill_rollups.py 2025-01-01 2025-08-01 [chunk_days]
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+
+def main():
+    """Aggregate payments into rollups chunk by chunk"""
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    
+    start = datetime.fromisoformat(sys.argv[1])
+    end = datetime.fromisoformat(sys.argv[2])
+    chunk_days = int(sys.argv[3]) if len(sys.argv) > 3 else 7
+    
+    app = create_app()
+    
+    with app.app_context():
+        # Import after create_app so the service sees the initialized MongoDB handle
+        from app.services import rollups
+        
+        try:
+            written = rollups.backfill(start, end, timedelta(days=chunk_days))
+        except rollups.RollupError as e:
+            print(f"Backfill failed: {e}")
+            sys.exit(1)
+        
+        print(f"Backfill completed: {written} buckets written")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Compute search_prefixes for users created before admin search was indexed.
+Safe to re-run; every user's tokens are recomputed from its current fields.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+
+def main():
+    """Backfill user search tokens"""
+    app = create_app()
+    
+    with app.app_context():
+        # Import after create_app so the service sees the initialized MongoDB handle
+        from app.services import user_search
+        
+        updated = user_search.backfill()
+        print(f"Indexed {updated} users for search")
+
+if __name__ == "__main__":
+    main()
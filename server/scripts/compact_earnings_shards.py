@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Fold sharded `received` counters back into the influencer documents.
+Run periodically (e.g. from cron) so shard documents stay small and the
+`received` field used for sorting stays close to the true total.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+
+def main():
+    """Compact shard counters for every sharded influencer"""
+    app = create_app()
+    
+    with app.app_context():
+        # Import after create_app so the service sees the initialized MongoDB handle
+        from app.services import earnings
+        
+        if earnings.mongo_db is None:
+            print("MongoDB not available, nothing to compact")
+            return
+        
+        influencer_ids = earnings.mongo_db.get_collection("influencer_received_shards").distinct("influencer_id")
+        for influencer_id in influencer_ids:
+            folded = earnings.compact_shards(influencer_id)
+            print(f"Influencer {influencer_id}: folded {folded} into received")
+    
+    print("Compaction completed!")
+
+if __name__ == "__main__":
+    main()
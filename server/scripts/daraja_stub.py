@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the M-Pesa Daraja API, for exercising the payout engine.
+
+Serves the OAuth, B2C payment request and TransactionStatus query endpoints
+and, shortly after each accepted request, POSTs a Result callback to the
+request's ResultURL. A share of B2C callbacks can be dropped to exercise the
+payout engine's status sweep.
+
+Usage:
+    python scripts/daraja_stub.py [port] [failure_rate] [drop_rate]
+    DARAJA_BASE_URL=http://127.0.0.1:8089 python scripts/run_payouts.py
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+FAILURE_RATE = 0.0
+DROP_RATE = 0.0
+CALLBACK_DELAY_SECONDS = 0.5
+
+# OriginatorConversationID -> (failed, receipt) for every accepted payment
+PAYMENTS = {}
+
+
+def post_callback(url, result):
+    try:
+        requests.post(url, json=result, timeout=5)
+    except Exception as e:
+        print(f"Callback to {url} failed: {e}")
+
+
+def send_result(body, conversation_id):
+    """Deliver the asynchronous B2C result the way Daraja does (unless it is dropped)"""
+    time.sleep(CALLBACK_DELAY_SECONDS)
+    failed = random.random() < FAILURE_RATE
+    receipt = uuid.uuid4().hex[:10].upper()
+    PAYMENTS[body.get("OriginatorConversationID")] = (failed, receipt)
+    if random.random() < DROP_RATE:
+        return
+    result = {
+        "Result": {
+            "ResultType": 0,
+            "ResultCode": 2001 if failed else 0,
+            "ResultDesc": "The initiator information is invalid." if failed else "The service request is processed successfully.",
+            "OriginatorConversationID": body.get("OriginatorConversationID"),
+            "ConversationID": conversation_id,
+            "TransactionID": receipt,
+        }
+    }
+    post_callback(body.get("ResultURL"), result)
+
+
+def send_status(body, conversation_id):
+    """Answer a TransactionStatus query for a payment this stub accepted earlier"""
+    time.sleep(CALLBACK_DELAY_SECONDS)
+    payment = PAYMENTS.get(body.get("OriginalConversationID"))
+    result = {
+        "ResultType": 0,
+        "ResultCode": 0 if payment else 2001,
+        "ResultDesc": "The service request is processed successfully." if payment else "The transaction could not be found.",
+        "OriginatorConversationID": body.get("OriginatorConversationID"),
+        "ConversationID": conversation_id,
+    }
+    if payment:
+        failed, receipt = payment
+        result["ResultParameters"] = {"ResultParameter": [
+            {"Key": "ReceiptNo", "Value": receipt},
+            {"Key": "TransactionStatus", "Value": "Failed" if failed else "Completed"},
+        ]}
+    post_callback(body.get("ResultURL"), {"Result": result})
+
+
+class DarajaStubHandler(BaseHTTPRequestHandler):
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.startswith("/oauth/v1/generate"):
+            return self._reply(200, {"access_token": uuid.uuid4().hex, "expires_in": "3599"})
+        return self._reply(404, {"errorMessage": "Not found"})
+
+    def do_POST(self):
+        if self.path.startswith("/mpesa/b2c/v1/paymentrequest"):
+            callback = send_result
+        elif self.path.startswith("/mpesa/transactionstatus/v1/query"):
+            callback = send_status
+        else:
+            return self._reply(404, {"errorMessage": "Not found"})
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            return self._reply(401, {"errorMessage": "Invalid Access Token"})
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        conversation_id = f"AG_{uuid.uuid4().hex[:20]}"
+        threading.Thread(target=callback, args=(body, conversation_id), daemon=True).start()
+        return self._reply(200, {
+            "ConversationID": conversation_id,
+            "OriginatorConversationID": body.get("OriginatorConversationID"),
+            "ResponseCode": "0",
+            "ResponseDescription": "Accept the service request successfully."
+        })
+
+
+def main():
+    global FAILURE_RATE, DROP_RATE
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8089
+    FAILURE_RATE = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    DROP_RATE = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", port), DarajaStubHandler)
+    print(f"Daraja stub listening on http://127.0.0.1:{port} (failure rate {FAILURE_RATE}, drop rate {DROP_RATE})")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Google's signing keys, for exercising /api/auth/google.
+
+Generates an RSA key pair, writes its public half as a JWKS file and prints an
+ID token for the given email, signed the way Google signs them.
+
+Usage:
+    python scripts/fake_google_jwks.py <jwks_path> <client_id> <email>
+    GOOGLE_JWKS_URL=file:///abs/path/jwks.json GOOGLE_CLIENT_ID=<client_id> python wsgi.py
+"""
+
+import json
+import sys
+import time
+import uuid
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def main():
+    if len(sys.argv) != 4:
+        print(__doc__)
+        sys.exit(1)
+    jwks_path, client_id, email = sys.argv[1:]
+    
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    kid = uuid.uuid4().hex
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    with open(jwks_path, "w") as f:
+        json.dump({"keys": [jwk]}, f, indent=2)
+    
+    now = int(time.time())
+    token = jwt.encode({
+        "iss": "https://accounts.google.com",
+        "aud": client_id,
+        "sub": str(uuid.uuid4().int)[:21],
+        "email": email,
+        "email_verified": True,
+        "given_name": email.split("@")[0].title(),
+        "family_name": "Tester",
+        "iat": now,
+        "exp": now + 3600,
+    }, private_key, algorithm="RS256", headers={"kid": kid})
+    
+    print(f"Wrote {jwks_path}")
+    print(token)
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,9 @@ Script to populate the system with sample influencers for demo purposes.
 This can be run locally or adapted for production use.
 """
 
+import os
+
 import requests
-import json
 
 # Sample influencer data
 SAMPLE_INFLUENCERS = [
@@ -62,11 +63,11 @@ SAMPLE_INFLUENCERS = [
 
 def populate_influencers(api_base_url, admin_token=None):
     """
-    Populate the system with sample influencers.
+    Populate the system with sample influencers in a single bulk request.
     
     Args:
         api_base_url (str): Base URL of the API (e.g., http://localhost:8000)
-        admin_token (str): Admin authentication token (optional for now)
+        admin_token (str): Admin authentication token
     """
     print(f"🌟 Populating influencers at: {api_base_url}")
     
@@ -74,37 +75,30 @@ def populate_influencers(api_base_url, admin_token=None):
     if admin_token:
         headers['Authorization'] = f'Bearer {admin_token}'
     
-    success_count = 0
-    error_count = 0
+    try:
+        response = requests.post(
+            f"{api_base_url}/api/admin/influencers/bulk",
+            json=SAMPLE_INFLUENCERS,
+            headers=headers,
+            timeout=60
+        )
+    except Exception as e:
+        print(f"❌ Error adding influencers: {str(e)}")
+        return
     
-    for i, influencer_data in enumerate(SAMPLE_INFLUENCERS, 1):
-        try:
-            print(f"📝 Adding influencer {i}/7: {influencer_data['name']}")
-            
-            response = requests.post(
-                f"{api_base_url}/api/admin/influencers",
-                json=influencer_data,
-                headers=headers,
-                timeout=10
-            )
-            
-            if response.status_code == 201:
-                print(f"✅ Successfully added: {influencer_data['name']}")
-                success_count += 1
-            else:
-                print(f"❌ Failed to add {influencer_data['name']}: {response.status_code} - {response.text}")
-                error_count += 1
-                
-        except Exception as e:
-            print(f"❌ Error adding {influencer_data['name']}: {str(e)}")
-            error_count += 1
+    if response.status_code not in (200, 201):
+        print(f"❌ Bulk onboarding failed: {response.status_code} - {response.text}")
+        return
     
-    print(f"\n🎯 Population Complete!")
-    print(f"✅ Successfully added: {success_count} influencers")
-    print(f"❌ Failed to add: {error_count} influencers")
+    result = response.json()
+    for influencer in result.get("influencers", []):
+        print(f"✅ Added: {influencer['name']} ({influencer['ussd_shortcode']})")
+    for error in result.get("errors", []):
+        print(f"⚠️  Skipped row {error['row']}: {error['reason']}")
     
-    if success_count > 0:
-        print(f"\n📊 Total influencers in system: {success_count + 1} (including the original test influencer)")
+    print(f"\n🎯 Population Complete!")
+    print(f"✅ Successfully added: {result.get('created', 0)} influencers")
+    print(f"⚠️  Skipped: {result.get('skipped', 0)} influencers")
 
 if __name__ == "__main__":
     # You can change this URL based on your environment
@@ -113,10 +107,9 @@ if __name__ == "__main__":
     print("🚀 USSD Credit - Influencer Population Script")
     print("=" * 50)
     
-    # For now, we'll try without admin token (the endpoint might not require it yet)
-    populate_influencers(API_BASE_URL)
+    # The bulk endpoint requires an admin token
+    populate_influencers(API_BASE_URL, os.getenv("ADMIN_TOKEN"))
     
     print("\n💡 To use this script with admin authentication:")
     print("   1. Get an admin token from your auth system")
-    print("   2. Update the script to include the token")
-    print("   3. Run: python scripts/populate_influencers.py")
+    print("   2. Run: ADMIN_TOKEN=<token> python scripts/populate_influencers.py")
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Delete expired OTP codes from the SQL database in batches.
+MongoDB deployments don't need this: a TTL index on expires_at removes them.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+
+def main():
+    """Purge expired OTP rows"""
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    app = create_app()
+    
+    with app.app_context():
+        # Import after create_app so the service sees the initialized MongoDB handle
+        from app.services import otp
+        
+        purged = otp.purge_expired(batch_size)
+        print(f"Purged {purged} expired OTP codes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Run the withdrawal payout engine: submit approved withdrawals to the
+M-Pesa B2C API in batches and apply any stored result callbacks.
+
+Usage:
+    python scripts/run_payouts.py          # one pass
+    python scripts/run_payouts.py --loop   # keep polling every 30 seconds
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+
+POLL_SECONDS = 30
+
+def main():
+    """Drain approved withdrawals"""
+    app = create_app()
+    
+    with app.app_context():
+        # Import after create_app so the service sees the initialized MongoDB handle
+        from app.services import payouts
+        
+        while True:
+            try:
+                summary = payouts.run_payouts()
+                print(f"Payout run: {summary}")
+            except Exception as e:
+                print(f"Payout run failed: {e}")
+            
+            if "--loop" not in sys.argv:
+                break
+            time.sleep(POLL_SECONDS)
+
+if __name__ == "__main__":
+    main()
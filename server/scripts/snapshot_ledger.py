@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Take a balance snapshot for every ledger account.
+Run periodically (e.g. hourly from cron) so balance reads only have to sum
+the entries posted since the last snapshot.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+
+def main():
+    """Snapshot all ledger accounts"""
+    app = create_app()
+    
+    with app.app_context():
+        # Import after create_app so the service sees the initialized MongoDB handle
+        from app.services import ledger
+        
+        try:
+            count = ledger.snapshot_all()
+        except ledger.LedgerError as e:
+            print(f"Ledger snapshot failed: {e}")
+            return
+        
+        print(f"Snapshotted {count} ledger accounts")
+
+if __name__ == "__main__":
+    main()
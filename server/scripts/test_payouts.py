@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+End-to-end test of the payout engine against scripts/daraja_stub.py.
+
+Starts the Daraja stub and the API in-process, then drives run_payouts and
+the B2C result, status-query and forged callbacks over real HTTP. It wipes
+the payout collections, so point it at a throwaway database (the name must
+contain "test"):
+
+Usage:
+    MONGO_URI=mongodb://localhost:27017/ussd_credit_test python scripts/test_payouts.py
+    MONGO_URI=... python -m pytest scripts/test_payouts.py
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import ThreadingHTTPServer
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPTS_DIR))
+sys.path.append(SCRIPTS_DIR)
+
+import requests
+from werkzeug.serving import make_server
+
+import daraja_stub
+from app import create_app
+
+SECRET = "payout-test-secret"
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def _wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return predicate()
+
+
+def _approve(withdrawals, ids):
+    now = datetime.utcnow()
+    withdrawals.insert_many([
+        {"id": withdrawal_id, "influencer_id": 1, "amount": 100, "phone": "0712345678",
+         "status": "approved", "created_at": now, "updated_at": now}
+        for withdrawal_id in ids
+    ])
+
+
+def _statuses(withdrawals, ids):
+    return {doc["id"]: doc["status"] for doc in withdrawals.find({"id": {"$in": ids}})}
+
+
+def test_payouts_against_daraja_stub():
+    app = create_app()
+    # Import after create_app so the services see the initialized MongoDB handle
+    from app import extensions
+    from app.services import payouts
+
+    mongo_db = extensions.mongo_db
+    assert mongo_db is not None, "MONGO_URI must point at a reachable MongoDB"
+    assert "test" in mongo_db.name, f"Refusing to wipe payout data in {mongo_db.name}"
+
+    daraja_stub.CALLBACK_DELAY_SECONDS = 0.1
+    daraja_stub.FAILURE_RATE = 0.0
+    daraja_stub.DROP_RATE = 0.0
+    stub = _serve(ThreadingHTTPServer(("127.0.0.1", 0), daraja_stub.DarajaStubHandler))
+    api = _serve(make_server("127.0.0.1", 0, app, threaded=True))
+    webhooks = f"http://127.0.0.1:{api.server_port}/webhooks"
+    app.config.update(
+        DARAJA_BASE_URL=f"http://127.0.0.1:{stub.server_port}",
+        DARAJA_B2C_RESULT_URL=f"{webhooks}/b2c/result",
+        DARAJA_B2C_TIMEOUT_URL=f"{webhooks}/b2c/timeout",
+        DARAJA_B2C_STATUS_RESULT_URL=f"{webhooks}/b2c/status",
+        DARAJA_CALLBACK_SECRET=SECRET,
+        DARAJA_CALLBACK_IPS="",
+        PAYOUT_STATUS_QUERY_AFTER_SECONDS=900,
+    )
+
+    withdrawals = mongo_db.get_collection("withdrawals")
+    results = mongo_db.get_collection("b2c_results")
+    dead_letters = mongo_db.get_collection("b2c_dead_letters")
+    try:
+        with app.app_context():
+            for collection in (withdrawals, results, dead_letters):
+                collection.delete_many({})
+
+            # 1. Every payment is accepted and its result callback settles it
+            paid_ids = [9001, 9002, 9003]
+            _approve(withdrawals, paid_ids)
+            summary = payouts.run_payouts()
+            assert summary["submitted"] == 3 and summary["failed"] == 0, summary
+            assert _wait_for(lambda: results.count_documents({}) >= 3), "result callbacks never arrived"
+            payouts.apply_results()
+            assert set(_statuses(withdrawals, paid_ids).values()) == {"paid"}
+
+            # 2. Result callbacks are lost; the status sweep settles the withdrawals instead
+            daraja_stub.DROP_RATE = 1.0
+            swept_ids = [9004, 9005]
+            _approve(withdrawals, swept_ids)
+            payouts.run_payouts()
+            time.sleep(daraja_stub.CALLBACK_DELAY_SECONDS * 5)
+            assert set(_statuses(withdrawals, swept_ids).values()) == {"submitted"}
+            app.config["PAYOUT_STATUS_QUERY_AFTER_SECONDS"] = 0
+            assert payouts.query_stale_submissions() == 2
+            assert _wait_for(lambda: results.count_documents({}) >= 5), "status callbacks never arrived"
+            payouts.apply_results()
+            assert set(_statuses(withdrawals, swept_ids).values()) == {"paid"}
+
+            # 3. Callbacks without the secret are refused; unmatched ones are dead-lettered
+            forged = {"Result": {"OriginatorConversationID": "wd-forged", "ResultCode": 0}}
+            assert requests.post(f"{webhooks}/b2c/result", json=forged, timeout=5).status_code == 403
+            assert requests.post(f"{webhooks}/b2c/timeout?token=wrong", json=forged, timeout=5).status_code == 403
+            assert requests.post(f"{webhooks}/b2c/result?token={SECRET}", json=forged, timeout=5).status_code == 200
+            payouts.apply_results()
+            assert dead_letters.count_documents({"originator_conversation_id": "wd-forged"}) == 1
+            assert results.count_documents({"applied": False}) == 0
+    finally:
+        stub.shutdown()
+        api.shutdown()
+
+
+if __name__ == "__main__":
+    test_payouts_against_daraja_stub()
+    print("✅ Payout engine settled every withdrawal against the Daraja stub")
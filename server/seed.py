@@ -1,10 +1,10 @@
 import json
 from pathlib import Path
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash
 
 from app import create_app
 from app.extensions import db, mongo_client, mongo_db
+from app.services import passwords, user_search
 
 
 def parse_date_safely(date_str, default=None):
@@ -58,31 +58,27 @@ def main():
                 mdb.get_collection("influencers").delete_many({})
                 mdb.get_collection("subscribers").delete_many({})
                 mdb.get_collection("payments").delete_many({})
+                # Reservations are re-derived from the seeded influencers on first allocation
+                mdb.get_collection("shortcode_reservations").delete_many({})
                 mdb.get_collection("withdrawals").delete_many({})
                 mdb.get_collection("otp_codes").delete_many({})
                 mdb.get_collection("profiles").delete_many({})
                 
                 # Seed users with proper password hashing and complete data structure
                 if data.get("users"):
+                    # Test credentials per seeded account: (password, user_type)
+                    test_credentials = {
+                        "admin@ussd.com": ("admin123", "admin"),
+                        "john@example.com": ("john123", "user"),
+                        "jane@example.com": ("jane123", "user"),
+                        "guest@example.com": ("guest123", "guest"),
+                    }
+                    credentials = [test_credentials.get(user.get("email"), ("password123", "user")) for user in data["users"]]
+                    # Hash all passwords in parallel on the hashing pool
+                    password_hashes = passwords.hash_passwords([password for password, _ in credentials])
+                    
                     users_to_insert = []
-                    for user in data["users"]:
-                        # Hash passwords for test users
-                        if user.get("email") == "admin@ussd.com":
-                            password_hash = generate_password_hash("admin123")
-                            user_type = "admin"
-                        elif user.get("email") == "john@example.com":
-                            password_hash = generate_password_hash("john123")
-                            user_type = "user"
-                        elif user.get("email") == "jane@example.com":
-                            password_hash = generate_password_hash("jane123")
-                            user_type = "user"
-                        elif user.get("email") == "guest@example.com":
-                            password_hash = generate_password_hash("guest123")
-                            user_type = "guest"
-                        else:
-                            password_hash = generate_password_hash("password123")
-                            user_type = "user"
-                        
+                    for user, (_, user_type), password_hash in zip(data["users"], credentials, password_hashes):
                         # Ensure proper data structure with all required fields
                         user_doc = {
                             "id": user.get("id", len(users_to_insert) + 1),
@@ -105,6 +101,7 @@ def main():
                             "balance": user.get("balance", 1000000),
                             "pin": user.get("pin", "1234")
                         }
+                        user_doc.update(user_search.search_fields(user_doc))
                         users_to_insert.append(user_doc)
                     
                     if users_to_insert:
@@ -143,7 +140,7 @@ def main():
                         "id": 2,
                         "phone": "254722345678",
                         "name": "Wambui Doe",
-                        "ussd_shortcode": "1234",
+                        "ussd_shortcode": "1235",
                         "received": 450000,
                         "user_id": 2,  # Link to john@example.com
                         "created_at": datetime.utcnow(),
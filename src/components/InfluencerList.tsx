@@ -1,4 +1,4 @@
-import { useInfluencers } from '../hooks/useInfluencers';
+import { useInfluencerPages } from '../hooks/useInfluencerPages';
 import { SubscribeForm } from './SubscribeForm';
 
 interface Influencer {
@@ -10,7 +10,7 @@ interface Influencer {
 }
 
 export const InfluencerList = () => {
-  const { influencers, isLoading, error } = useInfluencers();
+  const { influencers, isLoading, error, hasMore, loadingMore, loadMore } = useInfluencerPages();
 
   if (isLoading) return (
     <div className="min-h-screen bg-gray-50 flex items-center justify-center">
@@ -58,6 +58,18 @@ export const InfluencerList = () => {
             ))}
           </div>
         )}
+        
+        {hasMore && (
+          <div className="text-center mt-8">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-6 py-2 rounded-lg bg-primary-600 text-white hover:bg-primary-700 disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+              {loadingMore ? 'Loading...' : 'Load more creators'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -62,7 +62,9 @@ const AdminDashboard: React.FC = () => {
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [currentPage, setCurrentPage] = useState(1);
-  const [totalPages, setTotalPages] = useState(1);
+  // Keyset pagination: cursors[i] fetches page i + 1; the server hands out the next one
+  const [cursors, setCursors] = useState<(string | null)[]>([null]);
+  const [hasMore, setHasMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [userTypeFilter, setUserTypeFilter] = useState('');
   const [selectedUser, setSelectedUser] = useState<AdminUser | null>(null);
@@ -75,6 +77,11 @@ const AdminDashboard: React.FC = () => {
     }
   }, [user, currentPage, searchTerm, userTypeFilter]);
 
+  useEffect(() => {
+    setCursors([null]);
+    setCurrentPage(1);
+  }, [searchTerm, userTypeFilter]);
+
   const fetchStats = async () => {
     try {
       const response = await axios.get('/api/admin/stats');
@@ -86,16 +93,21 @@ const AdminDashboard: React.FC = () => {
 
   const fetchUsers = async () => {
     try {
+      const cursor = cursors[currentPage - 1];
       const params = new URLSearchParams({
-        page: currentPage.toString(),
-        per_page: '20',
+        limit: '20',
+        ...(cursor && { cursor }),
         ...(searchTerm && { search: searchTerm }),
         ...(userTypeFilter && { user_type: userTypeFilter })
       });
 
       const response = await axios.get(`/api/admin/users?${params}`);
       setUsers(response.data.users);
-      setTotalPages(response.data.pagination.pages);
+      const { has_more, next_cursor } = response.data.pagination;
+      setHasMore(has_more);
+      if (has_more) {
+        setCursors((previous) => [...previous.slice(0, currentPage), next_cursor]);
+      }
     } catch (err: any) {
       setError('Failed to fetch users');
     } finally {
@@ -395,11 +407,11 @@ const AdminDashboard: React.FC = () => {
           </div>
 
           {/* Pagination */}
-          {totalPages > 1 && (
+          {(currentPage > 1 || hasMore) && (
             <div className="px-6 py-4 border-t border-gray-200">
               <div className="flex items-center justify-between">
                 <div className="text-sm text-gray-700">
-                  Page {currentPage} of {totalPages}
+                  Page {currentPage}
                 </div>
                 <div className="flex space-x-2">
                   <button
@@ -410,8 +422,8 @@ const AdminDashboard: React.FC = () => {
                     Previous
                   </button>
                   <button
-                    onClick={() => setCurrentPage(Math.min(totalPages, currentPage + 1))}
-                    disabled={currentPage === totalPages}
+                    onClick={() => setCurrentPage(currentPage + 1)}
+                    disabled={!hasMore}
                     className="px-3 py-2 text-sm font-medium text-gray-500 bg-white border border-gray-300 rounded-md hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
                   >
                     Next
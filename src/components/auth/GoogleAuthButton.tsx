@@ -1,5 +1,5 @@
 import React from 'react';
-import { useGoogleLogin } from '@react-oauth/google';
+import { GoogleLogin } from '@react-oauth/google';
 import { useAuth } from '../../contexts/AuthContext';
 
 interface GoogleAuthButtonProps {
@@ -9,6 +9,8 @@ interface GoogleAuthButtonProps {
   children?: React.ReactNode;
 }
 
+// Uses Google's ID-token (credential) flow: the backend verifies the token's
+// signature locally, so no user info is fetched or trusted from the browser.
 const GoogleAuthButton: React.FC<GoogleAuthButtonProps> = ({
   onSuccess,
   onError,
@@ -16,65 +18,29 @@ const GoogleAuthButton: React.FC<GoogleAuthButtonProps> = ({
   children
 }) => {
   const { googleLogin } = useAuth();
-
-  const login = useGoogleLogin({
-    onSuccess: async (response) => {
-      try {
-        // Get user info from Google
-        const userInfoResponse = await fetch('https://www.googleapis.com/oauth2/v2/userinfo', {
-          headers: {
-            Authorization: `Bearer ${response.access_token}`,
-          },
-        });
-        
-        if (!userInfoResponse.ok) {
-          throw new Error('Failed to fetch user info from Google');
-        }
-        
-        const userInfo = await userInfoResponse.json();
-        
-        // Call our backend with the access token and user info
-        await googleLogin(response.access_token, userInfo);
-        
-        onSuccess?.();
-      } catch (error) {
-        const errorMessage = error instanceof Error ? error.message : 'Google login failed';
-        onError?.(errorMessage);
-      }
-    },
-    onError: (error) => {
-      const errorMessage = error.error_description || 'Google login failed';
-      onError?.(errorMessage);
-    },
-    scope: 'openid email profile',
-  });
+  const label = typeof children === 'string' && children.toLowerCase().includes('sign up')
+    ? 'signup_with'
+    : 'signin_with';
 
   return (
-    <button
-      onClick={() => login()}
-      className={`flex items-center justify-center w-full px-4 py-2 text-sm font-medium text-gray-700 bg-white border border-gray-300 rounded-md shadow-sm hover:bg-gray-50 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-blue-500 ${className}`}
-      type="button"
-    >
-      <svg className="w-5 h-5 mr-2" viewBox="0 0 24 24">
-        <path
-          fill="#4285F4"
-          d="M22.56 12.25c0-.78-.07-1.53-.2-2.25H12v4.26h5.92c-.26 1.37-1.04 2.53-2.21 3.31v2.77h3.57c2.08-1.92 3.28-4.74 3.28-8.09z"
-        />
-        <path
-          fill="#34A853"
-          d="M12 23c2.97 0 5.46-.98 7.28-2.66l-3.57-2.77c-.98.66-2.23 1.06-3.71 1.06-2.86 0-5.29-1.93-6.16-4.53H2.18v2.84C3.99 20.53 7.7 23 12 23z"
-        />
-        <path
-          fill="#FBBC05"
-          d="M5.84 14.09c-.22-.66-.35-1.36-.35-2.09s.13-1.43.35-2.09V7.07H2.18C1.43 8.55 1 10.22 1 12s.43 3.45 1.18 4.93l2.85-2.22.81-.62z"
-        />
-        <path
-          fill="#EA4335"
-          d="M12 5.38c1.62 0 3.06.56 4.21 1.64l3.15-3.15C17.45 2.09 14.97 1 12 1 7.7 1 3.99 3.47 2.18 7.07l3.66 2.84c.87-2.6 3.3-4.53 6.16-4.53z"
-        />
-      </svg>
-      {children || 'Continue with Google'}
-    </button>
+    <div className={`flex justify-center ${className}`}>
+      <GoogleLogin
+        onSuccess={async (response) => {
+          try {
+            if (!response.credential) {
+              throw new Error('Google did not return an ID token');
+            }
+            await googleLogin(response.credential, null);
+            onSuccess?.();
+          } catch (error) {
+            const errorMessage = error instanceof Error ? error.message : 'Google login failed';
+            onError?.(errorMessage);
+          }
+        }}
+        onError={() => onError?.('Google login failed')}
+        text={label}
+      />
+    </div>
   );
 };
 
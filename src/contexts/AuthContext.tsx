@@ -62,6 +62,7 @@ const getInitialState = (): AuthState => {
     } catch (e) {
       // If parsing fails, clear localStorage and return initial state
       localStorage.removeItem('authToken');
+      localStorage.removeItem('refreshToken');
       localStorage.removeItem('user');
     }
   }
@@ -170,6 +171,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
         } catch (error) {
           console.error('🔐 AuthContext: Token validation failed:', error);
           localStorage.removeItem('authToken');
+          localStorage.removeItem('refreshToken');
           localStorage.removeItem('user');
           dispatch({ type: 'AUTH_FAILURE', payload: 'Token validation failed' });
         }
@@ -189,12 +191,13 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
     try {
       const response = await authAPI.login({ email, password });
       console.log('🔐 AuthContext: Raw login response:', response);
-      const { user, token } = response.data;
+      const { user, token, refresh_token } = response.data;
       console.log('🔐 AuthContext: Login successful, user:', user, 'token length:', token?.length);
       console.log('🔐 AuthContext: User type:', user?.user_type, 'Is admin?', user?.user_type === 'admin');
       
       // Store token and user data
       localStorage.setItem('authToken', token);
+      localStorage.setItem('refreshToken', refresh_token);
       localStorage.setItem('user', JSON.stringify(user));
       console.log('🔐 AuthContext: Token and user stored in localStorage');
       console.log('🔐 AuthContext: Stored user data:', JSON.stringify(user));
@@ -226,10 +229,11 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
     dispatch({ type: 'AUTH_START' });
     try {
       const response = await authAPI.register(userData);
-      const { user, token } = response.data;
+      const { user, token, refresh_token } = response.data;
       
       // Store token and user data
       localStorage.setItem('authToken', token);
+      localStorage.setItem('refreshToken', refresh_token);
       localStorage.setItem('user', JSON.stringify(user));
       
       dispatch({
@@ -247,10 +251,11 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
     dispatch({ type: 'AUTH_START' });
     try {
       const response = await authAPI.googleLogin(idToken);
-      const { user, token } = response.data;
+      const { user, token, refresh_token } = response.data;
       
       // Store token and user data
       localStorage.setItem('authToken', token);
+      localStorage.setItem('refreshToken', refresh_token);
       localStorage.setItem('user', JSON.stringify(user));
       
       dispatch({
@@ -272,6 +277,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
     } finally {
       // Clear local storage regardless of API call success
       localStorage.removeItem('authToken');
+      localStorage.removeItem('refreshToken');
       localStorage.removeItem('user');
       dispatch({ type: 'AUTH_LOGOUT' });
     }
@@ -294,7 +300,13 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
 
   const changePassword = async (currentPassword: string, newPassword: string) => {
     try {
-      await authAPI.changePassword({ current_password: currentPassword, new_password: newPassword });
+      const response = await authAPI.changePassword({ current_password: currentPassword, new_password: newPassword });
+      // The server revokes every other session and hands this one a fresh token pair
+      const { token, refresh_token } = response.data;
+      if (token && refresh_token) {
+        localStorage.setItem('authToken', token);
+        localStorage.setItem('refreshToken', refresh_token);
+      }
     } catch (error: any) {
       const errorMessage = error.response?.data?.message || 'Password change failed';
       throw new Error(errorMessage);
@@ -0,0 +1,77 @@
+import { useState, useEffect, useCallback, useRef } from 'react';
+import { api } from '../lib/api';
+
+interface Influencer {
+  id: number;
+  name: string;
+  phone: string;
+  received: number;
+  imageUrl?: string;
+}
+
+// Only the columns the listing cards render
+const LIST_FIELDS = 'id,name,phone,received,imageUrl';
+const PAGE_SIZE = 24;
+
+export const useInfluencerPages = () => {
+  const [influencers, setInfluencers] = useState<Influencer[]>([]);
+  const [isLoading, setIsLoading] = useState(true);
+  const [error, setError] = useState<Error | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Synchronous guard: two clicks in the same tick would both see loadingMore === false
+  const loadingMoreRef = useRef(false);
+
+  const fetchPage = useCallback(async (cursor: string | null) => {
+    const response = await api.get('/api/influencers', {
+      params: { limit: PAGE_SIZE, fields: LIST_FIELDS, ...(cursor ? { cursor } : {}) },
+    });
+    const items = (response.data?.influencers || []).map((x: any) => ({
+      ...x,
+      imageUrl: x.imageUrl ?? x.image_url ?? '',
+    }));
+    return { items, next: response.data?.pagination?.next_cursor ?? null };
+  }, []);
+
+  useEffect(() => {
+    let isMounted = true;
+    const fetchInfluencers = async () => {
+      try {
+        const { items, next } = await fetchPage(null);
+        if (isMounted) {
+          setInfluencers(items);
+          setNextCursor(next);
+        }
+      } catch (err) {
+        if (isMounted) setError(err as Error);
+      } finally {
+        if (isMounted) setIsLoading(false);
+      }
+    };
+
+    fetchInfluencers();
+    // Removed the setInterval that was causing continuous API calls
+
+    return () => {
+      isMounted = false;
+    };
+  }, [fetchPage]);
+
+  const loadMore = useCallback(async () => {
+    if (!nextCursor || loadingMoreRef.current) return;
+    loadingMoreRef.current = true;
+    setLoadingMore(true);
+    try {
+      const { items, next } = await fetchPage(nextCursor);
+      setInfluencers((current) => [...current, ...items]);
+      setNextCursor(next);
+    } catch (err) {
+      setError(err as Error);
+    } finally {
+      loadingMoreRef.current = false;
+      setLoadingMore(false);
+    }
+  }, [fetchPage, nextCursor]);
+
+  return { influencers, isLoading, error, hasMore: nextCursor !== null, loadingMore, loadMore };
+};
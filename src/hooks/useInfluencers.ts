@@ -9,6 +9,11 @@ interface Influencer {
   imageUrl?: string;
 }
 
+// Largest page the listing endpoint serves
+const PAGE_SIZE = 100;
+
+// Every influencer, for pages that need the whole set (selectors, totals);
+// the paged listing uses useInfluencerPages instead
 export const useInfluencers = () => {
   const [influencers, setInfluencers] = useState<Influencer[]>([]);
   const [isLoading, setIsLoading] = useState(true);
@@ -18,12 +23,19 @@ export const useInfluencers = () => {
     let isMounted = true;
     const fetchInfluencers = async () => {
       try {
-        const response = await api.get('/api/influencers');
-        const items = (response.data || []).map((x: any) => ({
-          ...x,
-          imageUrl: x.imageUrl ?? x.image_url ?? '',
-        }));
-        if (isMounted) setInfluencers(items);
+        const all: Influencer[] = [];
+        let cursor: string | null = null;
+        do {
+          const response: any = await api.get('/api/influencers', {
+            params: { limit: PAGE_SIZE, ...(cursor ? { cursor } : {}) },
+          });
+          all.push(...(response.data?.influencers || []).map((x: any) => ({
+            ...x,
+            imageUrl: x.imageUrl ?? x.image_url ?? '',
+          })));
+          cursor = response.data?.pagination?.next_cursor ?? null;
+        } while (cursor && isMounted);
+        if (isMounted) setInfluencers(all);
       } catch (err) {
         if (isMounted) setError(err as Error);
       } finally {
@@ -40,4 +52,4 @@ export const useInfluencers = () => {
   }, []);
 
   return { influencers, isLoading, error };
-};
\ No newline at end of file
+};
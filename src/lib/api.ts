@@ -25,6 +25,26 @@ api.interceptors.request.use(
   }
 );
 
+// Refresh tokens are single use, so concurrent 401s must share one rotation;
+// a second POST with the same token would be treated as reuse and revoke the session
+let refreshInFlight: Promise<string> | null = null;
+
+const refreshAccessToken = (refreshToken: string): Promise<string> => {
+  if (!refreshInFlight) {
+    refreshInFlight = axios
+      .post(`${baseURL}/api/auth/refresh`, { refresh_token: refreshToken })
+      .then(({ data }) => {
+        localStorage.setItem('authToken', data.token);
+        localStorage.setItem('refreshToken', data.refresh_token);
+        return data.token as string;
+      })
+      .finally(() => {
+        refreshInFlight = null;
+      });
+  }
+  return refreshInFlight;
+};
+
 // Add response interceptor for better error handling
 api.interceptors.response.use(
   (response) => {
@@ -50,10 +70,25 @@ api.interceptors.response.use(
       error.message = 'Network Error: Unable to connect to server. Please check your connection or contact support.';
     }
     
-    // Handle token expiration
+    // Handle token expiration: rotate the refresh token once (shared by concurrent failures), then retry
+    const original = error.config;
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (error.response?.status === 401 && refreshToken && original && !original._retried
+        && !original.url?.includes('/api/auth/refresh')) {
+      original._retried = true;
+      try {
+        const token = await refreshAccessToken(refreshToken);
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch (refreshError) {
+        console.error('Token refresh failed:', refreshError);
+      }
+    }
+    
     if (error.response?.status === 401) {
       // Token expired or invalid, redirect to login
       localStorage.removeItem('authToken');
+      localStorage.removeItem('refreshToken');
       localStorage.removeItem('user');
       window.location.href = '/auth';
     }
@@ -106,11 +141,12 @@ export const authAPI = {
   changePassword: (passwordData: { current_password: string; new_password: string }) =>
     api.post('/api/auth/change-password', passwordData),
   
-  // Refresh token
-  refreshToken: () => api.post('/api/auth/refresh'),
+  // Refresh token (single use; the response carries the next one)
+  refreshToken: (refreshToken: string) =>
+    api.post('/api/auth/refresh', { refresh_token: refreshToken }),
   
   // Logout
-  logout: () => api.post('/api/auth/logout')
+  logout: () => api.post('/api/auth/logout', { refresh_token: localStorage.getItem('refreshToken') })
 };
 
 // Admin API endpoints